@@ -1,7 +1,5 @@
 #Proporciona clases para manipular fechas y horas.
 import datetime
-#Facilita el trabajo con peticiones HTTP.
-import requests
 #Realiza operaciones dependiente del SO como crear una carpeta o listar contenido de esta.
 import os
 #Facilita la escritura de interfaces de línea de comandos amigables.
@@ -10,158 +8,655 @@ import argparse
 import re
 #Sirve para el intercambio de datos
 import json
-from dateutil.easter import easter
-from dateutil.relativedelta import relativedelta as rd, FR
-from holidays.constants import JAN, MAY, AUG, OCT, NOV, DEC
-from holidays.holiday_base import HolidayBase
+#Aplicación parcial de funciones para el proveedor de feriados del motor de reglas
+import functools
+#Lee y escribe archivos CSV en el modo por lotes
+import csv
+#Flujos de texto en memoria para armar la salida de cada bloque
+import io
+#Acceso a la entrada y salida estándar
+import sys
+#Mide el rendimiento del modo por lotes
+import time
+#Sincroniza el acceso concurrente a la cache de calendarios
+import threading
+#Diccionario ordenado para el desalojo LRU de la cache de calendarios y cola de bloques pendientes
+from collections import OrderedDict, deque
+#Contadores e histogramas opcionales de las decisiones (instrumentacion.activar)
+import instrumentacion
+#Cache opcional de veredictos sobre el espacio reducido de claves (veredictos.activar)
+import veredictos
+#Horarios de Pico y Placa con rangos de vigencia, compilados en un índice de intervalos
+import horarios
+#Reglas versionadas de feriados, evaluadas de forma incremental
+from reglas_feriados import reglas_feriados, PROVINCIAS
+#Las dependencias pesadas se importan al usarse por primera vez, para que importar
+#Lab4 sea rápido: feriados_enlinea y aiohttp (modo en línea), numpy (predicción por lotes),
+#multiprocessing (modo por lotes en paralelo), holidays (feriados_ecuador) y
+#dateutil (reglas de feriados que dependen de la Pascua).
 
-class FeriadoEcuador(HolidayBase):
+def __getattr__(nombre):
+    """Expone FeriadoEcuador desde feriados_ecuador sin importarlo al cargar Lab4"""
+    if nombre == 'FeriadoEcuador':
+        from feriados_ecuador import FeriadoEcuador
+        return FeriadoEcuador
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, nombre))
+
+class CacheCalendarios:
     """
-    Una clase que representar el feriado en Ecuador por provincia (FeriadoEcuador)
-     Su objetivo es determinar si un fecha especifica es unas vacaciones lo mas 
-     rapido y flexible posible.
-     https://www.turismo.gob.ec/wp-content/uploads/2020/03/CALENDARIO-DE-FERIADOS.pdf
+    Cache de calendarios de feriados compartida por todo el proceso.
+     Cada entrada guarda los feriados de una (provincia, año) como un diccionario
+     {datetime.date: nombre}, de modo que después del primer acceso a un año la
+     consulta es una búsqueda en un diccionario. Los feriados se generan con reglas_feriados,
+     que reutiliza lo que cada regla genera en cada año. Las entradas menos usadas se
+     desalojan cuando se supera la capacidad (LRU). Cuando se enmienda una regla, solo se
+     eliminan las (provincia, año) cuyos feriados cambiaron, y en esos años se deja de leer
+     el índice precalculado.
      ...
-     Atributos (Se hereda en la clase HolidayBase)
+     Atributos
      ----------
-     prov: str
-         codigo de provincia segun ISO3166-2
+     capacidad: int
+         número máximo de (provincia, año) que se mantienen en memoria
+     indice: IndiceFeriados o None
+         índice precalculado (indice_feriados) del que se leen los años que cubre
+         en lugar de evaluar las reglas de reglas_feriados
      Métodos
      -------
-     __init__(self, placa, fecha, hora, en linea=False):
-         Construye todos los atributos necesarios para el objeto HolidayEcuador.
-     _poblar(self, año):
-         Devuelve si una fecha es feriado o no
-    """     
-    # ISO 3166-2 códigos para la subdivisión principal, 
-    # llamado provincias
-    # https://es.wikipedia.org/wiki/ISO_3166-2:EC
-    PROVINCIA = ["EC-P"]  # TODO agregar más provincias
-
-    def __init__(self, **kwargs):
-        """
-       Contructor con todos los métodos necesario para los dias festivos de Ecuador.
-        """         
-        self.pais = "Ecuador"
-        self.prov = kwargs.pop("provincia", "ON")
-        HolidayBase.__init__(self, **kwargs)
-
-    def _poblacion(self, año):
-        """
-        Revisa si una fecha es feriado o no
-        
+     usar_indice(self, indice):
+         Establece el índice precalculado y vacía la cache
+     obtener(self, provincia, año):
+         Devuelve los feriados de la provincia en el año, generándolos si no están en cache
+     es_feriado(self, provincia, fecha):
+         Devuelve True si la fecha es feriado en la provincia
+     provincias_feriado(self, fecha, provincias=None):
+         Devuelve las provincias en las que la fecha es feriado
+     invalidar(self, provincia=None, año=None):
+         Elimina las entradas que coinciden con la provincia y/o el año
+     limpiar(self):
+         Elimina todas las entradas
+    """
+
+    def __init__(self, capacidad=128, indice=None):
+        """
+        Construye una cache vacía.
          Parámetros
          ----------
-         año: str
-             año de una fecha
-         Devuelve
+         capacidad: int, opcional
+             número máximo de (provincia, año) en memoria (el valor predeterminado es 128)
+         indice: IndiceFeriados, opcional
+             índice precalculado de feriados (el valor predeterminado es None)
+        """
+        if capacidad < 1:
+            raise ValueError('La capacidad de la cache debe ser al menos 1')
+        self.capacidad = capacidad
+        self.indice = None
+        self._calendarios = OrderedDict()
+        #(provincia, año) en los que el índice quedó desactualizado; provincia None son todas
+        self._desactualizados = set()
+        self._candado = threading.Lock()
+        reglas_feriados.suscribir(self.__al_cambiar_reglas)
+        if indice is not None:
+            self.usar_indice(indice)
+
+    def __len__(self):
+        """Devuelve el número de (provincia, año) en cache"""
+        return len(self._calendarios)
+
+    def __contains__(self, clave):
+        """Devuelve True si la (provincia, año) ya está en cache"""
+        return clave in self._calendarios
+
+    def usar_indice(self, indice):
+        """
+        Establece el índice precalculado de feriados y vacía la cache
+         Parámetros
+         ----------
+         indice: IndiceFeriados o None
+             índice a usar; None vuelve a evaluar las reglas de reglas_feriados
+        """
+        with self._candado:
+            self.indice = indice
+            self._calendarios.clear()
+            self._desactualizados.clear()
+        if indice is not None:
+            #Los cambios de reglas en los años del índice se detectan aunque no se hayan evaluado
+            reglas_feriados.vigilar(range(indice.año_inicial, indice.año_final + 1))
+
+    def obtener(self, provincia, año):
+        """
+        Devuelve los feriados de una provincia en un año
+         Parámetros
+         ----------
+         provincia: str
+             codigo de provincia segun ISO3166-2
+         año: int
+             año a consultar
+         Devoluciones
          -------
-         Devuelve "verdadero" si una fecha es un día festivo, caso contrario da falso.
-        """                    
-        #Año Nuevo 
-        self[datetime.date(año, JAN, 1)] = "Año Nuevo [Nuevo año]"
-        
-        #Navidades
-        self[datetime.date(año, DEC, 25)] = "Navidad [Navidades]"
-        
-        #Semana Sata
-        self[easter(año) + rd(weekday=FR(-1))] = "Semana Santa (Viernes Santo) [Good Friday)]"
-        self[easter(año)] = "D�a de Pascuas [Easter Day]"
-        
-        #Carnavales
-        total_dias_libres = 46
-        self[easter(año) - datetime.timedelta(days=total_dias_libres+2)] = "Lunes de carnaval [Carnival of Monday)]"
-        self[easter(año) - datetime.timedelta(days=total_dias_libres+1)] = "Martes de carnaval [Tuesday of Carnival)]"
-        
-        # Dia nacional del trabajador
-        nombre = "Día Nacional del Trabajo [Día del laborador]"
-        # (Ley 858/Ley de Reforma a la LOSEP (vigente desde el 21 de diciembre de 2016 /R.O # 906)) Si el feriado cae un sábado o martes
-        # el descanso obligatorio será trasladado al viernes o lunes
-        # respectivamente:
-        if año > 2015 and datetime.date(año, MAY, 1).weekday() in (5,1):
-            self[datetime.date(año, MAY, 1) - datetime.timedelta(days=1)] = nombre
-        # (Ley 858/Ley de Reforma a la LOSEP (vigente desde el 21 de diciembre de 2016 /R.O # 906)) si el feriado cae un domingo
-        # el descanso obligatorio sera para el lunes
-        elif año > 2015 and datetime.date(año, MAY, 1).weekday() == 6:
-            self[datetime.date(año, MAY, 1) + datetime.timedelta(days=1)] = nombre
-        # (Ley 858/Ley de Reforma a la LOSEP (vigente desde el 21 de diciembre de 2016 /R.O # 906)) Feriados que sean en mi�rcoles o jueves
-        # se moverán al viernes de esa semana
-        elif año > 2015 and  datetime.date(año, MAY, 1).weekday() in (2,3):
-            self[datetime.date(año, MAY, 1) + rd(weekday=FR)] = nombre
-        else:
-            self[datetime.date(año, MAY, 1)] = nombre
-        
-        # La Batalla de Pichincha, tiene las mismas raglas del dia del trabajador
-        nombre = "La batalla del Pichincha [Batalla de Pichincha]"
-        if año > 2015 and datetime.date(año, MAY, 24).weekday() in (5,1):
-            self[datetime.date(año, MAY, 24).weekday() - datetime.timedelta(days=1)] = nombre
-        elif año > 2015 and datetime.date(año, MAY, 24).weekday() == 6:
-            self[datetime.date(año, MAY, 24) + datetime.timedelta(days=1)] = nombre
-        elif año > 2015 and  datetime.date(año, MAY, 24).weekday() in (2,3):
-            self[datetime.date(año, MAY, 24) + rd(weekday=FR)] = nombre
-        else:
-            self[datetime.date(año, MAY, 24)] = nombre
-        
-        #El Primer grito de Independencia, tiene las mismas raglas del dia del trabajador
-        nombre = "El primer Grito de la Independencia [Primer grito de independencia]"
-        if año > 2015 and datetime.date(año, AUG, 10).weekday() in (5,1):
-            self[datetime.date(año, AUG, 10)- datetime.timedelta(days=1)] = nombre
-        elif año > 2015 and datetime.date(año, AUG, 10).weekday() == 6:
-            self[datetime.date(año, AUG, 10) + datetime.timedelta(days=1)] = nombre
-        elif año > 2015 and  datetime.date(año, AUG, 10).weekday() in (2,3):
-            self[datetime.date(año, AUG, 10) + rd(weekday=FR)] = nombre
-        else:
-            self[datetime.date(año, AUG, 10)] = nombre       
-        
-        #La Independencia de Guayaquil, tiene las mismas raglas del dia del trabajador
-        nombre = "La independencia de Guayaquil [Independencia de Guayaquil]"
-        if año > 2015 and datetime.date(año, OCT, 9).weekday() in (5,1):
-            self[datetime.date(año, OCT, 9) - datetime.timedelta(days=1)] = nombre
-        elif año > 2015 and datetime.date(año, OCT, 9).weekday() == 6:
-            self[datetime.date(año, OCT, 9) + datetime.timedelta(days=1)] = nombre
-        elif año > 2015 and  datetime.date(año, MAY, 1).weekday() in (2,3):
-            self[datetime.date(año, OCT, 9) + rd(weekday=FR)] = nombre
-        else:
-            self[datetime.date(año, OCT, 9)] = nombre        
-        
-        #Dia de los Difuntos
-        nombreagregar = "Día de los difuntos [Día de difuntos]" 
-        # Independencia de Cuenca
-        nombreic = "Independencia de Cuenca [Independence of Cuenca]"
-        #(Ley 858/Ley de Reforma a la LOSEP (vigente desde el 21 de diciembre de 2016/R.O # 906))
-        #Para festivos nacionales y/o locales que coincidan en días corridos,
-        #serán aplicadas las siguientes reglas:
-        if (datetime.date(año, NOV, 2).weekday() == 5 and  datetime.date(año, NOV, 3).weekday() == 6):
-            self[datetime.date(año, NOV, 2) - datetime.timedelta(days=1)] = nombreagregar
-            self[datetime.date(año, NOV, 3) + datetime.timedelta(days=1)] = nombreic     
-        elif (datetime.date(año, NOV, 3).weekday() == 2):
-            self[datetime.date(año, NOV, 2)] = nombreagregar
-            self[datetime.date(año, NOV, 3) - datetime.timedelta(days=2)] = nombreic
-        elif (datetime.date(año, NOV, 3).weekday() == 3):
-            self[datetime.date(año, NOV, 3)] = nombreic
-            self[datetime.date(año, NOV, 2) + datetime.timedelta(days=2)] = nombreagregar
-        elif (datetime.date(año, NOV, 3).weekday() == 5):
-            self[datetime.date(año, NOV, 2)] =  nombreagregar
-            self[datetime.date(año, NOV, 3) - datetime.timedelta(days=2)] = nombreic
-        elif (datetime.date(año, NOV, 3).weekday() == 0):
-            self[datetime.date(año, NOV, 3)] = nombreic
-            self[datetime.date(año, NOV, 2) + datetime.timedelta(days=2)] = nombreagregar
-        else:
-            self[datetime.date(año, NOV, 2)] = nombreagregar
-            self[datetime.date(año, NOV, 3)] = nombreic  
-            
-        #Fundación de Quito (Aplica solo para la provincia de Pichincha)
-        #Las reglas son las mismas que el día del trabajo
-        nombre = "La fundación de Quito [Fundación de Quito]"        
-        if self.prov in ("EC-P"):
-            if año > 2015 and datetime.date(año, DEC, 6).weekday() in (5,1):
-                self[datetime.date(año, DEC, 6) - datetime.timedelta(days=1)] = nombre
-            elif año > 2015 and datetime.date(año, DEC, 6).weekday() == 6:
-                self[(datetime.date(año, DEC, 6).weekday()) + datetime.timedelta(days=1)] =nombre
-            elif año > 2015 and  datetime.date(año, DEC, 6).weekday() in (2,3):
-                self[datetime.date(año, DEC, 6) + rd(weekday=FR)] = nombre
+         Devuelve un diccionario {datetime.date: nombre}; no debe modificarse
+        """
+        clave = (provincia, año)
+        instrumento = instrumentacion.activa
+        with self._candado:
+            feriados = self._calendarios.get(clave)
+            if feriados is None:
+                if instrumento is not None:
+                    instrumento.contar('cache.fallos')
+                    inicio = time.perf_counter()
+                if (self.indice is not None and self.indice.cubre(provincia, año)
+                        and (provincia, año) not in self._desactualizados and (None, año) not in self._desactualizados):
+                    feriados = self.indice.feriados(provincia, año)
+                    if instrumento is not None:
+                        instrumento.contar('indice.lecturas')
+                else:
+                    feriados = reglas_feriados.provinciales(provincia, año)
+                if instrumento is not None:
+                    instrumento.registrar('calendario.generar', time.perf_counter() - inicio)
+                self._calendarios[clave] = feriados
+                if len(self._calendarios) > self.capacidad:
+                    self._calendarios.popitem(last=False)
+            else:
+                if instrumento is not None:
+                    instrumento.contar('cache.aciertos')
+                self._calendarios.move_to_end(clave)
+            return feriados
+
+    def __al_cambiar_reglas(self, cambios):
+        """
+        Recibe de reglas_feriados las (provincia, año) cuyos feriados cambiaron, elimina solo
+         esas entradas y deja de leer el índice precalculado en ellas
+        """
+        for provincia, año in cambios:
+            self.invalidar(provincia, año)
+            if self.indice is not None:
+                with self._candado:
+                    self._desactualizados.add((provincia, año))
+
+    def es_feriado(self, provincia, fecha):
+        """
+        Comprueba si una fecha es feriado en una provincia
+         Parámetros
+         ----------
+         provincia: str
+             codigo de provincia segun ISO3166-2
+         fecha: datetime.date
+             fecha a consultar
+         Devoluciones
+         -------
+         Devuelve True si la fecha es feriado, de lo contrario False
+        """
+        return fecha in self.obtener(provincia, fecha.year)
+
+    def provincias_feriado(self, fecha, provincias=None):
+        """
+        Encuentra las provincias en las que una fecha es feriado
+         Parámetros
+         ----------
+         fecha: datetime.date
+             fecha a consultar
+         provincias: iterable de str, opcional
+             codigos de provincia a consultar (el valor predeterminado son las provincias del índice
+             precalculado o, sin índice, reglas_feriados.PROVINCIAS)
+         Devoluciones
+         -------
+         Devuelve la lista de provincias, en el orden consultado, en las que la fecha es feriado
+        """
+        if provincias is None and self.indice is not None:
+            provincias = self.indice.provincias
+        elif provincias is None:
+            provincias = PROVINCIAS
+        return [provincia for provincia in provincias if self.es_feriado(provincia, fecha)]
+
+    def invalidar(self, provincia=None, año=None):
+        """
+        Elimina de la cache las entradas que coinciden con la provincia y/o el año;
+         sin argumentos elimina todas las entradas.
+         Parámetros
+         ----------
+         provincia: str, opcional
+             codigo de provincia segun ISO3166-2 (None: todas)
+         año: int, opcional
+             año a invalidar (None: todos)
+         Devoluciones
+         -------
+         Devuelve el número de entradas eliminadas
+        """
+        with self._candado:
+            claves = [(p, a) for p, a in self._calendarios
+                      if (provincia is None or p == provincia) and (año is None or a == año)]
+            for clave in claves:
+                del self._calendarios[clave]
+            return len(claves)
+
+    def limpiar(self):
+        """Elimina todas las entradas de la cache"""
+        self.invalidar()
+
+
+#Cache compartida por todas las instancias de PicoPlaca
+cache_calendarios = CacheCalendarios()
+
+#Horarios que aplica PicoPlaca; se reemplazan con usar_horarios
+tabla_horarios = horarios.TablaHorarios([horarios.ORDENANZA_0305])
+veredictos.firma_horarios = tabla_horarios.firma()
+
+def usar_horarios(tabla):
+    """
+    Reemplaza los horarios de Pico y Placa que aplica PicoPlaca
+     Parámetros
+     ----------
+     tabla: horarios.TablaHorarios
+         horarios con sus rangos de vigencia, por ejemplo leídos con TablaHorarios.cargar
+    """
+    global tabla_horarios
+    tabla_horarios = tabla
+    #Las caches de veredictos que se creen o se activen después usan la firma de los nuevos horarios
+    veredictos.firma_horarios = tabla.firma()
+    if veredictos.activa is not None:
+        #Los veredictos guardados corresponden a los horarios anteriores
+        veredictos.activa.configurar(tabla.firma())
+
+#Dirección de la API de días festivos abstractos (se puede apuntar a un servidor local de prueba)
+URL_VACACIONES = 'https://holidays.abstractapi.com/v1/'
+
+#Proveedor de feriados del modo en línea (feriados_enlinea.ProveedorSincrono), creado en la primera consulta
+proveedor_enlinea = None
+_candado_enlinea = threading.Lock()
+
+def usar_proveedor_enlinea(proveedor):
+    """
+    Reemplaza el proveedor de feriados del modo en línea
+     Parámetros
+     ----------
+     proveedor: feriados_enlinea.ProveedorSincrono o None
+         proveedor a usar; None crea uno nuevo con URL_VACACIONES en la próxima consulta
+    """
+    global proveedor_enlinea
+    with _candado_enlinea:
+        anterior, proveedor_enlinea = proveedor_enlinea, proveedor
+    if anterior is not None and anterior is not proveedor:
+        anterior.cerrar()
+
+def _proveedor_enlinea():
+    """
+    Devuelve el proveedor del modo en línea; el predeterminado consulta URL_VACACIONES con la
+     clave de VACACIONES_API_CODIGO y guarda las respuestas en el archivo de VACACIONES_CACHE
+    """
+    global proveedor_enlinea
+    with _candado_enlinea:
+        if proveedor_enlinea is None:
+            from feriados_enlinea import ProveedorSincrono
+            proveedor_enlinea = ProveedorSincrono(url=URL_VACACIONES, ruta_cache=os.environ.get('VACACIONES_CACHE'))
+        return proveedor_enlinea
+
+#Mensajes de validación compartidos por PicoPlaca y MotorPicoPlaca
+MENSAJE_PLACA = 'La placa debe tener el siguiente formato: XX-YYYY o XXX-YYYY, donde X es una letra mayuscula e Y es un digito'
+MENSAJE_FECHA = 'La fecha debe tener el siguiente formato: AAAA-MM-DD (por ejemplo: 2021-04-02)'
+MENSAJE_HORA = 'La hora debe tener el siguiente formato: HH:MM (por ejemplo, 08:31, 14:22, 00:01)'
+
+#Expresión de la placa compilada una sola vez
+PATRON_PLACA = re.compile('[A-Z]{2,3}-[0-9]{4}')
+
+def analizar_fecha(valor):
+    """
+    Convierte una fecha AAAA-MM-DD en datetime.date leyendo posiciones fijas; las fechas que no
+     tienen exactamente ese formato ASCII se analizan con strptime
+     Parámetros
+     ----------
+     valor: str
+         Sigue el formato ISO 8601 AAAA-MM-DD: por ejemplo, 2020-04-22
+     Devoluciones
+     -------
+     Devuelve la fecha como datetime.date
+     Aumenta
+     ------
+     ValorError
+         Si el valor no tiene el formato AAAA-MM-DD o la fecha no existe
+    """
+    try:
+        if (isinstance(valor, str) and len(valor) == 10 and valor.isascii() and valor[4] == '-' and valor[7] == '-'
+                and valor[:4].isdigit() and valor[5:7].isdigit() and valor[8:].isdigit()):
+            return datetime.date(int(valor[:4]), int(valor[5:7]), int(valor[8:]))
+        #Fuera del formato canónico se conserva la semántica de strptime (por ejemplo, 2021-4-2,
+        #2021-04- 2 o dígitos Unicode)
+        return datetime.datetime.strptime(valor, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        raise ValueError(MENSAJE_FECHA) from None
+
+def analizar_hora(valor):
+    """
+    Convierte una hora HH:MM en minutos desde la medianoche leyendo posiciones fijas
+     Parámetros
+     ----------
+     valor: str
+         Sigue el formato HH:MM: por ejemplo, 08:35, 19:30
+     Devoluciones
+     -------
+     Devuelve los minutos desde la medianoche como int
+     Aumenta
+     ------
+     ValorError
+         Si el valor no tiene el formato HH:MM entre 00:00 y 23:59
+    """
+    if (isinstance(valor, str) and len(valor) == 5 and valor.isascii() and valor[2] == ':'
+            and valor[:2].isdigit() and valor[3:].isdigit()):
+        horas, minutos = int(valor[:2]), int(valor[3:])
+        if horas <= 23 and minutos <= 59:
+            return horas * 60 + minutos
+    raise ValueError(MENSAJE_HORA)
+
+class MotorPicoPlaca:
+    """
+    Motor de reglas de Pico y Placa reutilizable para muchas consultas.
+     A diferencia de PicoPlaca, que representa una sola placa, fecha y hora, el motor
+     valida la tabla de restricciones y las ventanas de hora pico una sola vez y responde
+     cualquier combinación de placa, fecha y hora, además de consultas por rangos de
+     fechas que se resuelven con aritmética de intervalos. Sin restricciones ni ventanas
+     propias, cada fecha se resuelve con el horario vigente de tabla_horarios (usar_horarios),
+     igual que en PicoPlaca.
+     -ORDENANZA METROPOLITANA No. 0305
+     ...
+     Atributos
+     ----------
+     restricciones: dict o None
+         {día: últimos dígitos prohibidos}, con los días de DIAS; None si el motor sigue tabla_horarios
+     ventanas: tuple o None
+         ventanas de hora pico (inicio, fin) en minutos desde la medianoche, ambos extremos incluidos;
+         None si el motor sigue tabla_horarios
+     tabla: horarios.TablaHorarios o None
+         horarios propios del motor; None usa tabla_horarios en cada consulta
+     es_feriado: función
+         recibe un datetime.date y devuelve True si es feriado
+     Métodos
+     -------
+     puede_circular(self, placa, fecha, hora):
+         Devuelve True si el vehículo puede circular en la fecha y hora
+     digitos_restringidos(self, fecha, hora):
+         Devuelve los últimos dígitos de placa que no pueden circular en la fecha y hora
+     ventanas_restringidas(self, placa, desde, hasta):
+         Devuelve los intervalos en los que el vehículo no puede circular entre dos fechas
+     ventanas_permitidas(self, placa, desde, hasta):
+         Devuelve los intervalos en los que el vehículo puede circular entre dos fechas
+     resumen_restricciones(self, digito, desde, hasta):
+         Cuenta los días y minutos de restricción de un último dígito entre dos fechas
+    """
+    #Días de la semana
+    DIAS = horarios.DIAS
+
+    #Diccionario que contiene las restricciones en la forma {día: último dígito prohibido}
+    RESTRICCIONES = horarios.RESTRICCIONES_0305
+
+    #Horas pico 07:00 - 09:30 y 16:00 - 19:30 en minutos desde la medianoche
+    VENTANAS_PICO = horarios.VENTANAS_0305
+
+    def __init__(self, restricciones=None, ventanas=None, es_feriado=None, provincia='EC-P', tabla=None):
+        """
+        Construye el motor y valida la configuración.
+         Parámetros
+         ----------
+         restricciones: dict, opcional
+             {día: últimos dígitos prohibidos} (si solo se dan las ventanas, el valor predeterminado
+             es RESTRICCIONES; sin ninguna de las dos, rige tabla_horarios)
+         ventanas: iterable, opcional
+             ventanas (inicio, fin) en minutos desde la medianoche, ambos extremos incluidos
+             (si solo se dan las restricciones, el valor predeterminado es VENTANAS_PICO)
+         es_feriado: función, opcional
+             recibe un datetime.date y devuelve True si es feriado (el valor predeterminado
+             consulta cache_calendarios para la provincia)
+         provincia: str, opcional
+             codigo de provincia segun ISO3166-2 usado por el proveedor predeterminado (el valor predeterminado es EC-P)
+         tabla: horarios.TablaHorarios, opcional
+             horarios con rangos de vigencia propios del motor (el valor predeterminado es None,
+             el tabla_horarios vigente en cada consulta)
+         Aumenta
+         ------
+         ValorError
+             Si la tabla de restricciones o las ventanas no son válidas, o se dan junto con tabla
+        """
+        self.es_feriado = es_feriado if es_feriado is not None else functools.partial(cache_calendarios.es_feriado, provincia)
+        #Ventanas unidas de cada (horario, día de la semana) de la tabla _tabla_intervalos,
+        #calculadas al consultar rangos; se vacían cuando cambia la tabla
+        self._intervalos = {}
+        self._tabla_intervalos = None
+        if restricciones is None and ventanas is None:
+            self.restricciones = self.ventanas = None
+            self.tabla = tabla
+            return
+        if tabla is not None:
+            raise ValueError('Las restricciones y ventanas propias no se pueden combinar con una tabla de horarios')
+        restricciones = self.RESTRICCIONES if restricciones is None else restricciones
+        if set(restricciones) != set(self.DIAS):
+            raise ValueError('Las restricciones deben tener exactamente los días {}'.format(', '.join(self.DIAS)))
+        for digitos in restricciones.values():
+            if any(not isinstance(d, int) or not 0 <= d <= 9 for d in digitos):
+                raise ValueError('Los dígitos restringidos deben ser enteros entre 0 y 9')
+        ventanas = self.VENTANAS_PICO if ventanas is None else ventanas
+        ventanas = tuple(sorted((int(inicio), int(fin)) for inicio, fin in ventanas))
+        for inicio, fin in ventanas:
+            if not 0 <= inicio <= fin < 24 * 60:
+                raise ValueError('Las ventanas deben estar dentro del día y tener inicio <= fin')
+        self.restricciones = {dia: tuple(sorted(set(restricciones[dia]))) for dia in self.DIAS}
+        self.ventanas = ventanas
+        self.tabla = horarios.TablaHorarios([horarios.Horario('motor', self.restricciones, ventanas)])
+
+    @staticmethod
+    def __unir(intervalos):
+        """Une intervalos semiabiertos ordenados que se solapan o se tocan"""
+        unidos = []
+        for inicio, fin in sorted(intervalos):
+            if unidos and inicio <= unidos[-1][1]:
+                unidos[-1] = (unidos[-1][0], max(unidos[-1][1], fin))
+            else:
+                unidos.append((inicio, fin))
+        return unidos
+
+    @staticmethod
+    def __placa(valor):
+        """
+        Valida una placa
+         Devoluciones
+         -------
+         Devuelve una tupla (exenta, último dígito)
+        """
+        if not isinstance(valor, str) or not PATRON_PLACA.fullmatch(valor):
+            raise ValueError(MENSAJE_PLACA)
+        #Vehículos excluidos por la segunda letra de la placa o por tener solo dos letras
+        return valor[1] in 'AUZEXM' or valor[2] == '-', int(valor[-1])
+
+    @staticmethod
+    def __fecha(valor):
+        """Convierte una fecha AAAA-MM-DD (o un datetime.date) en datetime.date"""
+        if isinstance(valor, datetime.datetime):
+            return valor.date()
+        if isinstance(valor, datetime.date):
+            return valor
+        return analizar_fecha(valor)
+
+    @staticmethod
+    def __minuto(valor):
+        """Convierte una hora HH:MM (o un datetime.time) en minutos desde la medianoche"""
+        if isinstance(valor, datetime.time):
+            return valor.hour * 60 + valor.minute
+        return analizar_hora(valor)
+
+    def __horario(self, fecha):
+        """Devuelve el horarios.Horario que rige en la fecha (None si no rige ninguno)"""
+        return (tabla_horarios if self.tabla is None else self.tabla).vigente(fecha)
+
+    def __ventanas_dia(self, horario, dia_semana):
+        """Devuelve las ventanas del día del horario como intervalos semiabiertos [inicio, fin + 1) unidos"""
+        tabla = tabla_horarios if self.tabla is None else self.tabla
+        if tabla is not self._tabla_intervalos:
+            #Con usar_horarios, los horarios anteriores ya no se consultan y no deben acumularse
+            self._intervalos = {}
+            self._tabla_intervalos = tabla
+        clave = (horario, dia_semana)
+        intervalos = self._intervalos.get(clave)
+        if intervalos is None:
+            intervalos = self._intervalos[clave] = self.__unir(
+                [(inicio, fin + 1) for inicio, fin in horario.ventanas[self.DIAS[dia_semana]]])
+        return intervalos
+
+    def __dias_restringidos(self, digito, desde, hasta):
+        """
+        Genera las tuplas (fecha, horario) de los días entre desde y hasta en los que el horario
+         vigente restringe el dígito, recorriendo solo los días de la semana restringidos de cada tramo
+         (agrupadas por día de la semana, no en orden de fecha)
+        """
+        tabla = tabla_horarios if self.tabla is None else self.tabla
+        for primero, ultimo, horario in tabla.tramos(desde, hasta):
+            if horario is None:
+                continue
+            for dia_semana in range(len(self.DIAS)):
+                if not horario.restringe(dia_semana, digito):
+                    continue
+                fecha = primero + datetime.timedelta(days=(dia_semana - primero.weekday()) % 7)
+                while fecha <= ultimo:
+                    yield fecha, horario
+                    fecha += datetime.timedelta(days=7)
+
+    def puede_circular(self, placa, fecha, hora):
+        """
+        Comprueba si el vehículo con la placa puede circular en la fecha y hora
+         Parámetros
+         ----------
+         placa: str
+             El formato utilizado es XX-YYYY o XXX-YYYY, donde X es una letra mayúscula e Y es un dígito.
+         fecha: str o datetime.date
+             Sigue el formato ISO 8601 AAAA-MM-DD: por ejemplo, 2020-04-22.
+         hora: str o datetime.time
+             Sigue el formato HH:MM: por ejemplo, 08:35, 19:30
+         Devoluciones
+         -------
+         Devuelve True si el vehículo puede circular, de lo contrario False
+         Aumenta
+         ------
+         ValorError
+             Si la placa, la fecha o la hora no tienen el formato esperado
+        """
+        exenta, digito = self.__placa(placa)
+        fecha = self.__fecha(fecha)
+        minuto = self.__minuto(hora)
+        if self.es_feriado(fecha) or exenta:
+            return True
+        horario = self.__horario(fecha)
+        dia_semana = fecha.weekday()
+        if horario is None or not horario.en_pico(dia_semana, minuto):
+            return True
+        return not horario.restringe(dia_semana, digito)
+
+    def digitos_restringidos(self, fecha, hora):
+        """
+        Encuentra los últimos dígitos de placa que no pueden circular en un instante;
+         no incluye a los vehículos exentos por la segunda letra o por tener dos letras
+         Parámetros
+         ----------
+         fecha: str o datetime.date
+             Sigue el formato ISO 8601 AAAA-MM-DD
+         hora: str o datetime.time
+             Sigue el formato HH:MM
+         Devoluciones
+         -------
+         Devuelve la lista ordenada de dígitos restringidos (vacía en feriados o fuera de la hora pico)
+        """
+        fecha = self.__fecha(fecha)
+        minuto = self.__minuto(hora)
+        horario = self.__horario(fecha)
+        dia_semana = fecha.weekday()
+        if horario is None or not horario.en_pico(dia_semana, minuto) or self.es_feriado(fecha):
+            return []
+        return list(horario.restricciones[self.DIAS[dia_semana]])
+
+    def ventanas_restringidas(self, placa, desde, hasta):
+        """
+        Calcula los intervalos en los que el vehículo no puede circular entre dos fechas
+         Parámetros
+         ----------
+         placa: str
+             El formato utilizado es XX-YYYY o XXX-YYYY
+         desde: str o datetime.date
+             primera fecha del rango
+         hasta: str o datetime.date
+             última fecha del rango (incluida)
+         Devoluciones
+         -------
+         Devuelve una lista ordenada de intervalos semiabiertos (inicio, fin) de datetime.datetime;
+         el vehículo no puede circular desde inicio hasta antes de fin
+        """
+        exenta, digito = self.__placa(placa)
+        desde = self.__fecha(desde)
+        hasta = self.__fecha(hasta)
+        if exenta:
+            return []
+        restringidas = []
+        for fecha, horario in self.__dias_restringidos(digito, desde, hasta):
+            if not self.es_feriado(fecha):
+                medianoche = datetime.datetime.combine(fecha, datetime.time())
+                restringidas.extend((medianoche + datetime.timedelta(minutes=inicio),
+                                     medianoche + datetime.timedelta(minutes=fin))
+                                    for inicio, fin in self.__ventanas_dia(horario, fecha.weekday()))
+        return self.__unir(restringidas)
+
+    def ventanas_permitidas(self, placa, desde, hasta):
+        """
+        Calcula los intervalos en los que el vehículo puede circular entre dos fechas,
+         como complemento de ventanas_restringidas dentro del rango
+         Parámetros
+         ----------
+         placa: str
+             El formato utilizado es XX-YYYY o XXX-YYYY
+         desde: str o datetime.date
+             primera fecha del rango
+         hasta: str o datetime.date
+             última fecha del rango (incluida)
+         Devoluciones
+         -------
+         Devuelve una lista ordenada de intervalos semiabiertos (inicio, fin) de datetime.datetime,
+         desde la medianoche de la primera fecha hasta la medianoche siguiente a la última
+        """
+        desde = self.__fecha(desde)
+        hasta = self.__fecha(hasta)
+        cursor = datetime.datetime.combine(desde, datetime.time())
+        final = datetime.datetime.combine(hasta + datetime.timedelta(days=1), datetime.time())
+        permitidas = []
+        for inicio, fin in self.ventanas_restringidas(placa, desde, hasta):
+            if cursor < inicio:
+                permitidas.append((cursor, inicio))
+            cursor = fin
+        if cursor < final:
+            permitidas.append((cursor, final))
+        return permitidas
+
+    def resumen_restricciones(self, digito, desde, hasta):
+        """
+        Cuenta cuánto se restringe un último dígito de placa (no exento) entre dos fechas
+         Parámetros
+         ----------
+         digito: int
+             último dígito de la placa, de 0 a 9
+         desde: str o datetime.date
+             primera fecha del rango
+         hasta: str o datetime.date
+             última fecha del rango (incluida)
+         Devoluciones
+         -------
+         Devuelve una tupla (días restringidos, feriados en días restringidos, minutos restringidos,
+         minutos liberados por feriados): los días restringidos no descuentan los feriados, y los
+         minutos restringidos son los que quedan después de descontarlos; cada día cuenta los
+         minutos de hora pico del horario vigente en esa fecha
+        """
+        desde = self.__fecha(desde)
+        hasta = self.__fecha(hasta)
+        dias = feriados = minutos = perdidos = 0
+        for fecha, horario in self.__dias_restringidos(digito, desde, hasta):
+            minutos_dia = sum(fin - inicio for inicio, fin in self.__ventanas_dia(horario, fecha.weekday()))
+            dias += 1
+            if self.es_feriado(fecha):
+                feriados += 1
+                perdidos += minutos_dia
             else:
-                self[datetime.date(año, DEC, 6)] = nombre
+                minutos += minutos_dia
+        return dias, feriados, minutos, perdidos
 
 class PicoPlaca:
     """
@@ -206,34 +701,19 @@ class PicoPlaca:
         Obtiene el valor del atributo de hora
     hora (uno mismo, valor):
         Establece el valor del atributo de hora
-    __encontar_dia(yo, fecha):
-        Devuelve el día a partir de la fecha: por ejemplo, miércoles
-    __is_forbidden_time(self, check_time):
-        Devuelve True si el tiempo proporcionado está dentro de las horas pico prohibidas, de lo contrario sería Falso
+    __es_tiempo_prohibido(horario, dia_semana, minuto):
+        Devuelve True si el tiempo proporcionado está dentro de las horas pico prohibidas del horario vigente, de lo contrario sería Falso
     __es_vacaciones:
         Devuelve True si la fecha marcada (en formato ISO 8601 AAAA-MM-DD) es un día festivo en Ecuador, de lo contrario, False
     predecir (auto):
         Devuelve True si el vehículo con la placa especificada puede estar en la carretera en la fecha y hora especificadas, de lo contrario, False
+    predecir_lote(cls, placas, fechas, horas, enlinea=False):
+        Evalúa columnas completas de placas, fechas y horas y devuelve un arreglo booleano junto con los errores de validación por fila
+    predecir_horarios(cls, placas, fechas, horas, tablas, enlinea=False):
+        Evalúa las mismas columnas con varias tablas de horarios y devuelve una fila de resultados por tabla
     """
-    #Días de la semana
-    __dias = [
-            "Lunes",
-            "Martes",
-            "Miercoles",
-            "Jueves",
-            "Viernes",
-            "Sabado",
-            "Domingo"]
-
-    #Diccionario que contiene las restricciones en la forma {día: último dígito prohibido}
-    __restricciones = {
-            "Lunes": [1, 2],
-            "Martes": [3, 4],
-            "Miercoles": [5, 6],
-            "Jueves": [7, 8],
-            "Viernes": [9, 0],
-            "Sabado": [],
-            "Domingo": []}
+    #Atributos de cada instancia; sin __dict__ para reducir la memoria de poblaciones grandes
+    __slots__ = ('_placa', '_exenta', '_digito', '_fecha', '_dia', '_dia_semana', '_hora', '_minuto', 'enlinea')
 
     def __init__(self, placa, fecha, hora, enlinea=False):
         """
@@ -254,10 +734,20 @@ class PicoPlaca:
              en línea: booleano, opcional
                  si en línea == Verdadero, se usará la API de días festivos abstractos (el valor predeterminado es Falso)               
         """                
-        self.placa = placa
-        self.fecha = fecha
-        self.hora = hora
+        instrumento = instrumentacion.activa
+        if instrumento is not None:
+            inicio = time.perf_counter()
+        try:
+            self.placa = placa
+            self.fecha = fecha
+            self.hora = hora
+        except ValueError:
+            if instrumento is not None:
+                instrumento.contar('validacion.errores')
+            raise
         self.enlinea = enlinea
+        if instrumento is not None:
+            instrumento.registrar('validacion', time.perf_counter() - inicio)
 
     @property
     def placa(self):
@@ -279,10 +769,12 @@ class PicoPlaca:
              XX-YYYY o XXX-YYYY,
              donde X es una letra mayúscula e Y es un dígito
         """
-        if not re.match('^[A-Z]{2,3}-[0-9]{4}$', valor):
-            raise ValueError(
-                'La placa debe tener el siguiente formato: XX-YYYY o XXX-YYYY, donde X es una letra mayuscula e Y es un digito')
+        if not isinstance(valor, str) or not PATRON_PLACA.fullmatch(valor):
+            raise ValueError(MENSAJE_PLACA)
         self._placa = valor
+        #Vehículos excluidos por la segunda letra de la placa o por tener solo dos letras
+        self._exenta = valor[1] in 'AUZEXM' or valor[2] == '-'
+        self._digito = ord(valor[-1]) - 48
 
     @property
     def fecha(self):
@@ -302,15 +794,9 @@ class PicoPlaca:
          ValorError
              Si el str de valor no tiene el formato AAAA-MM-DD (por ejemplo, 2021-04-02)
         """
-        try:
-            if len(valor) != 10:
-                raise ValueError
-            datetime.datetime.strptime(valor, "%Y-%m-%d")
-        except ValueError:
-            raise ValueError(
-                'La fecha debe tener el siguiente formato: AAAA-MM-DD (por ejemplo: 2021-04-02)') from None
+        self._dia = analizar_fecha(valor)
+        self._dia_semana = self._dia.weekday()
         self._fecha = valor
-        
 
     @property
     def hora(self):
@@ -330,78 +816,50 @@ class PicoPlaca:
          ValorError
              Si el str de valor no tiene el formato HH:MM (por ejemplo, 08:31, 14:22, 00:01)
         """
-        if not re.match('^([01][0-9]|2[0-3]):([0-5][0-9]|)$', valor):
-            raise ValueError(
-                'La hora debe tener el siguiente formato: HH:MM (por ejemplo, 08:31, 14:22, 00:01)')
+        self._minuto = analizar_hora(valor)
         self._hora = valor
 
-    def __encontrar_dia(self, fecha):
+    @staticmethod
+    def __es_tiempo_prohibido(horario, dia_semana, minuto):
         """
-        Encuentra el día a partir de la fecha: por ejemplo, miércoles
+        Comprueba si el tiempo proporcionado está dentro de las horas pico prohibidas del horario
+         vigente; con la ORDENANZA 0305 las horas pico son: 07:00 - 09:30 y 16:00 - 19:30
          Parámetros
          ----------
-         fecha: str
-             Está siguiendo el formato ISO 8601 AAAA-MM-DD: por ejemplo, 2020-04-22
-         Devoluciones
-         -------
-         Devuelve el día a partir de la fecha como una cadena
-        """        
-        d = datetime.datetime.strptime(fecha, '%Y-%m-%d').weekday()
-        return self.__dias[d]
-
-    def __es_tiempo_prohibido(self, check_fecha):
-        """
-        Comprueba si el tiempo proporcionado está dentro de las horas pico prohibidas,
-         donde las horas pico son: 07:00 - 09:30 y 16:00 - 19:30
-         Parámetros
-         ----------
-         check_fecha : str
-             Tiempo que se comprobará. Está en formato HH:MM: por ejemplo, 08:35, 19:15
+         horario : horarios.Horario o None
+             Horario vigente en la fecha (tabla_horarios.vigente); None si no rige ninguno
+         dia_semana: int
+             Número de día de la semana, con lunes = 0 (calculado al establecer la fecha)
+         minuto : int
+             Minutos desde la medianoche (calculados al establecer la hora)
          Devoluciones
          -------
          Devuelve verdadero si el tiempo proporcionado está dentro de las horas pico prohibidas, de lo contrario sería Falso
-        """           
-        t = datetime.datetime.strptime(check_fecha, '%H:%M').time()
-        return ((t >= datetime.time(7, 0) and t <= datetime.time(9, 30)) or
-                (t >= datetime.time(16, 0) and t <= datetime.time(19, 30)))
+        """
+        return horario is not None and horario.en_pico(dia_semana, minuto)
 
-    def __es_vacaciones(self, fecha, enlinea):
+    @staticmethod
+    def __es_vacaciones(fecha, enlinea):
         """
-        Comprueba si la fecha (en formato ISO 8601 AAAA-MM-DD) es un día festivo en Ecuador
+        Comprueba si la fecha es un día festivo en Ecuador
          si está en línea == Verdadero, utilizará una API REST, de lo contrario, generará los días festivos del año examinado
         
          Parámetros
          ----------
-         fecha: calle
-             Está siguiendo el formato ISO 8601 AAAA-MM-DD: por ejemplo, 2020-04-22
+         fecha: datetime.date
+             Fecha a comprobar
          en línea: booleano, opcional
              si en línea == Verdadero, se utilizará la API de días festivos abstractos
          Devoluciones
          -------
          Devuelve True si la fecha marcada (en formato ISO 8601 AAAA-MM-DD) es un día festivo en Ecuador, de lo contrario, False
         """            
-        y, m, d = fecha.split('-')
-
         if enlinea:
-            #API de vacaciones abstractapi, versión gratuita: 1000 solicitudes por mes
-             #1 solicitud por segundo
-             #recuperar la clave API de la variable de entorno
-            codigo = os.environ.get('VACACIONES_API_CODIGO')
-            respuesta = requests.get(
-                "https://holidays.abstractapi.com/v1/?api_key={}&country=EC&year={}&month={}&day={}".format(codigo, y, m, d))
-            if (respuesta.status_code == 401):
-                #Esto significa que falta un codigo API
-                raise requests.HTTPError(
-                    'Falta la clave API. Guarde su clave en la variable de entorno HOLIDAYS API_KEY')
-            if respuesta.content == b'[]':  #Si no hay vacaciones obtenemos una matriz vacía
-                return False
-            #Arreglar el Jueves Santo incorrectamente denotado como feriado
-            if json.loads(respuesta.text[1:-1])['nombre'] == 'Maundy Thursday':
-                return False
-            return True
+            #API de vacaciones abstractapi, versión gratuita: 1000 solicitudes por mes y 1 solicitud por segundo;
+             #el proveedor comparte la sesión, el limitador de tasa y la cache de respuestas entre consultas
+            return _proveedor_enlinea().es_feriado(fecha)
         else:
-            ecu_holidays = FeriadoEcuador(prov='EC-P')
-            return fecha in ecu_holidays
+            return cache_calendarios.es_feriado('EC-P', fecha)
 
     def predecir(self):
         """
@@ -414,28 +872,731 @@ class PicoPlaca:
          la placa especificada puede estar en el camino
          en la fecha y hora especificadas, de lo contrario Falso
         """
+        instrumento = instrumentacion.activa
+        if veredictos.activa is not None:
+            return self.__predecir_con_cache(veredictos.activa, instrumento)
+        if instrumento is not None:
+            return self.__predecir_instrumentado(instrumento)
+
         #Comprobar si la fecha es un día festivo
-        if self.__es_vacaciones(self.fecha, self.enlinea):
+        if self.__es_vacaciones(self._dia, self.enlinea):
             return True
 
         #Consultar vehículos excluidos de la restricción según la segunda letra de la placa o si se utilizan solo dos letras
          #https://es.wikipedia.org/wiki/Matr%C3%ADculas_automovil%C3%ADsticas_de_Ecuador
-        if self.placa[1] in 'AUZEXM' or len(self.placa.split('-')[0]) == 2:
+        if self._exenta:
             return True
 
+        horario = tabla_horarios.vigente(self._dia) # Encuentra el horario que rige en la fecha
        #Compruebe si el tiempo proporcionado no está en las horas pico prohibidas
-        if not self.__es_tiempo_prohibido(self.hora):
+        if not self.__es_tiempo_prohibido(horario, self._dia_semana, self._minuto):
             return True
 
-        dia = self.__encontrar_dia(self.fecha) # Encuentra el día de la semana a partir de la fecha
          #Verifique si el último dígito de la placa no está restringido en este día en particular
-        if int(self.placa[-1]) not in self.__restricciones[dia]:
+        if not horario.restringe(self._dia_semana, self._digito):
             return True
 
         return False
 
+    def _clave_veredicto(self, cache):
+        """Devuelve la clave de la consulta en la cache de veredictos, sin consultar el feriado"""
+        pico = self.__es_tiempo_prohibido(tabla_horarios.vigente(self._dia), self._dia_semana, self._minuto)
+        return cache.clave(self._dia.toordinal(), self._exenta, pico, self._digito, self.enlinea)
+
+    def __predecir_con_cache(self, cache, instrumento):
+        """
+        Igual que predecir, pero busca primero el veredicto en la cache de veredictos
+         por (fecha, placa exenta, hora pico, último dígito, en línea); solo en un fallo
+         se consulta el feriado y se guarda el veredicto
+        """
+        horario = tabla_horarios.vigente(self._dia)
+        pico = self.__es_tiempo_prohibido(horario, self._dia_semana, self._minuto)
+        clave = cache.clave(self._dia.toordinal(), self._exenta, pico, self._digito, self.enlinea)
+        puede = cache.obtener(clave)
+        if puede is None:
+            if instrumento is not None:
+                puede = self.__predecir_instrumentado(instrumento)
+            else:
+                puede = (self.__es_vacaciones(self._dia, self.enlinea) or self._exenta or not pico
+                         or not horario.restringe(self._dia_semana, self._digito))
+            cache.guardar(clave, puede)
+        return puede
+
+    def __predecir_instrumentado(self, instrumento):
+        """
+        Igual que predecir, pero mide la consulta de feriado y el tiempo total y cuenta
+         el motivo que decidió el veredicto (decision.feriado, decision.exenta,
+         decision.fuera_de_pico, decision.digito_permitido o decision.restringido)
+        """
+        inicio = time.perf_counter()
+        feriado = self.__es_vacaciones(self._dia, self.enlinea)
+        instrumento.registrar('feriado', time.perf_counter() - inicio)
+        horario = tabla_horarios.vigente(self._dia)
+        if feriado:
+            motivo = 'feriado'
+        elif self._exenta:
+            motivo = 'exenta'
+        elif not self.__es_tiempo_prohibido(horario, self._dia_semana, self._minuto):
+            motivo = 'fuera_de_pico'
+        elif not horario.restringe(self._dia_semana, self._digito):
+            motivo = 'digito_permitido'
+        else:
+            motivo = 'restringido'
+        instrumento.contar('decision.' + motivo)
+        instrumento.registrar('predecir', time.perf_counter() - inicio)
+        return motivo != 'restringido'
+
+    @staticmethod
+    def __matriz_codigos(columna, ancho):
+        """
+        Convierte una columna de cadenas en una matriz de puntos de código
+         Parámetros
+         ----------
+         columna: numpy.ndarray
+             Arreglo unidimensional de cadenas (dtype str)
+         ancho: int
+             Número mínimo de columnas de la matriz resultante
+         Devoluciones
+         -------
+         Devuelve la matriz (n, ancho) de puntos de código y la longitud de cada cadena
+        """
+        import numpy as np
+        if columna.dtype.itemsize // 4 < ancho:
+            columna = columna.astype('<U{}'.format(ancho))
+        codigos = columna.view(np.uint32).reshape(len(columna), columna.dtype.itemsize // 4)
+        return codigos.astype(np.int64), np.char.str_len(columna)
+
+    @staticmethod
+    def _validar_placas(codigos, largo):
+        """
+        Valida placas representadas como una matriz de códigos
+         Parámetros
+         ----------
+         codigos: numpy.ndarray
+             matriz (n, 8 o más) de puntos de código o bytes ASCII de cada placa
+         largo: numpy.ndarray
+             número de caracteres de cada placa
+         Devoluciones
+         -------
+         Devuelve la máscara de placas con el formato XX-YYYY o XXX-YYYY
+        """
+        letra = (codigos >= 65) & (codigos <= 90)
+        digito = (codigos >= 48) & (codigos <= 57)
+        guion = codigos == 45
+        dos_letras = (largo == 7) & letra[:, 0] & letra[:, 1] & guion[:, 2] & digito[:, 3:7].all(axis=1)
+        tres_letras = (largo == 8) & letra[:, 0:3].all(axis=1) & guion[:, 3] & digito[:, 4:8].all(axis=1)
+        return dos_letras | tres_letras
+
+    @classmethod
+    def _analizar_columnas(cls, placas, fechas, horas):
+        """
+        Valida y analiza columnas de placas, fechas y horas en una sola pasada
+         Las filas fuera del formato canónico ASCII se validan con el constructor escalar,
+         de modo que se aceptan y rechazan exactamente las mismas filas que en PicoPlaca.
+         Parámetros
+         ----------
+         placas, fechas, horas: secuencia de str o numpy.ndarray
+             Columnas con los formatos XX-YYYY o XXX-YYYY, AAAA-MM-DD y HH:MM
+         Devoluciones
+         -------
+         Devuelve una tupla (valida, placa, dia, minuto, errores): valida es la máscara de filas válidas,
+         placa la matriz (n, 8) de códigos ASCII de la placa (rellena con ceros), dia los días desde
+         1970-01-01, minuto los minutos desde la medianoche y errores la lista con None o el mensaje
+         de validación de cada fila
+         Aumenta
+         ------
+         ValorError
+             Si las columnas no son unidimensionales o no tienen la misma longitud
+        """
+        import numpy as np
+        col_placas = np.asarray(placas, dtype=str)
+        col_fechas = np.asarray(fechas, dtype=str)
+        col_horas = np.asarray(horas, dtype=str)
+        n = len(col_placas)
+        if not (col_placas.shape == col_fechas.shape == col_horas.shape == (n,)):
+            raise ValueError('Las columnas de placas, fechas y horas deben ser unidimensionales y tener la misma longitud')
+
+        #Placas: XX-YYYY o XXX-YYYY con letras mayúsculas y dígitos ASCII
+        p, largo_p = cls.__matriz_codigos(col_placas, 8)
+        placa_valida = cls._validar_placas(p, largo_p)
+
+        #Fechas: AAAA-MM-DD que exista en el calendario
+        f, largo_f = cls.__matriz_codigos(col_fechas, 10)
+        digito = (f >= 48) & (f <= 57)
+        forma = ((largo_f == 10) & digito[:, 0:4].all(axis=1) & (f[:, 4] == 45) &
+                 digito[:, 5:7].all(axis=1) & (f[:, 7] == 45) & digito[:, 8:10].all(axis=1))
+        f = f - 48
+        año = f[:, 0] * 1000 + f[:, 1] * 100 + f[:, 2] * 10 + f[:, 3]
+        mes = f[:, 5] * 10 + f[:, 6]
+        dia = f[:, 8] * 10 + f[:, 9]
+        bisiesto = (año % 4 == 0) & ((año % 100 != 0) | (año % 400 == 0))
+        dias_mes = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])[np.clip(mes, 0, 12)]
+        dias_mes = dias_mes + ((mes == 2) & bisiesto)
+        fecha_valida = forma & (año >= 1) & (mes >= 1) & (mes <= 12) & (dia >= 1) & (dia <= dias_mes)
+        año = np.where(fecha_valida, año, 1970)
+        mes = np.where(fecha_valida, mes, 1)
+        dia = np.where(fecha_valida, dia, 1)
+        #Días desde 1970-01-01
+        ordinal = ((año - 1970) * 12 + mes - 1).astype('datetime64[M]').astype('datetime64[D]').astype(np.int64) + dia - 1
+
+        #Horas: HH:MM entre 00:00 y 23:59
+        h, largo_h = cls.__matriz_codigos(col_horas, 5)
+        digito = (h >= 48) & (h <= 57)
+        forma = ((largo_h == 5) & digito[:, 0] & digito[:, 1] & (h[:, 2] == 58) &
+                 digito[:, 3] & digito[:, 4])
+        h = h - 48
+        minutos_h = h[:, 0] * 10 + h[:, 1]
+        minutos_m = h[:, 3] * 10 + h[:, 4]
+        hora_valida = forma & (minutos_h <= 23) & (minutos_m <= 59)
+        minuto = minutos_h * 60 + minutos_m
+
+        valida = placa_valida & fecha_valida & hora_valida
+        placa = np.where(placa_valida[:, None], p[:, :8], 0)
+
+        #Las filas fuera del formato canónico se delegan a la validación escalar
+        errores = [None] * n
+        base = datetime.date(1970, 1, 1).toordinal()
+        for i in np.flatnonzero(~valida):
+            try:
+                registro = cls(placas[i], fechas[i], horas[i])
+            except ValueError as error:
+                errores[i] = str(error)
+                continue
+            valida[i] = True
+            placa[i] = list(registro.placa.encode('ascii').ljust(8, b'\0'))
+            ordinal[i] = registro._dia.toordinal() - base
+            minuto[i] = registro._minuto
+        return valida, placa, ordinal, minuto, errores
+
+    @classmethod
+    def __preparar_columnas(cls, valida, placa, dia, enlinea):
+        """
+        Calcula las columnas que no dependen del horario
+         Devoluciones
+         -------
+         Devuelve una tupla (feriado, exenta, ultimo) de arreglos: feriado con una sola consulta por
+         fecha válida distinta, exenta por la segunda letra o por tener dos letras y el último dígito
+        """
+        import numpy as np
+        #Feriados: una sola consulta por fecha distinta
+        instrumento = instrumentacion.activa
+        if instrumento is not None:
+            inicio = time.perf_counter()
+        feriado = np.zeros(len(dia), dtype=bool)
+        if valida.any():
+            fechas_unicas = np.unique(dia[valida])
+            base = datetime.date(1970, 1, 1).toordinal()
+            if enlinea:
+                #Las fechas distintas se consultan a la API de forma concurrente
+                fechas = [datetime.date.fromordinal(int(d) + base) for d in fechas_unicas]
+                feriados = [d for d, es_feriado in zip(fechas_unicas, _proveedor_enlinea().es_feriado_varios(fechas))
+                            if es_feriado]
+            else:
+                feriados = [d for d in fechas_unicas
+                            if cls.__es_vacaciones(datetime.date.fromordinal(int(d) + base), enlinea)]
+            if feriados:
+                feriado = np.isin(dia, feriados)
+        if instrumento is not None:
+            instrumento.registrar('lote.feriados', time.perf_counter() - inicio)
+
+        dos_letras = placa[:, 2] == 45
+        exenta = np.isin(placa[:, 1], [ord(c) for c in 'AUZEXM']) | dos_letras
+        ultimo = np.where(dos_letras, placa[:, 6], placa[:, 7]).astype(np.int64) - 48
+        return feriado, exenta, ultimo
+
+    @classmethod
+    def _evaluar_columnas(cls, valida, placa, dia, minuto, enlinea=False):
+        """
+        Evalúa Pico y Placa sobre columnas ya analizadas con _analizar_columnas
+         Parámetros
+         ----------
+         valida: numpy.ndarray
+             máscara de filas válidas
+         placa: numpy.ndarray
+             matriz (n, 8) de códigos ASCII de la placa
+         dia: numpy.ndarray
+             días desde 1970-01-01
+         minuto: numpy.ndarray
+             minutos desde la medianoche
+         enlinea: booleano, opcional
+             si en línea == Verdadero, se utilizará la API de días festivos abstractos (una consulta por fecha distinta)
+         Devoluciones
+         -------
+         Devuelve un arreglo booleano con True si el vehículo puede circular (False en las filas inválidas)
+        """
+        import numpy as np
+        dia = np.asarray(dia, dtype=np.int64)
+        minuto = np.asarray(minuto, dtype=np.int64)
+        feriado, exenta, ultimo = cls.__preparar_columnas(valida, placa, dia, enlinea)
+        #Hora pico y dígito restringido según el horario vigente en cada fecha
+        prohibido, restringido = tabla_horarios.evaluar_lote(dia, minuto, ultimo)
+
+        instrumento = instrumentacion.activa
+        if instrumento is not None:
+            #Motivos en el mismo orden en que predecir los comprueba
+            restante = valida.copy()
+            for motivo, mascara in (('feriado', feriado), ('exenta', exenta), ('fuera_de_pico', ~prohibido),
+                                    ('digito_permitido', ~restringido), ('restringido', restante)):
+                decididas = restante & mascara
+                instrumento.contar('decision.' + motivo, int(decididas.sum()))
+                restante &= ~decididas
+        return valida & (feriado | exenta | ~prohibido | ~restringido)
+
+    @classmethod
+    def predecir_lote(cls, placas, fechas, horas, enlinea=False):
+        """
+        Evalúa Pico y Placa sobre columnas completas de placas, fechas y horas.
+         Las columnas se validan y se analizan en una sola pasada; el día de la semana,
+         la hora pico y la restricción por último dígito se calculan como máscaras de NumPy.
+         Las filas que no tienen el formato canónico se validan con el constructor escalar,
+         por lo que el resultado es idéntico al de predecir() fila por fila.
+         Parámetros
+         ----------
+         placas: secuencia de str o numpy.ndarray
+             Placas con el formato XX-YYYY o XXX-YYYY
+         fechas: secuencia de str o numpy.ndarray
+             Fechas con el formato ISO 8601 AAAA-MM-DD
+         horas: secuencia de str o numpy.ndarray
+             Horas con el formato HH:MM
+         enlinea: booleano, opcional
+             si en línea == Verdadero, se utilizará la API de días festivos abstractos (una consulta por fecha distinta)
+         Devoluciones
+         -------
+         Devuelve una tupla (resultado, errores): resultado es un arreglo booleano con True si el vehículo
+         puede circular; errores es una lista con None o el mensaje de validación de cada fila inválida
+         (las filas inválidas quedan en False)
+         Aumenta
+         ------
+         ValorError
+             Si las columnas no son unidimensionales o no tienen la misma longitud
+        """
+        instrumento = instrumentacion.activa
+        if instrumento is None:
+            valida, placa, dia, minuto, errores = cls._analizar_columnas(placas, fechas, horas)
+            return cls._evaluar_columnas(valida, placa, dia, minuto, enlinea), errores
+        with instrumento.medir('lote.analizar'):
+            valida, placa, dia, minuto, errores = cls._analizar_columnas(placas, fechas, horas)
+        #Las filas inválidas ya se contaron en validacion.errores al pasar por el constructor
+        instrumento.contar('lote.filas', len(errores))
+        with instrumento.medir('lote.evaluar'):
+            resultado = cls._evaluar_columnas(valida, placa, dia, minuto, enlinea)
+        return resultado, errores
+
+    @classmethod
+    def predecir_horarios(cls, placas, fechas, horas, tablas, enlinea=False):
+        """
+        Evalúa las mismas columnas con varias tablas de horarios, por ejemplo para comparar
+         versiones de un horario. Las columnas se validan y analizan una sola vez y los feriados se
+         consultan una sola vez por fecha distinta; cada tabla solo agrega dos búsquedas por fila
+         en sus tablas de hora pico y de dígitos restringidos.
+         Parámetros
+         ----------
+         placas, fechas, horas: secuencia de str o numpy.ndarray
+             Columnas con los formatos XX-YYYY o XXX-YYYY, AAAA-MM-DD y HH:MM
+         tablas: secuencia de horarios.TablaHorarios
+             tablas de horarios a evaluar
+         enlinea: booleano, opcional
+             si en línea == Verdadero, se utilizará la API de días festivos abstractos (una consulta por fecha distinta)
+         Devoluciones
+         -------
+         Devuelve una tupla (resultados, errores): resultados es una matriz booleana (tablas, filas) cuya
+         fila i coincide con predecir_lote usando tablas[i]; errores es igual que en predecir_lote
+         Aumenta
+         ------
+         ValorError
+             Si las columnas no son unidimensionales o no tienen la misma longitud
+        """
+        import numpy as np
+        valida, placa, dia, minuto, errores = cls._analizar_columnas(placas, fechas, horas)
+        dia = np.asarray(dia, dtype=np.int64)
+        minuto = np.asarray(minuto, dtype=np.int64)
+        feriado, exenta, ultimo = cls.__preparar_columnas(valida, placa, dia, enlinea)
+        #Filas que circulan con cualquier horario
+        libre = feriado | exenta
+        resultados = np.empty((len(tablas), len(dia)), dtype=bool)
+        for i, tabla in enumerate(tablas):
+            prohibido, restringido = tabla.evaluar_lote(dia, minuto, ultimo)
+            np.logical_and(valida, libre | ~(prohibido & restringido), out=resultados[i])
+        return resultados, errores
+
+class ColeccionPicoPlaca:
+    """
+    Contenedor columnar y compacto de consultas de Pico y Placa.
+     Guarda cada consulta en un arreglo estructurado de NumPy de 14 bytes por registro:
+     la placa como bytes ASCII de ancho fijo (S8), la fecha como días desde 1970-01-01
+     (int32) y la hora como minutos desde la medianoche (int16). El arreglo se puede
+     serializar con pickle o guardar en un archivo .npy y proyectarlo en memoria.
+     ...
+     Atributos
+     ----------
+     registros: numpy.ndarray
+         arreglo estructurado con los campos CAMPOS (puede ser un numpy.memmap)
+     Métodos
+     -------
+     desde_columnas(cls, placas, fechas, horas):
+         Valida columnas de texto y construye la colección con las filas válidas
+     cargar(cls, ruta, mmap=True):
+         Carga una colección guardada con guardar()
+     guardar(self, ruta):
+         Guarda los registros en un archivo .npy
+     predecir(self, enlinea=False):
+         Devuelve un arreglo booleano con la predicción de cada registro
+    """
+    #Campos de cada registro (numpy.dtype)
+    CAMPOS = [('placa', 'S8'), ('dia', '<i4'), ('minuto', '<i2')]
+
+    def __init__(self, registros=None):
+        """
+        Construye la colección sobre un arreglo estructurado.
+         Parámetros
+         ----------
+         registros: numpy.ndarray, opcional
+             arreglo estructurado con los campos CAMPOS (el valor predeterminado es una colección vacía)
+        """
+        import numpy as np
+        if registros is None:
+            registros = np.zeros(0, dtype=self.CAMPOS)
+        if registros.dtype != np.dtype(self.CAMPOS):
+            raise ValueError('Los registros deben tener el tipo {}'.format(np.dtype(self.CAMPOS)))
+        self.registros = registros
+
+    @classmethod
+    def desde_columnas(cls, placas, fechas, horas):
+        """
+        Valida columnas de placas, fechas y horas y construye la colección
+         Parámetros
+         ----------
+         placas, fechas, horas: secuencia de str o numpy.ndarray
+             Columnas con los formatos XX-YYYY o XXX-YYYY, AAAA-MM-DD y HH:MM
+         Devoluciones
+         -------
+         Devuelve una tupla (coleccion, errores): la colección contiene las filas válidas en el
+         orden de entrada y errores es una lista con None o el mensaje de validación de cada fila
+        """
+        import numpy as np
+        valida, placa, dia, minuto, errores = PicoPlaca._analizar_columnas(placas, fechas, horas)
+        registros = np.zeros(int(valida.sum()), dtype=cls.CAMPOS)
+        registros['placa'] = placa[valida].astype(np.uint8).view('S8').ravel()
+        registros['dia'] = dia[valida]
+        registros['minuto'] = minuto[valida]
+        return cls(registros), errores
+
+    @classmethod
+    def cargar(cls, ruta, mmap=True):
+        """
+        Carga una colección guardada con guardar()
+         Parámetros
+         ----------
+         ruta: str
+             archivo .npy
+         mmap: booleano, opcional
+             si mmap == Verdadero, el archivo se proyecta en memoria en solo lectura (el valor predeterminado es Verdadero)
+        """
+        import numpy as np
+        return cls(np.load(ruta, mmap_mode='r' if mmap else None))
+
+    def guardar(self, ruta):
+        """
+        Guarda los registros en un archivo .npy
+         Parámetros
+         ----------
+         ruta: str
+             archivo de salida
+        """
+        import numpy as np
+        np.save(ruta, self.registros)
+
+    def __len__(self):
+        """Devuelve el número de registros"""
+        return len(self.registros)
+
+    def __getitem__(self, i):
+        """Devuelve el registro i como un objeto PicoPlaca, o una colección sobre los registros de un slice (sin copiarlos)"""
+        if isinstance(i, slice):
+            return type(self)(self.registros[i])
+        placa, dia, minuto = self.registros[i].tolist()
+        fecha = datetime.date(1970, 1, 1) + datetime.timedelta(days=dia)
+        return PicoPlaca(placa.decode('ascii'), fecha.isoformat(), '{:02d}:{:02d}'.format(*divmod(minuto, 60)))
+
+    def predecir(self, enlinea=False):
+        """
+        Evalúa Pico y Placa sobre todos los registros
+         Parámetros
+         ----------
+         enlinea: booleano, opcional
+             si en línea == Verdadero, se utilizará la API de días festivos abstractos (una consulta por fecha distinta)
+         Devoluciones
+         -------
+         Devuelve un arreglo booleano con True si el vehículo de cada registro puede circular
+        """
+        import numpy as np
+        placa = np.ascontiguousarray(self.registros['placa']).view(np.uint8).reshape(len(self.registros), 8)
+        return PicoPlaca._evaluar_columnas(np.ones(len(self.registros), dtype=bool), placa,
+                                           self.registros['dia'], self.registros['minuto'], enlinea)
+
+class ProcesadorLotes:
+    """
+    Procesa en flujo archivos CSV o JSONL de avistamientos de placas.
+     Lee la entrada por bloques, evalúa cada bloque con PicoPlaca.predecir_lote y escribe
+     un veredicto por línea, de modo que la memoria depende del tamaño del bloque y no del
+     archivo. Las filas inválidas se escriben en un flujo de rechazos en lugar de abortar.
+     La entrada CSV debe tener cabecera con las columnas placa, fecha y hora; cada línea
+     JSONL debe ser un objeto con esas claves.
+     ...
+     Atributos
+     ----------
+     formato: str
+         'csv' o 'jsonl'
+     tamaño_bloque: int
+         filas evaluadas por bloque
+     procesos: int
+         procesos que evalúan bloques en paralelo (1 evalúa en el proceso actual)
+     fragmento: tuple o None
+         (k, n) para procesar solo las filas cuyo número módulo n es k
+     enlinea: booleano
+         si en línea == Verdadero, se utilizará la API de días festivos abstractos
+     Métodos
+     -------
+     procesar(self, entrada, salida, rechazos=None):
+         Procesa todo el flujo de entrada y devuelve (filas, rechazadas, segundos)
+    """
+    COLUMNAS = ('placa', 'fecha', 'hora')
+
+    def __init__(self, formato='csv', tamaño_bloque=100000, procesos=1, fragmento=None, enlinea=False):
+        """
+        Construye el procesador.
+         Parámetros
+         ----------
+         formato: str, opcional
+             'csv' o 'jsonl' (el valor predeterminado es 'csv')
+         tamaño_bloque: int, opcional
+             filas evaluadas por bloque (el valor predeterminado es 100000)
+         procesos: int, opcional
+             procesos que evalúan bloques en paralelo (el valor predeterminado es 1)
+         fragmento: tuple, opcional
+             (k, n) para procesar solo las filas cuyo número módulo n es k (el valor predeterminado es None)
+         enlinea: booleano, opcional
+             si en línea == Verdadero, se utilizará la API de días festivos abstractos (el valor predeterminado es Falso)
+        """
+        if formato not in ('csv', 'jsonl'):
+            raise ValueError('El formato debe ser csv o jsonl')
+        if tamaño_bloque < 1 or procesos < 1:
+            raise ValueError('El tamaño de bloque y el número de procesos deben ser al menos 1')
+        if fragmento is not None and not 0 <= fragmento[0] < fragmento[1]:
+            raise ValueError('El fragmento debe cumplir 0 <= k < n')
+        self.formato = formato
+        self.tamaño_bloque = tamaño_bloque
+        self.procesos = procesos
+        self.fragmento = fragmento
+        self.enlinea = enlinea
+
+    def __filas(self, entrada):
+        """
+        Lee la entrada fila por fila
+         Devoluciones
+         -------
+         Genera tuplas (número de fila, placa, fecha, hora, error de lectura o None)
+        """
+        if self.formato == 'csv':
+            lector = csv.DictReader(entrada)
+            registros = ((numero, registro, None) for numero, registro in enumerate(lector, 1))
+        else:
+            registros = self.__registros_jsonl(entrada)
+        for numero, registro, error in registros:
+            if self.fragmento is not None and numero % self.fragmento[1] != self.fragmento[0]:
+                continue
+            if error is not None:
+                yield numero, '', '', '', error
+                continue
+            valores = []
+            for columna in self.COLUMNAS:
+                valor = registro.get(columna)
+                if valor is None:
+                    error = 'Falta la columna {}'.format(columna)
+                    valor = ''
+                valores.append(valor if isinstance(valor, str) else str(valor))
+            yield (numero, *valores, error)
+
+    @staticmethod
+    def __registros_jsonl(entrada):
+        """Genera (número de línea, objeto, error de lectura o None) por cada línea JSONL no vacía"""
+        for numero, linea in enumerate(entrada, 1):
+            if not linea.strip():
+                continue
+            try:
+                registro = json.loads(linea)
+                if not isinstance(registro, dict):
+                    raise ValueError('La línea debe ser un objeto JSON')
+            except ValueError as error:
+                yield numero, None, 'JSON inválido: {}'.format(error)
+                continue
+            yield numero, registro, None
+
+    def __bloques(self, entrada):
+        """Agrupa las filas de la entrada en listas de tamaño_bloque"""
+        bloque = []
+        for fila in self.__filas(entrada):
+            bloque.append(fila)
+            if len(bloque) == self.tamaño_bloque:
+                yield bloque
+                bloque = []
+        if bloque:
+            yield bloque
+
+    @staticmethod
+    def _evaluar_bloque(bloque, formato, enlinea):
+        """
+        Evalúa un bloque de filas; se ejecuta en el proceso actual o en un proceso del grupo
+         Devoluciones
+         -------
+         Devuelve (texto de veredictos, texto de rechazos, número de rechazos)
+        """
+        validas = [fila for fila in bloque if fila[4] is None]
+        resultado, errores = PicoPlaca.predecir_lote(
+            [fila[1] for fila in validas], [fila[2] for fila in validas], [fila[3] for fila in validas], enlinea)
+        salida = io.StringIO()
+        rechazos = io.StringIO()
+        rechazadas = [fila for fila in bloque if fila[4] is not None]
+        if formato == 'csv':
+            escritor_salida = csv.writer(salida, lineterminator='\n')
+            escritor_rechazos = csv.writer(rechazos, lineterminator='\n')
+        for fila, puede, error in zip(validas, resultado.tolist(), errores):
+            if error is not None:
+                rechazadas.append((*fila[:4], error))
+            elif formato == 'csv':
+                escritor_salida.writerow((*fila[1:4], 'true' if puede else 'false'))
+            else:
+                salida.write(json.dumps(dict(zip(ProcesadorLotes.COLUMNAS, fila[1:4]), puede_circular=puede),
+                                        ensure_ascii=False) + '\n')
+        rechazadas.sort()
+        for numero, placa, fecha, hora, error in rechazadas:
+            if formato == 'csv':
+                escritor_rechazos.writerow((numero, placa, fecha, hora, error))
+            else:
+                rechazos.write(json.dumps({'fila': numero, 'placa': placa, 'fecha': fecha, 'hora': hora,
+                                           'error': error}, ensure_ascii=False) + '\n')
+        return salida.getvalue(), rechazos.getvalue(), len(rechazadas)
+
+    def procesar(self, entrada, salida, rechazos=None):
+        """
+        Procesa todo el flujo de entrada
+         Parámetros
+         ----------
+         entrada: archivo de texto
+             flujo CSV o JSONL (abierto con newline='' si es CSV)
+         salida: archivo de texto
+             flujo donde se escribe un veredicto por línea
+         rechazos: archivo de texto, opcional
+             flujo donde se escriben las filas inválidas con su error (el valor predeterminado es None, se descartan)
+         Devoluciones
+         -------
+         Devuelve una tupla (filas leídas, filas rechazadas, segundos transcurridos)
+        """
+        inicio = time.perf_counter()
+        if self.formato == 'csv':
+            csv.writer(salida, lineterminator='\n').writerow((*self.COLUMNAS, 'puede_circular'))
+            if rechazos is not None:
+                csv.writer(rechazos, lineterminator='\n').writerow(('fila', *self.COLUMNAS, 'error'))
+        filas = rechazadas = 0
+        bloques = self.__bloques(entrada)
+        if self.procesos == 1:
+            resultados = (self._evaluar_bloque(bloque, self.formato, self.enlinea) + (len(bloque),)
+                          for bloque in bloques)
+            filas, rechazadas = self.__escribir(resultados, salida, rechazos)
+        else:
+            import multiprocessing
+            with multiprocessing.Pool(self.procesos) as grupo:
+                filas, rechazadas = self.__escribir(self.__en_paralelo(grupo, bloques), salida, rechazos)
+        return filas, rechazadas, time.perf_counter() - inicio
+
+    def __en_paralelo(self, grupo, bloques):
+        """Reparte los bloques entre los procesos con a lo sumo dos bloques pendientes por proceso, en orden"""
+        pendientes = deque()
+        for bloque in bloques:
+            pendientes.append((grupo.apply_async(self._evaluar_bloque, (bloque, self.formato, self.enlinea)), len(bloque)))
+            if len(pendientes) >= 2 * self.procesos:
+                tarea, largo = pendientes.popleft()
+                yield tarea.get() + (largo,)
+        while pendientes:
+            tarea, largo = pendientes.popleft()
+            yield tarea.get() + (largo,)
+
+    @staticmethod
+    def __escribir(resultados, salida, rechazos):
+        """Escribe los resultados de cada bloque y devuelve (filas, rechazadas)"""
+        filas = rechazadas = 0
+        for texto, texto_rechazos, numero_rechazos, largo in resultados:
+            salida.write(texto)
+            if rechazos is not None:
+                rechazos.write(texto_rechazos)
+            filas += largo
+            rechazadas += numero_rechazos
+        return filas, rechazadas
+
+def abrir_flujo(ruta, modo):
+    """
+    Abre un archivo de texto UTF-8 para el modo por lotes; '-' usa la entrada o salida estándar
+     Parámetros
+     ----------
+     ruta: str
+         ruta del archivo o '-'
+     modo: str
+         'r' para leer o 'w' para escribir
+    """
+    if ruta == '-':
+        ruta = (sys.stdin if modo == 'r' else sys.stdout).fileno()
+    return open(ruta, modo, encoding='utf-8', newline='', closefd=not isinstance(ruta, int))
+
 if __name__ == '__main__':
-    enlinea=False
+    analizador = argparse.ArgumentParser(description='Pico y Placa de Quito (ORDENANZA METROPOLITANA No. 0305)')
+    analizador.add_argument('--entrada', help="archivo CSV o JSONL a procesar por lotes ('-' para la entrada estándar); sin este argumento se pregunta por consola")
+    analizador.add_argument('--salida', default='-', help="archivo de veredictos (predeterminado '-', la salida estándar)")
+    analizador.add_argument('--rechazos', help='archivo donde se escriben las filas inválidas')
+    analizador.add_argument('--formato', choices=['csv', 'jsonl'], help='formato de la entrada y la salida (predeterminado según la extensión, o csv)')
+    analizador.add_argument('--tamano-bloque', type=int, default=100000, help='filas evaluadas por bloque (predeterminado 100000)')
+    analizador.add_argument('--procesos', type=int, default=1, help='procesos que evalúan bloques en paralelo (predeterminado 1)')
+    analizador.add_argument('--fragmento', help='K/N: procesa solo las filas cuyo número módulo N es K, para repartir la entrada entre varias ejecuciones')
+    analizador.add_argument('--enlinea', action='store_true', help='usa la API de días festivos abstractos')
+    analizador.add_argument('--cache-enlinea', help='archivo JSON donde se guardan las respuestas de la API (predeterminado, la variable de entorno VACACIONES_CACHE)')
+    analizador.add_argument('--indice', help='índice precalculado de feriados (indice_feriados.py construir); evita importar holidays')
+    analizador.add_argument('--instrumentar', action='store_true', help='escribe en la salida de errores los tiempos por etapa, los aciertos de la cache y los motivos de cada veredicto (con --procesos > 1 solo cuenta el proceso principal)')
+    analizador.add_argument('--horarios', help='archivo JSON de horarios con rangos de vigencia (horarios.py ejemplo); el predeterminado es la ORDENANZA 0305')
+    analizador.add_argument('--veredictos', help='base SQLite de veredictos compartida entre ejecuciones y procesos para las consultas individuales')
+    argumentos = analizador.parse_args()
+    enlinea = argumentos.enlinea
+    if argumentos.cache_enlinea:
+        from feriados_enlinea import ProveedorSincrono
+        usar_proveedor_enlinea(ProveedorSincrono(url=URL_VACACIONES, ruta_cache=argumentos.cache_enlinea))
+    if argumentos.instrumentar:
+        instrumentacion.activar()
+    if argumentos.horarios:
+        usar_horarios(horarios.TablaHorarios.cargar(argumentos.horarios))
+    if argumentos.veredictos:
+        veredictos.activar(veredictos.CacheVeredictos(argumentos.veredictos))
+
+    if argumentos.indice:
+        from indice_feriados import IndiceFeriados
+        cache_calendarios.usar_indice(IndiceFeriados.cargar(argumentos.indice))
+
+    if argumentos.entrada is not None:
+        formato = argumentos.formato or ('jsonl' if argumentos.entrada.endswith(('.jsonl', '.ndjson')) else 'csv')
+        fragmento = None
+        if argumentos.fragmento:
+            k, n = argumentos.fragmento.split('/')
+            fragmento = (int(k), int(n))
+        procesador = ProcesadorLotes(formato, argumentos.tamano_bloque, argumentos.procesos, fragmento, enlinea)
+        with abrir_flujo(argumentos.entrada, 'r') as entrada, abrir_flujo(argumentos.salida, 'w') as salida:
+            if argumentos.rechazos:
+                with abrir_flujo(argumentos.rechazos, 'w') as rechazos:
+                    filas, rechazadas, segundos = procesador.procesar(entrada, salida, rechazos)
+            else:
+                filas, rechazadas, segundos = procesador.procesar(entrada, salida)
+        print('{} filas ({} rechazadas) en {:.2f} s: {:.0f} filas/s'.format(
+            filas, rechazadas, segundos, filas / segundos if segundos else 0), file=sys.stderr)
+        if argumentos.instrumentar:
+            print(json.dumps(instrumentacion.activa.resumen(), indent=2, ensure_ascii=False), file=sys.stderr)
+        sys.exit(0)
+
     #Ingreso de datos lo que es la placa, fecha y hora... respectando los devidos formatos
     placa=input("Ingrese la placa por favor, la placa del vehiculo va asi: XXX-YYYY o XX-YYYY, donde X es una letra mayuscula e Y es un dígito: ")
     fecha=input("Ingrese la fecha por favor, la fecha a comprobar: AAAA-MM-DD: ")
@@ -455,4 +1616,8 @@ if __name__ == '__main__':
             'El vehículo con la placa {} NOPUEDE estra en la carrtera el {} a las {}.'.format(
                 placa,
                 fecha,
-                hora))
\ No newline at end of file
+                hora))
+    if argumentos.veredictos:
+        veredictos.desactivar().cerrar()
+    if argumentos.instrumentar:
+        print(json.dumps(instrumentacion.activa.resumen(), indent=2, ensure_ascii=False), file=sys.stderr)
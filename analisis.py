@@ -0,0 +1,241 @@
+#Proporciona clases para manipular fechas y horas.
+import datetime
+#Facilita la escritura de interfaces de línea de comandos amigables.
+import argparse
+#Escribe los resultados en CSV
+import csv
+#Sirve para el intercambio de datos
+import json
+#Reparte las tareas entre varios procesos
+import multiprocessing
+#Acceso a la salida estándar
+import sys
+#Mide el rendimiento del análisis
+import time
+
+import Lab4
+from Lab4 import MotorPicoPlaca
+
+#Motor de cada proceso del grupo, construido una sola vez por _iniciar_trabajador
+_motor = None
+
+#Campos de cada resultado, en el orden de MotorPicoPlaca.resumen_restricciones
+CAMPOS = ('dias_restringidos', 'feriados_laborables', 'minutos_restringidos', 'minutos_perdidos_feriados')
+
+
+def _iniciar_trabajador(restricciones, ventanas, provincia, tabla=None):
+    """Construye el motor del proceso; los feriados de cada año se generan una sola vez por proceso en cache_calendarios"""
+    global _motor
+    _motor = MotorPicoPlaca(restricciones, ventanas, provincia=provincia, tabla=tabla)
+
+
+def _evaluar_tarea(tarea):
+    """
+    Evalúa una tarea (año, dígito, primer día, último día) en el proceso actual
+     Devoluciones
+     -------
+     Devuelve (año, dígito, tupla con los CAMPOS)
+    """
+    año, digito, desde, hasta = tarea
+    return año, digito, _motor.resumen_restricciones(digito, desde, hasta)
+
+
+class AnalisisPicoPlaca:
+    """
+    Análisis de escenarios de Pico y Placa sobre muchos años y últimos dígitos.
+     Reparte el espacio (año × último dígito × fechas) en tareas que se evalúan en un grupo
+     de procesos. Las tareas se envían ordenadas por año, de modo que cada proceso genera
+     los feriados de un año una sola vez (cache_calendarios), y los resultados se acumulan por
+     (año, dígito) a medida que llegan, por lo que la memoria no crece con el número de tareas.
+     ...
+     Atributos
+     ----------
+     restricciones: dict o None
+         {día: últimos dígitos prohibidos}; sin restricciones ni ventanas rige el horario vigente de cada fecha
+     ventanas: iterable o None
+         ventanas de hora pico (inicio, fin) en minutos; sin restricciones ni ventanas rige el horario vigente de cada fecha
+     tabla: horarios.TablaHorarios o None
+         horarios con rangos de vigencia; None usa Lab4.tabla_horarios al ejecutar
+     provincia: str
+         codigo de provincia segun ISO3166-2 cuyos feriados se consideran
+     procesos: int
+         número de procesos; 1 evalúa en el proceso actual
+     dias_por_tarea: int
+         días de cada tarea; los años se parten en tareas de este tamaño
+     Métodos
+     -------
+     tareas(self, desde, hasta, digitos=range(10)):
+         Genera las tareas (año, dígito, primer día, último día)
+     ejecutar(self, desde, hasta, digitos=range(10)):
+         Devuelve los resultados por (año, dígito)
+     por_digito(resultados):
+         Suma los resultados de todos los años por dígito
+    """
+
+    def __init__(self, restricciones=None, ventanas=None, provincia='EC-P', procesos=None, dias_por_tarea=366, tabla=None):
+        """
+        Construye el análisis y valida la configuración con MotorPicoPlaca.
+         Parámetros
+         ----------
+         restricciones: dict, opcional
+             {día: últimos dígitos prohibidos} (sin restricciones ni ventanas, rige el horario vigente de cada fecha)
+         ventanas: iterable, opcional
+             ventanas (inicio, fin) en minutos, ambos extremos incluidos (sin restricciones ni ventanas, rige el horario vigente de cada fecha)
+         provincia: str, opcional
+             codigo de provincia segun ISO3166-2 (el valor predeterminado es EC-P)
+         procesos: int, opcional
+             número de procesos (el valor predeterminado es el número de núcleos)
+         dias_por_tarea: int, opcional
+             días de cada tarea (el valor predeterminado es 366, una tarea por año y dígito)
+         tabla: horarios.TablaHorarios, opcional
+             horarios con rangos de vigencia (el valor predeterminado es None, Lab4.tabla_horarios al ejecutar)
+         Aumenta
+         ------
+         ValorError
+             Si la configuración de MotorPicoPlaca no es válida o procesos o dias_por_tarea son menores que 1
+        """
+        MotorPicoPlaca(restricciones, ventanas, provincia=provincia, tabla=tabla)
+        procesos = multiprocessing.cpu_count() if procesos is None else procesos
+        if procesos < 1 or dias_por_tarea < 1:
+            raise ValueError('Los procesos y los días por tarea deben ser al menos 1')
+        self.restricciones = restricciones
+        self.ventanas = ventanas
+        self.provincia = provincia
+        self.procesos = procesos
+        self.dias_por_tarea = dias_por_tarea
+        self.tabla = tabla
+
+    def tareas(self, desde, hasta, digitos=range(10)):
+        """
+        Parte el espacio en tareas, ordenadas por año
+         Parámetros
+         ----------
+         desde: int
+             primer año
+         hasta: int
+             último año (incluido)
+         digitos: iterable de int, opcional
+             últimos dígitos a evaluar (el valor predeterminado son todos)
+         Devoluciones
+         -------
+         Genera tuplas (año, dígito, primer día, último día) con fechas datetime.date
+        """
+        digitos = sorted(set(digitos))
+        if any(not 0 <= d <= 9 for d in digitos):
+            raise ValueError('Los dígitos deben estar entre 0 y 9')
+        paso = datetime.timedelta(days=self.dias_por_tarea)
+        for año in range(desde, hasta + 1):
+            final = datetime.date(año, 12, 31)
+            for digito in digitos:
+                inicio = datetime.date(año, 1, 1)
+                while inicio <= final:
+                    yield año, digito, inicio, min(inicio + paso - datetime.timedelta(days=1), final)
+                    inicio += paso
+
+    def ejecutar(self, desde, hasta, digitos=range(10)):
+        """
+        Evalúa todas las tareas y acumula los resultados
+         Parámetros
+         ----------
+         desde: int
+             primer año
+         hasta: int
+             último año (incluido)
+         digitos: iterable de int, opcional
+             últimos dígitos a evaluar (el valor predeterminado son todos)
+         Devoluciones
+         -------
+         Devuelve un diccionario {(año, dígito): {campo: valor}} con los CAMPOS
+        """
+        if hasta < desde:
+            raise ValueError('El año final debe ser mayor o igual al año inicial')
+        digitos = sorted(set(digitos))
+        tareas = self.tareas(desde, hasta, digitos)
+        tabla = self.tabla
+        if tabla is None and self.restricciones is None and self.ventanas is None:
+            #Los procesos del grupo no heredan usar_horarios si no se crean con fork
+            tabla = Lab4.tabla_horarios
+        configuracion = (self.restricciones, self.ventanas, self.provincia, tabla)
+        resultados = {}
+        if self.procesos == 1:
+            _iniciar_trabajador(*configuracion)
+            self.__acumular(resultados, map(_evaluar_tarea, tareas))
+        else:
+            total = (hasta - desde + 1) * len(digitos) * -(-366 // self.dias_por_tarea)
+            #Bloques contiguos de tareas del mismo año para que cada proceso reutilice sus feriados
+            bloque = max(1, total // (self.procesos * 4))
+            with multiprocessing.Pool(self.procesos, _iniciar_trabajador, configuracion) as grupo:
+                self.__acumular(resultados, grupo.imap_unordered(_evaluar_tarea, tareas, bloque))
+        return {clave: dict(zip(CAMPOS, valores)) for clave, valores in sorted(resultados.items())}
+
+    @staticmethod
+    def __acumular(resultados, parciales):
+        """Suma los resultados parciales de cada tarea en resultados[(año, dígito)]"""
+        for año, digito, valores in parciales:
+            anterior = resultados.get((año, digito))
+            resultados[(año, digito)] = valores if anterior is None else tuple(a + b for a, b in zip(anterior, valores))
+
+    @staticmethod
+    def por_digito(resultados):
+        """
+        Suma los resultados de todos los años por dígito
+         Parámetros
+         ----------
+         resultados: dict
+             resultados de ejecutar()
+         Devoluciones
+         -------
+         Devuelve un diccionario {dígito: {campo: valor}}
+        """
+        totales = {}
+        for (año, digito), valores in sorted(resultados.items()):
+            total = totales.setdefault(digito, dict.fromkeys(CAMPOS, 0))
+            for campo in CAMPOS:
+                total[campo] += valores[campo]
+        return totales
+
+
+if __name__ == '__main__':
+    analizador = argparse.ArgumentParser(
+        description='Horas de Pico y Placa por último dígito y horas liberadas por feriados en días laborables')
+    analizador.add_argument('--desde', type=int, default=2016, help='primer año (predeterminado 2016)')
+    analizador.add_argument('--hasta', type=int, default=2040, help='último año (predeterminado 2040)')
+    analizador.add_argument('--digitos', type=int, nargs='+', default=list(range(10)), help='últimos dígitos (predeterminado 0-9)')
+    analizador.add_argument('--provincia', default='EC-P', help='provincia cuyos feriados se consideran (predeterminado EC-P)')
+    analizador.add_argument('--procesos', type=int, help='procesos (predeterminado, el número de núcleos)')
+    analizador.add_argument('--dias-por-tarea', type=int, default=366, help='días por tarea (predeterminado 366)')
+    analizador.add_argument('--por-anio', action='store_true', help='una fila por año y dígito en lugar de los totales por dígito')
+    analizador.add_argument('--formato', choices=['csv', 'json'], default='csv', help='formato de salida (predeterminado csv)')
+    analizador.add_argument('--indice', help='índice precalculado de feriados (indice_feriados.py construir)')
+    analizador.add_argument('--horarios', help='archivo JSON de horarios con rangos de vigencia (horarios.py ejemplo); el predeterminado es la ORDENANZA 0305')
+    argumentos = analizador.parse_args()
+
+    if argumentos.indice:
+        from Lab4 import cache_calendarios
+        from indice_feriados import IndiceFeriados
+        cache_calendarios.usar_indice(IndiceFeriados.cargar(argumentos.indice))
+    if argumentos.horarios:
+        from horarios import TablaHorarios
+        Lab4.usar_horarios(TablaHorarios.cargar(argumentos.horarios))
+    analisis = AnalisisPicoPlaca(provincia=argumentos.provincia, procesos=argumentos.procesos,
+                                 dias_por_tarea=argumentos.dias_por_tarea)
+    inicio = time.perf_counter()
+    resultados = analisis.ejecutar(argumentos.desde, argumentos.hasta, argumentos.digitos)
+    segundos = time.perf_counter() - inicio
+    if argumentos.por_anio:
+        filas = [dict(año=año, digito=digito, **valores) for (año, digito), valores in resultados.items()]
+    else:
+        filas = [dict(digito=digito, **valores) for digito, valores in AnalisisPicoPlaca.por_digito(resultados).items()]
+    for fila in filas:
+        fila['horas_restringidas'] = fila['minutos_restringidos'] / 60
+        fila['horas_perdidas_feriados'] = fila['minutos_perdidos_feriados'] / 60
+    if argumentos.formato == 'json':
+        json.dump(filas, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        escritor = csv.DictWriter(sys.stdout, list(filas[0]) if filas else [], lineterminator='\n')
+        escritor.writeheader()
+        escritor.writerows(filas)
+    print('{} años x {} dígitos en {:.2f} s con {} proceso(s)'.format(
+        argumentos.hasta - argumentos.desde + 1, len(set(argumentos.digitos)), segundos, analisis.procesos),
+        file=sys.stderr)
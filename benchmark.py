@@ -0,0 +1,398 @@
+#Proporciona clases para manipular fechas y horas.
+import datetime
+#Facilita la escritura de interfaces de línea de comandos amigables.
+import argparse
+#Ejecuta el proveedor asíncrono de feriados
+import asyncio
+#Desactiva el recolector de basura durante las mediciones, como timeit
+import gc
+#Sirve para el intercambio de datos
+import json
+#Describe la máquina en los resultados
+import platform
+#Genera consultas reproducibles a partir de una semilla
+import random
+#Numera las versiones de las reglas enmendadas
+import itertools
+#Permite devolver un código de salida desde la línea de comandos
+import sys
+#Mide el tiempo de importación de Lab4 en un intérprete nuevo
+import subprocess
+#Corre el servidor local de prueba en segundo plano
+import threading
+#Mide el tiempo de cada prueba
+import time
+#Carpeta del repositorio, desde donde se importa Lab4 en los intérpretes nuevos
+import os
+#Actualiza el bytecode de los módulos antes de medir su importación
+import compileall
+#Servidor HTTP local que imita la API de días festivos abstractos
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+import Lab4
+import instrumentacion
+import veredictos
+from Lab4 import PicoPlaca, MotorPicoPlaca, ColeccionPicoPlaca, cache_calendarios
+from feriados_ecuador import FeriadoEcuador
+from reglas_feriados import reglas_feriados, ReglasFeriados, FeriadoFijo, MAY
+from feriados_enlinea import ProveedorFeriadosEnLinea, ProveedorSincrono
+from analisis import AnalisisPicoPlaca
+from horarios import Horario, TablaHorarios, ORDENANZA_0305, DIAS
+from columnas import predecir_columnas
+
+#Primeras letras de placa por provincia; Pichincha y Guayas concentran la mayor parte del parque
+LETRAS_PROVINCIA = 'ABCEGHIJKLMNOPQRSTUVWXYZ'
+PESOS_PROVINCIA = [2 if letra not in 'PG' else 40 if letra == 'P' else 20 for letra in LETRAS_PROVINCIA]
+
+#Módulos que no deben cargarse al importar Lab4
+MODULOS_PESADOS = ('numpy', 'requests', 'aiohttp', 'holidays', 'dateutil', 'multiprocessing')
+
+#Aumento relativo permitido en las pruebas que dependen de otros procesos, del disco o de la red local,
+#cuya variación entre ejecuciones supera la tolerancia general
+TOLERANCIAS = {
+    'inicio.importar_lab4': 0.5,
+    'analisis.año_digito': 0.5,
+    'enlinea.predecir': 0.5,
+    'enlinea.proveedor_asincrono': 0.5}
+
+
+def generar_consultas(n, semilla=2021):
+    """
+    Genera consultas con una distribución parecida a la de las cámaras de Quito
+     El 95% de las placas tiene tres letras, las fechas se reparten entre 2016 y 2025 y
+     el 60% de las horas cae dentro de las horas pico.
+     Parámetros
+     ----------
+     n: int
+         número de consultas
+     semilla: int, opcional
+         semilla del generador (el valor predeterminado es 2021)
+     Devoluciones
+     -------
+     Devuelve tres listas (placas, fechas, horas)
+    """
+    azar = random.Random(semilla)
+    primeras = azar.choices(LETRAS_PROVINCIA, PESOS_PROVINCIA, k=n)
+    placas, fechas, horas = [], [], []
+    inicio = datetime.date(2016, 1, 1).toordinal()
+    dias = datetime.date(2025, 12, 31).toordinal() - inicio + 1
+    for primera in primeras:
+        letras = primera + azar.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+        if azar.random() < 0.95:
+            letras += azar.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+        placas.append('{}-{:04d}'.format(letras, azar.randrange(10000)))
+        fechas.append(datetime.date.fromordinal(inicio + azar.randrange(dias)).isoformat())
+        if azar.random() < 0.6:
+            inicio_pico, fin_pico = azar.choice(MotorPicoPlaca.VENTANAS_PICO)
+            minuto = azar.randint(inicio_pico, fin_pico)
+        else:
+            minuto = azar.randrange(24 * 60)
+        horas.append('{:02d}:{:02d}'.format(*divmod(minuto, 60)))
+    return placas, fechas, horas
+
+
+class ServidorPrueba:
+    """
+    Servidor HTTP local que imita la API de días festivos abstractos.
+     Responde el 1 de enero y el 25 de diciembre como feriados, el Jueves Santo de 2021
+     como 'Maundy Thursday' y cualquier otra fecha con una lista vacía.
+     ...
+     Atributos
+     ----------
+     url: str
+         dirección del servidor, para Lab4.URL_VACACIONES o ProveedorFeriadosEnLinea
+    """
+
+    class _Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            consulta = dict(p.split('=', 1) for p in self.path.split('?', 1)[-1].split('&') if '=' in p)
+            mes_dia = (consulta.get('month'), consulta.get('day'))
+            if mes_dia in (('01', '01'), ('12', '25')):
+                cuerpo = [{'name': 'Holiday', 'country': 'EC'}]
+            elif mes_dia == ('04', '01') and consulta.get('year') == '2021':
+                cuerpo = [{'name': 'Maundy Thursday', 'country': 'EC'}]
+            else:
+                cuerpo = []
+            datos = json.dumps(cuerpo).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+
+        def log_message(self, *argumentos):
+            pass
+
+    def __enter__(self):
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', 0), self._Manejador)
+        self._servidor.daemon_threads = True
+        self.url = 'http://127.0.0.1:{}/v1/'.format(self._servidor.server_address[1])
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *excepcion):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+
+def medir(funcion, operaciones, repeticiones):
+    """
+    Mide una función varias veces y se queda con la repetición más rápida;
+     el recolector de basura se desactiva durante cada medición
+     Parámetros
+     ----------
+     funcion: función
+         función sin argumentos a medir
+     operaciones: int
+         operaciones que realiza cada llamada a la función
+     repeticiones: int
+         número de veces que se llama a la función
+     Devoluciones
+     -------
+     Devuelve un diccionario con los nanosegundos por operación y las operaciones por segundo
+    """
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        gc.collect()
+        gc.disable()
+        try:
+            inicio = time.perf_counter()
+            funcion()
+            mejor = min(mejor, time.perf_counter() - inicio)
+        finally:
+            gc.enable()
+    return {'ns_por_op': mejor / operaciones * 1e9, 'ops_por_s': operaciones / mejor, 'operaciones': operaciones}
+
+
+def medir_importacion(repeticiones):
+    """
+    Mide el tiempo de importar Lab4 en un intérprete nuevo con python -X importtime
+     Parámetros
+     ----------
+     repeticiones: int
+         número de intérpretes lanzados; se queda con la medición más rápida
+     Devoluciones
+     -------
+     Devuelve un diccionario con los nanosegundos de la importación y la lista de
+     MODULOS_PESADOS que se cargaron
+    """
+    carpeta = os.path.dirname(os.path.abspath(__file__))
+    #Con PYTHONDONTWRITEBYTECODE, un .pyc desactualizado haría medir la compilación del código fuente
+    compileall.compile_dir(carpeta, maxlevels=0, quiet=1)
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        proceso = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c',
+             'import sys, Lab4; print(",".join(sorted(m for m in {!r} if m in sys.modules)))'.format(MODULOS_PESADOS)],
+            capture_output=True, text=True, check=True, cwd=carpeta)
+        for linea in proceso.stderr.splitlines():
+            columnas = linea.split('|')
+            if len(columnas) == 3 and columnas[2].strip() == 'Lab4':
+                mejor = min(mejor, int(columnas[1]) * 1000)
+        pesados = [m for m in proceso.stdout.strip().split(',') if m]
+    return {'ns_por_op': mejor, 'ops_por_s': 1e9 / mejor, 'operaciones': 1, 'modulos_pesados': pesados}
+
+
+def pruebas(n_escalar, n_lote, n_enlinea):
+    """
+    Arma las pruebas de rendimiento
+     Devoluciones
+     -------
+     Genera tuplas (nombre, función, operaciones por llamada)
+    """
+    años = range(1990, 2101)
+
+    def poblacion():
+        #Sin las evaluaciones guardadas de reglas_feriados, para medir la evaluación de las reglas
+        reglas_feriados.limpiar()
+        for año in años:
+            FeriadoEcuador(provincia='EC-P', expand=False)._poblacion(año)
+    yield 'feriados.poblacion_por_año', poblacion, len(años)
+
+    yield 'feriados.construccion', lambda: FeriadoEcuador(provincia='EC-P', years=2021), 1
+
+    #Enmienda del día del trabajo con 111 años conocidos: solo se reevalúa esa regla
+    registro = ReglasFeriados(reglas_feriados.reglas())
+    for año in años:
+        registro.provinciales('EC-P', año)
+    versiones = itertools.count(2)
+
+    def enmendar():
+        registro.enmendar(FeriadoFijo('trabajo', MAY, 1, 'Día Nacional del Trabajo [Día del laborador]',
+                                      trasladable=True, version=next(versiones), desde=2016))
+    yield 'reglas.enmendar', enmendar, len(años)
+
+    calendario = FeriadoEcuador(provincia='EC-P', years=2021)
+    dias = [datetime.date(2021, 1, 1) + datetime.timedelta(days=d) for d in range(365)]
+    yield 'feriados.pertenencia', lambda: [d in calendario for d in dias], len(dias)
+
+    cache_calendarios.es_feriado('EC-P', dias[0])
+    yield 'cache.es_feriado', lambda: [cache_calendarios.es_feriado('EC-P', d) for d in dias], len(dias)
+
+    placas, fechas, horas = generar_consultas(n_escalar)
+    filas = list(zip(placas, fechas, horas))
+    for fecha in set(fechas):
+        cache_calendarios.es_feriado('EC-P', datetime.date.fromisoformat(fecha))
+    yield 'picoplaca.construccion', lambda: [PicoPlaca(*fila) for fila in filas], len(filas)
+
+    objetos = [PicoPlaca(*fila) for fila in filas]
+    yield 'picoplaca.predecir', lambda: [objeto.predecir() for objeto in objetos], len(objetos)
+
+    def predecir_instrumentado():
+        instrumentacion.activar()
+        try:
+            [objeto.predecir() for objeto in objetos]
+        finally:
+            instrumentacion.desactivar()
+    yield 'picoplaca.predecir_instrumentado', predecir_instrumentado, len(objetos)
+
+    def con_veredictos(consultas):
+        #La cache se llena antes de medir: cada consulta medida es un acierto
+        cache = veredictos.CacheVeredictos()
+        veredictos.activar(cache)
+        try:
+            [objeto.predecir() for objeto in consultas]
+        finally:
+            veredictos.desactivar()
+
+        def predecir():
+            veredictos.activar(cache)
+            try:
+                [objeto.predecir() for objeto in consultas]
+            finally:
+                veredictos.desactivar()
+        return predecir
+    yield 'picoplaca.predecir_veredictos', con_veredictos(objetos), len(objetos)
+
+    motor = MotorPicoPlaca()
+    yield 'motor.puede_circular', lambda: [motor.puede_circular(*fila) for fila in filas], len(filas)
+
+    placas, fechas, horas = generar_consultas(n_lote, semilla=2022)
+    yield 'lote.predecir_lote', lambda: PicoPlaca.predecir_lote(placas, fechas, horas), n_lote
+
+    #Mil versiones históricas que se solapan (cada una rige tres años desde su inicio semanal)
+    inicio = datetime.date(2000, 1, 1)
+    historicas = TablaHorarios(
+        Horario('historico', {dia: [(i + d) % 10, (i + d + 1) % 10] for d, dia in enumerate(DIAS[:5])},
+                [(7 * 60, 9 * 60 + 30), (16 * 60, 19 * 60 + 30)], inicio + datetime.timedelta(days=7 * i),
+                inicio + datetime.timedelta(days=7 * i + 3 * 365), version=i)
+        for i in range(1000))
+    consultadas = [datetime.date.fromisoformat(fecha) for fecha in fechas[:n_escalar]]
+    yield 'horarios.vigente', lambda: [historicas.vigente(fecha) for fecha in consultadas], len(consultadas)
+
+    #Cuatro horarios sobre el mismo lote, por fila y horario
+    emergencia = Horario('hoy-no-circula', {dia: list(range(10)) for dia in DIAS[:5]}, [(6 * 60, 20 * 60)],
+                         datetime.date(2020, 3, 17), datetime.date(2020, 6, 30))
+    tablas = [TablaHorarios([ORDENANZA_0305]), TablaHorarios([ORDENANZA_0305, emergencia]), historicas,
+              TablaHorarios([emergencia])]
+    yield 'lote.predecir_horarios', lambda: PicoPlaca.predecir_horarios(placas, fechas, horas, tablas), n_lote * len(tablas)
+
+    coleccion, _ = ColeccionPicoPlaca.desde_columnas(placas, fechas, horas)
+    yield 'coleccion.predecir', coleccion.predecir, len(coleccion)
+
+    #Columnas binarias tal como llegan de Arrow: placas S8, fechas date32 y minutos int16
+    registros = coleccion.registros
+    columnas = (registros['placa'].copy(), registros['dia'].astype(np.int32), registros['minuto'].astype(np.int16))
+    yield 'columnas.predecir', lambda: predecir_columnas(*columnas), len(coleccion)
+
+    analisis = AnalisisPicoPlaca(procesos=1)
+    yield 'analisis.año_digito', lambda: analisis.ejecutar(2016, 2040), 25 * 10
+
+    if n_enlinea:
+        placas, fechas, horas = generar_consultas(n_enlinea, semilla=2023)
+        enlinea = [PicoPlaca(*fila, enlinea=True) for fila in zip(placas, fechas, horas)]
+        yield 'enlinea.predecir', lambda: [objeto.predecir() for objeto in enlinea], len(enlinea)
+        yield 'enlinea.predecir_veredictos', con_veredictos(enlinea), len(enlinea)
+
+        distintas = sorted({datetime.date.fromisoformat(fecha) for fecha in fechas})
+
+        async def consultar():
+            async with ProveedorFeriadosEnLinea('prueba', url=Lab4.URL_VACACIONES, tasa=1e6, rafaga=1000) as proveedor:
+                await proveedor.es_feriado_varios(distintas)
+        yield 'enlinea.proveedor_asincrono', lambda: asyncio.run(consultar()), len(distintas)
+
+
+def comparar(resultados, base, tolerancia):
+    """
+    Compara los resultados con una base guardada
+     Parámetros
+     ----------
+     resultados: dict
+         resultados de esta ejecución
+     base: dict
+         resultados guardados
+     tolerancia: float
+         aumento relativo permitido en ns por operación (0.25 = 25%); las pruebas de TOLERANCIAS
+         usan la mayor entre esta y la suya
+     Devoluciones
+     -------
+     Devuelve la lista de tuplas (nombre, ns base, ns actual) de las pruebas que empeoraron
+    """
+    regresiones = []
+    for nombre, medicion in resultados['resultados'].items():
+        anterior = base['resultados'].get(nombre)
+        permitido = max(tolerancia, TOLERANCIAS.get(nombre, 0))
+        if anterior is not None and medicion['ns_por_op'] > anterior['ns_por_op'] * (1 + permitido):
+            regresiones.append((nombre, anterior['ns_por_op'], medicion['ns_por_op']))
+    return regresiones
+
+
+if __name__ == '__main__':
+    analizador = argparse.ArgumentParser(description='Pruebas de rendimiento de Lab4')
+    analizador.add_argument('--salida', help='archivo JSON donde se guardan los resultados')
+    analizador.add_argument('--agregar', action='store_true', help='con --salida existente, solo agrega las pruebas que faltan y conserva las demás mediciones')
+    analizador.add_argument('--comparar', help='archivo JSON de base; termina con código 1 si alguna prueba empeora')
+    analizador.add_argument('--tolerancia', type=float, default=0.25, help='aumento relativo permitido (predeterminado 0.25; ver TOLERANCIAS)')
+    analizador.add_argument('--repeticiones', type=int, default=5, help='repeticiones por prueba (predeterminado 5)')
+    analizador.add_argument('--filtro', help='solo corre las pruebas cuyo nombre contiene este texto')
+    analizador.add_argument('--escalar', type=int, default=2000, help='consultas de las pruebas escalares (predeterminado 2000)')
+    analizador.add_argument('--lote', type=int, default=200000, help='consultas de las pruebas por lotes (predeterminado 200000)')
+    analizador.add_argument('--enlinea', type=int, default=50, help='consultas de las pruebas en línea; 0 las omite (predeterminado 50)')
+    argumentos = analizador.parse_args()
+
+    resultados = {
+        'entorno': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'plataforma': platform.platform(),
+            'fecha': datetime.datetime.now().isoformat(timespec='seconds')},
+        'resultados': {}}
+    if not argumentos.filtro or argumentos.filtro in 'inicio.importar_lab4':
+        medicion = medir_importacion(argumentos.repeticiones)
+        resultados['resultados']['inicio.importar_lab4'] = medicion
+        print('{:32} {:14.1f} ns/op {:>14}'.format('inicio.importar_lab4', medicion['ns_por_op'],
+                                                   ','.join(medicion['modulos_pesados']) or '-'))
+    with ServidorPrueba() as servidor:
+        Lab4.URL_VACACIONES = servidor.url
+        #Sin el límite de la versión gratuita: el servidor de prueba es local
+        Lab4.usar_proveedor_enlinea(ProveedorSincrono(url=servidor.url, tasa=1e6, rafaga=1000))
+        for nombre, funcion, operaciones in pruebas(argumentos.escalar, argumentos.lote, argumentos.enlinea):
+            if argumentos.filtro and argumentos.filtro not in nombre:
+                continue
+            medicion = medir(funcion, operaciones, argumentos.repeticiones)
+            resultados['resultados'][nombre] = medicion
+            print('{:32} {:14.1f} ns/op {:14.0f} op/s'.format(nombre, medicion['ns_por_op'], medicion['ops_por_s']))
+
+    if argumentos.salida:
+        guardados = resultados
+        if argumentos.agregar and os.path.exists(argumentos.salida):
+            #Las mediciones de la base no se vuelven a grabar; cambiarlas es una actualización aparte de la base
+            with open(argumentos.salida, encoding='utf-8') as archivo:
+                guardados = json.load(archivo)
+            for nombre, medicion in resultados['resultados'].items():
+                guardados['resultados'].setdefault(nombre, medicion)
+        with open(argumentos.salida, 'w', encoding='utf-8') as archivo:
+            json.dump(guardados, archivo, indent=2, ensure_ascii=False)
+    if argumentos.comparar:
+        with open(argumentos.comparar, encoding='utf-8') as archivo:
+            base = json.load(archivo)
+        regresiones = comparar(resultados, base, argumentos.tolerancia)
+        for nombre, anterior, actual in regresiones:
+            print('REGRESION {}: {:.1f} -> {:.1f} ns/op (+{:.0%})'.format(nombre, anterior, actual, actual / anterior - 1),
+                  file=sys.stderr)
+        pesados = resultados['resultados'].get('inicio.importar_lab4', {}).get('modulos_pesados')
+        if pesados:
+            print('REGRESION importar Lab4 carga {}'.format(', '.join(pesados)), file=sys.stderr)
+        sys.exit(1 if regresiones or pesados else 0)
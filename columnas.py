@@ -0,0 +1,231 @@
+#Proporciona clases para manipular fechas y horas.
+import datetime
+
+from Lab4 import PicoPlaca
+
+#numpy se importa al evaluar el primer lote y pyarrow solo si las columnas son de pyarrow
+
+#Ordinal de 1970-01-01, origen de date32
+EPOCA = datetime.date(1970, 1, 1).toordinal()
+
+#Primer y último día que acepta predecir (años 1 a 9999), en días desde 1970-01-01
+DIA_MINIMO = datetime.date.min.toordinal() - EPOCA
+DIA_MAXIMO = datetime.date.max.toordinal() - EPOCA
+
+#Unidades de las horas enteras, en unidades por minuto
+UNIDADES = {'min': 1, 's': 60, 'ms': 60 * 10 ** 3, 'us': 60 * 10 ** 6, 'ns': 60 * 10 ** 9}
+
+
+def _arrow(columna):
+    """Devuelve la columna como pyarrow.Array si es de pyarrow (uniendo los trozos), o None"""
+    if not type(columna).__module__.startswith('pyarrow'):
+        return None
+    import pyarrow as pa
+    if isinstance(columna, pa.ChunkedArray):
+        #Con un solo trozo no se copia nada
+        columna = columna.chunk(0) if columna.num_chunks == 1 else columna.combine_chunks()
+    return columna
+
+
+def _validez_arrow(arreglo):
+    """Devuelve la máscara de valores no nulos de un pyarrow.Array a partir de su mapa de bits"""
+    import numpy as np
+    mapa = arreglo.buffers()[0]
+    if mapa is None or arreglo.null_count == 0:
+        return np.ones(len(arreglo), dtype=bool)
+    bits = np.unpackbits(np.frombuffer(mapa, dtype=np.uint8), bitorder='little')
+    return bits[arreglo.offset:arreglo.offset + len(arreglo)].astype(bool)
+
+
+def _valores_arrow(arreglo, tipo, extra=0):
+    """
+    Devuelve sin copiar los valores de ancho fijo de un pyarrow.Array como numpy.ndarray
+     Con extra=1 lee los len + 1 desplazamientos de un arreglo de ancho variable
+    """
+    import numpy as np
+    valores = np.frombuffer(arreglo.buffers()[1], dtype=tipo, count=arreglo.offset + len(arreglo) + extra)
+    return valores[arreglo.offset:]
+
+
+def _placas(columna):
+    """
+    Convierte la columna de placas en una matriz (n, 8) de bytes ASCII
+     Devoluciones
+     -------
+     Devuelve una tupla (placa, valida) con la matriz y la máscara de placas válidas (no nulas,
+     con el formato XX-YYYY o XXX-YYYY y relleno de ceros a la derecha)
+    """
+    import numpy as np
+    arreglo = _arrow(columna)
+    valida = None
+    if arreglo is not None:
+        import pyarrow as pa
+        valida = _validez_arrow(arreglo)
+        if pa.types.is_fixed_size_binary(arreglo.type):
+            ancho = arreglo.type.byte_width
+            bytes_ = np.frombuffer(arreglo.buffers()[1], dtype=np.uint8, count=(arreglo.offset + len(arreglo)) * ancho)
+            matriz = bytes_.reshape(-1, ancho)[arreglo.offset:]
+        elif (pa.types.is_binary(arreglo.type) or pa.types.is_string(arreglo.type) or
+              pa.types.is_large_binary(arreglo.type) or pa.types.is_large_string(arreglo.type)):
+            #Ancho variable: se arma la matriz con los desplazamientos, sin pasar por objetos de Python
+            grande = pa.types.is_large_binary(arreglo.type) or pa.types.is_large_string(arreglo.type)
+            desplazamientos = _valores_arrow(arreglo, np.int64 if grande else np.int32, extra=1)
+            largo = np.diff(desplazamientos)
+            datos = arreglo.buffers()[2]
+            datos = np.frombuffer(datos, dtype=np.uint8) if datos is not None else np.zeros(0, dtype=np.uint8)
+            columnas = np.arange(8)
+            dentro = columnas < np.minimum(largo, 8)[:, None]
+            posicion = np.clip(desplazamientos[:-1, None] + columnas, 0, max(len(datos) - 1, 0))
+            matriz = np.where(dentro, datos[posicion] if len(datos) else 0, 0).astype(np.uint8)
+            valida &= largo <= 8
+        else:
+            raise ValueError('Las placas deben ser binary, string o fixed_size_binary, no {}'.format(arreglo.type))
+    else:
+        matriz = np.asarray(columna)
+        if matriz.dtype.kind == 'S' and matriz.ndim == 1:
+            matriz = np.ascontiguousarray(matriz).view(np.uint8).reshape(len(matriz), matriz.dtype.itemsize)
+        elif matriz.dtype != np.uint8 or matriz.ndim != 2:
+            raise ValueError('Las placas deben ser bytes de ancho fijo (dtype S) o una matriz (n, ancho) de uint8')
+    n, ancho = matriz.shape
+    if ancho < 8:
+        matriz = np.concatenate([matriz, np.zeros((n, 8 - ancho), dtype=np.uint8)], axis=1)
+    #El relleno de ceros no forma parte de la placa y debe llegar hasta el final
+    cero = matriz == 0
+    largo = np.where(cero.any(axis=1), cero.argmax(axis=1), matriz.shape[1])
+    resto = np.arange(matriz.shape[1]) >= largo[:, None]
+    formato = PicoPlaca._validar_placas(matriz, largo) & ~(resto & ~cero).any(axis=1)
+    valida = formato if valida is None else valida & formato
+    return matriz[:, :8], valida
+
+
+def _dias(columna):
+    """
+    Convierte la columna de fechas en días desde 1970-01-01
+     Devoluciones
+     -------
+     Devuelve una tupla (dia, valida) con los días (int64) y la máscara de fechas no nulas entre los años 1 y 9999
+    """
+    import numpy as np
+    arreglo = _arrow(columna)
+    valida = None
+    if arreglo is not None:
+        import pyarrow as pa
+        valida = _validez_arrow(arreglo)
+        if pa.types.is_date32(arreglo.type):
+            dia = _valores_arrow(arreglo, np.int32).astype(np.int64)
+        elif pa.types.is_date64(arreglo.type):
+            dia = _valores_arrow(arreglo, np.int64) // (24 * 60 * 60 * 1000)
+        else:
+            raise ValueError('Las fechas deben ser date32 o date64, no {}'.format(arreglo.type))
+    else:
+        dia = np.asarray(columna)
+        if dia.dtype.kind == 'M':
+            dia = dia.astype('datetime64[D]').view(np.int64)
+        elif dia.dtype.kind not in 'iu':
+            raise ValueError('Las fechas deben ser enteros date32 (días desde 1970-01-01) o datetime64')
+        dia = dia.astype(np.int64)
+    rango = (dia >= DIA_MINIMO) & (dia <= DIA_MAXIMO)
+    return dia, rango if valida is None else valida & rango
+
+
+def _minutos(columna, unidad):
+    """
+    Convierte la columna de horas del día en minutos desde la medianoche
+     Devoluciones
+     -------
+     Devuelve una tupla (minuto, valida) con los minutos (int64) y la máscara de horas no nulas dentro del día
+    """
+    import numpy as np
+    arreglo = _arrow(columna)
+    valida = None
+    if arreglo is not None:
+        import pyarrow as pa
+        valida = _validez_arrow(arreglo)
+        if pa.types.is_time32(arreglo.type) or pa.types.is_time64(arreglo.type):
+            unidad = arreglo.type.unit
+            valor = _valores_arrow(arreglo, np.int32 if pa.types.is_time32(arreglo.type) else np.int64)
+        elif pa.types.is_integer(arreglo.type):
+            valor = _valores_arrow(arreglo, arreglo.type.to_pandas_dtype())
+        else:
+            raise ValueError('Las horas deben ser time32, time64 o enteros, no {}'.format(arreglo.type))
+    else:
+        valor = np.asarray(columna)
+        if valor.dtype.kind == 'm':
+            valor, unidad = valor.astype('timedelta64[ns]').view(np.int64), 'ns'
+        elif valor.dtype.kind not in 'iu':
+            raise ValueError('Las horas deben ser enteros (minutos desde la medianoche) o timedelta64')
+    if unidad not in UNIDADES:
+        raise ValueError('La unidad de las horas debe ser una de {}'.format(', '.join(UNIDADES)))
+    valor = valor.astype(np.int64)
+    por_minuto = UNIDADES[unidad]
+    rango = (valor >= 0) & (valor < 24 * 60 * por_minuto)
+    #Los segundos se descartan como en HH:MM
+    minuto = valor // por_minuto
+    return minuto, rango if valida is None else valida & rango
+
+
+def predecir_columnas(placas, dias, horas, unidad='min', enlinea=False, empaquetar=False):
+    """
+    Evalúa Pico y Placa sobre columnas binarias sin crear objetos de Python por fila.
+     Las columnas se leen directamente de sus búferes: las placas como bytes ASCII de ancho fijo,
+     las fechas como date32 (días desde 1970-01-01) y las horas como enteros desde la medianoche.
+     Acepta arreglos de NumPy o, si pyarrow está instalado, arreglos de pyarrow (Array o ChunkedArray)
+     con sus mapas de nulos. El resultado de cada fila válida coincide con PicoPlaca.predecir; las
+     filas nulas o fuera de formato quedan en False y se marcan como inválidas.
+     Parámetros
+     ----------
+     placas: numpy.ndarray o pyarrow.Array
+         bytes de ancho fijo (dtype S8, matriz (n, 8) de uint8 o fixed_size_binary(8)) rellenos con
+         ceros a la derecha, o binary/string de pyarrow
+     dias: numpy.ndarray o pyarrow.Array
+         días desde 1970-01-01 (int32 como date32, datetime64, o date32/date64 de pyarrow)
+     horas: numpy.ndarray o pyarrow.Array
+         horas del día como enteros en la unidad indicada, timedelta64, o time32/time64 de pyarrow
+     unidad: str, opcional
+         unidad de las horas enteras: 'min', 's', 'ms', 'us' o 'ns' (el valor predeterminado es 'min';
+         las columnas time32/time64 usan la de su tipo)
+     enlinea: booleano, opcional
+         si en línea == Verdadero, se utilizará la API de días festivos abstractos (una consulta por fecha distinta)
+     empaquetar: booleano, opcional
+         si empaquetar == Verdadero, devuelve mapas de bits con el orden de bits de Arrow
+         (el valor predeterminado es Falso)
+     Devoluciones
+     -------
+     Devuelve una tupla (resultado, valida): arreglos booleanos con True si el vehículo puede circular
+     y True si la fila es válida o, con empaquetar, los mismos valores como mapas de bits uint8
+     (bit i del byte i // 8, empezando por el menos significativo)
+     Aumenta
+     ------
+     ValorError
+         Si los tipos de las columnas no se admiten o no tienen la misma longitud
+    """
+    import numpy as np
+    placa, valida_placa = _placas(placas)
+    dia, valida_dia = _dias(dias)
+    minuto, valida_hora = _minutos(horas, unidad)
+    if not (len(placa) == len(dia) == len(minuto)):
+        raise ValueError('Las columnas de placas, fechas y horas deben tener la misma longitud')
+    valida = valida_placa & valida_dia & valida_hora
+    resultado = PicoPlaca._evaluar_columnas(valida, placa, dia, minuto, enlinea)
+    if empaquetar:
+        return np.packbits(resultado, bitorder='little'), np.packbits(valida, bitorder='little')
+    return resultado, valida
+
+
+def a_arrow(resultado, valida):
+    """
+    Envuelve el resultado de predecir_columnas en un pyarrow.BooleanArray sin copiar los mapas de bits
+     Parámetros
+     ----------
+     resultado, valida: numpy.ndarray
+         arreglos booleanos de predecir_columnas (sin empaquetar)
+     Devoluciones
+     -------
+     Devuelve un pyarrow.BooleanArray con nulos en las filas inválidas
+    """
+    import numpy as np
+    import pyarrow as pa
+    bits_resultado = np.packbits(resultado, bitorder='little')
+    bits_valida = np.packbits(valida, bitorder='little')
+    return pa.Array.from_buffers(pa.bool_(), len(resultado), [pa.py_buffer(bits_valida), pa.py_buffer(bits_resultado)],
+                                 null_count=int(len(valida) - valida.sum()))
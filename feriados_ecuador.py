@@ -0,0 +1,130 @@
+#Clase base de los calendarios de feriados de la librería holidays
+from holidays.holiday_base import HolidayBase
+
+#Tiempo opcional de generación de cada año (instrumentacion.activar)
+import instrumentacion
+#Reglas versionadas de los feriados nacionales y provinciales
+from reglas_feriados import reglas_feriados, combinar, PROVINCIAS, FERIADOS_PROVINCIALES
+
+class FeriadoEcuador(HolidayBase):
+    """
+    Una clase que representar el feriado en Ecuador por provincia (FeriadoEcuador)
+     Su objetivo es determinar si un fecha especifica es unas vacaciones lo mas 
+     rapido y flexible posible.
+     https://www.turismo.gob.ec/wp-content/uploads/2020/03/CALENDARIO-DE-FERIADOS.pdf
+     Las reglas (con sus versiones y vigencias) están en reglas_feriados; esta clase las
+     expone con la interfaz de HolidayBase.
+     ...
+     Atributos (Se hereda en la clase HolidayBase)
+     ----------
+     prov: str o None
+         codigo de provincia segun ISO3166-2; None genera solo los feriados nacionales
+     Métodos
+     -------
+     __init__(self, placa, fecha, hora, en linea=False):
+         Construye todos los atributos necesarios para el objeto HolidayEcuador.
+     _poblar(self, año):
+         Devuelve si una fecha es feriado o no
+     _populate(self, año):
+         Punto de extensión de HolidayBase, delega en _poblacion
+     _poblacion_provincial(self, año):
+         Agrega los feriados locales de la provincia
+     con_provinciales(cls, nacionales, provincia, año):
+         Agrega los feriados provinciales a feriados nacionales ya generados
+     compilar(cls, provincias, año):
+         Genera los feriados de varias provincias evaluando las reglas nacionales una sola vez
+    """     
+    #Codigos ISO 3166-2 de las provincias (reglas_feriados.PROVINCIAS)
+    PROVINCIA = PROVINCIAS
+
+    #Feriados locales por provincia (reglas_feriados.FERIADOS_PROVINCIALES)
+    FERIADOS_PROVINCIALES = FERIADOS_PROVINCIALES
+
+    def __init__(self, **kwargs):
+        """
+       Contructor con todos los métodos necesario para los dias festivos de Ecuador.
+        La provincia se puede indicar con provincia= o prov=; sin provincia solo se
+        generan los feriados nacionales.
+        """         
+        self.pais = "Ecuador"
+        self.prov = kwargs.pop("provincia", None) or kwargs.pop("prov", None)
+        if self.prov is not None and self.prov not in self.PROVINCIA:
+            raise ValueError('Provincia desconocida: {} (use un codigo ISO 3166-2:EC)'.format(self.prov))
+        HolidayBase.__init__(self, **kwargs)
+
+    def _populate(self, año):
+        """
+        HolidayBase genera los feriados de cada año bajo demanda llamando a _populate,
+         por lo que se delega en _poblacion; con la instrumentación activa se mide en
+         la etapa feriados.poblacion.
+        """
+        instrumento = instrumentacion.activa
+        if instrumento is None:
+            self._poblacion(año)
+            return
+        with instrumento.medir('feriados.poblacion'):
+            self._poblacion(año)
+
+    def _poblacion(self, año):
+        """
+        Agrega los feriados de un año según las reglas vigentes de reglas_feriados
+        
+         Parámetros
+         ----------
+         año: int
+             año a generar
+        """
+        for fecha, nombre in reglas_feriados.nacionales(año).items():
+            self[fecha] = nombre
+
+        #Feriados locales (por ejemplo, la Fundación de Quito en Pichincha)
+        self._poblacion_provincial(año)
+
+    def _poblacion_provincial(self, año):
+        """
+        Agrega los feriados locales de la provincia según las reglas de reglas_feriados
+         Parámetros
+         ----------
+         año: int
+             año a generar
+        """
+        for fecha, nombre in reglas_feriados.locales(self.prov, año):
+            self[fecha] = nombre
+
+    @classmethod
+    def con_provinciales(cls, nacionales, provincia, año):
+        """
+        Agrega los feriados locales de una provincia a los feriados nacionales de un año
+         Parámetros
+         ----------
+         nacionales: dict
+             feriados nacionales del año, {datetime.date: nombre}
+         provincia: str o None
+             codigo de provincia segun ISO3166-2
+         año: int
+             año de los feriados
+         Devoluciones
+         -------
+         Devuelve un nuevo diccionario {datetime.date: nombre}, igual al de FeriadoEcuador(provincia=provincia, years=año)
+        """
+        calendario = dict(nacionales)
+        for fecha, nombre in reglas_feriados.locales(provincia, año):
+            combinar(calendario, fecha, nombre)
+        return calendario
+
+    @classmethod
+    def compilar(cls, provincias, año):
+        """
+        Genera los feriados de varias provincias en un año evaluando las reglas nacionales una sola vez
+         Parámetros
+         ----------
+         provincias: iterable de str
+             codigos de provincia segun ISO3166-2
+         año: int
+             año a generar
+         Devoluciones
+         -------
+         Devuelve un diccionario {provincia: {datetime.date: nombre}}
+        """
+        nacionales = reglas_feriados.nacionales(año)
+        return {provincia: cls.con_provinciales(nacionales, provincia, año) for provincia in provincias}
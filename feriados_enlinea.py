@@ -0,0 +1,441 @@
+#Proporciona clases para manipular fechas y horas.
+import datetime
+#Ejecuta las consultas HTTP de forma concurrente
+import asyncio
+#Realiza operaciones dependiente del SO como crear una carpeta o listar contenido de esta.
+import os
+#Sirve para el intercambio de datos
+import json
+#Mide el tiempo para el limitador de tasa y la vigencia de la cache
+import time
+#Hilo del bucle de eventos de la envoltura síncrona
+import threading
+#Guarda las respuestas pendientes al terminar el proceso
+import atexit
+#Cliente HTTP asíncrono con reutilización de conexiones
+import aiohttp
+#Contadores y tiempos opcionales de las solicitudes (instrumentacion.activar)
+import instrumentacion
+
+
+def es_feriado_respuesta(cuerpo):
+    """
+    Interpreta la respuesta de la API de días festivos abstractos
+     Parámetros
+     ----------
+     cuerpo: list
+         lista de feriados devuelta por la API (vacía si no hay feriados)
+     Devoluciones
+     -------
+     Devuelve True si hay algún feriado, sin contar el Jueves Santo que la API
+     denota incorrectamente como feriado
+     Aumenta
+     ------
+     ValorError
+         Si el cuerpo no es una lista de feriados, por ejemplo un objeto {"error": ...} de la API
+    """
+    if not isinstance(cuerpo, list) or not all(isinstance(feriado, dict) for feriado in cuerpo):
+        raise ValueError('La API de días festivos no devolvió una lista de feriados: {}'.format(json.dumps(cuerpo)[:200]))
+    return any(feriado.get('name') != 'Maundy Thursday' for feriado in cuerpo)
+
+
+class CubetaFichas:
+    """
+    Limitador de tasa de cubeta de fichas para corrutinas.
+     ...
+     Atributos
+     ----------
+     tasa: float
+         fichas que se reponen por segundo
+     capacidad: int
+         número máximo de fichas acumuladas (ráfaga)
+     Métodos
+     -------
+     adquirir(self):
+         Espera hasta que haya una ficha disponible y la consume
+    """
+
+    def __init__(self, tasa, capacidad=1):
+        """
+        Construye una cubeta llena.
+         Parámetros
+         ----------
+         tasa: float
+             fichas que se reponen por segundo
+         capacidad: int, opcional
+             número máximo de fichas acumuladas (el valor predeterminado es 1)
+        """
+        if tasa <= 0 or capacidad < 1:
+            raise ValueError('La tasa debe ser positiva y la capacidad al menos 1')
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self._fichas = float(capacidad)
+        self._ultimo = time.monotonic()
+        self._candado = asyncio.Lock()
+
+    async def adquirir(self):
+        """Espera hasta que haya una ficha disponible y la consume"""
+        async with self._candado:
+            while True:
+                ahora = time.monotonic()
+                self._fichas = min(self.capacidad, self._fichas + (ahora - self._ultimo) * self.tasa)
+                self._ultimo = ahora
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    return
+                await asyncio.sleep((1 - self._fichas) / self.tasa)
+
+
+class ProveedorFeriadosEnLinea:
+    """
+    Proveedor asíncrono de feriados que consulta la API de días festivos abstractos.
+     Reutiliza las conexiones HTTP, respeta el límite de la versión gratuita con una
+     cubeta de fichas, une las consultas concurrentes de una misma fecha y guarda las
+     respuestas en una cache persistente, de modo que cada fecha se consulta como
+     máximo una vez por vigencia (un año por defecto). Las respuestas nuevas se escriben
+     en la cache en grupos de lote_cache y al cerrar, no después de cada solicitud.
+     ...
+     Atributos
+     ----------
+     url: str
+         dirección de la API (se puede apuntar a un servidor local de prueba)
+     pais: str
+         codigo del país segun ISO3166-1
+     ruta_cache: str o None
+         archivo JSON donde se guardan las respuestas; None mantiene la cache solo en memoria
+     consultas: int
+         número de solicitudes HTTP realizadas
+     Métodos
+     -------
+     es_feriado(self, fecha):
+         Devuelve True si la fecha es feriado en Ecuador
+     es_feriado_varios(self, fechas):
+         Consulta varias fechas de forma concurrente
+     respuesta_guardada(self, fecha):
+         Devuelve la respuesta vigente de la cache para la fecha, o None
+     guardar(self):
+         Escribe en la cache persistente las respuestas pendientes
+     cerrar(self):
+         Guarda las respuestas pendientes y cierra las conexiones abiertas
+    """
+    URL = 'https://holidays.abstractapi.com/v1/'
+
+    def __init__(self, codigo=None, url=URL, pais='EC', tasa=1.0, rafaga=1, ruta_cache=None,
+                 vigencia=datetime.timedelta(days=365), conexiones=4, tiempo_espera=10.0, reintentos=3, lote_cache=64):
+        """
+        Construye el proveedor; la sesión HTTP se abre en la primera consulta.
+         Parámetros
+         ----------
+         codigo: str, opcional
+             clave de la API (el valor predeterminado se lee de la variable de entorno VACACIONES_API_CODIGO)
+         url: str, opcional
+             dirección de la API
+         pais: str, opcional
+             codigo del país segun ISO3166-1 (el valor predeterminado es EC)
+         tasa: float, opcional
+             solicitudes por segundo permitidas (el valor predeterminado es 1, el de la versión gratuita)
+         rafaga: int, opcional
+             solicitudes que se pueden hacer seguidas antes de aplicar la tasa (el valor predeterminado es 1)
+         ruta_cache: str, opcional
+             archivo JSON de la cache persistente (el valor predeterminado es None)
+         vigencia: datetime.timedelta, opcional
+             tiempo durante el que una respuesta guardada es válida (el valor predeterminado es un año)
+         conexiones: int, opcional
+             número máximo de conexiones abiertas (el valor predeterminado es 4)
+         tiempo_espera: float, opcional
+             segundos de espera máxima por solicitud (el valor predeterminado es 10)
+         reintentos: int, opcional
+             reintentos ante errores de conexión, 429 o 5xx (el valor predeterminado es 3)
+         lote_cache: int, opcional
+             respuestas nuevas que se acumulan antes de escribir la cache (el valor predeterminado es 64)
+        """
+        self.codigo = codigo if codigo is not None else os.environ.get('VACACIONES_API_CODIGO')
+        self.url = url
+        self.pais = pais
+        self.ruta_cache = ruta_cache
+        self.vigencia = vigencia.total_seconds()
+        self.conexiones = conexiones
+        self.tiempo_espera = tiempo_espera
+        self.reintentos = reintentos
+        self.lote_cache = lote_cache
+        self.consultas = 0
+        self._sin_guardar = 0
+        self._cubeta = CubetaFichas(tasa, rafaga)
+        self._sesion = None
+        self._pendientes = {}
+        self._respuestas = {}
+        if ruta_cache is not None:
+            self._respuestas = self.__leer_cache()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *excepcion):
+        await self.cerrar()
+
+    async def cerrar(self):
+        """Guarda las respuestas pendientes y cierra las conexiones abiertas"""
+        self.guardar()
+        if self._sesion is not None:
+            await self._sesion.close()
+            self._sesion = None
+
+    async def es_feriado(self, fecha):
+        """
+        Comprueba si una fecha es feriado en Ecuador
+         Parámetros
+         ----------
+         fecha: datetime.date
+             fecha a consultar
+         Devoluciones
+         -------
+         Devuelve True si la fecha es feriado, de lo contrario False
+         Aumenta
+         ------
+         aiohttp.ClientResponseError
+             Si falta la clave API o la API sigue fallando después de los reintentos
+         ValorError
+             Si la API responde con un error en lugar de la lista de feriados
+        """
+        guardado = self.respuesta_guardada(fecha)
+        if guardado is not None:
+            return guardado
+        clave = fecha.isoformat()
+        #Las consultas concurrentes de la misma fecha esperan a una sola solicitud
+        tarea = self._pendientes.get(clave)
+        if tarea is None:
+            tarea = asyncio.ensure_future(self.__consultar(fecha))
+            self._pendientes[clave] = tarea
+            tarea.add_done_callback(lambda _: self._pendientes.pop(clave, None))
+        return await asyncio.shield(tarea)
+
+    def respuesta_guardada(self, fecha):
+        """Devuelve la respuesta vigente de la cache para la fecha (True o False), o None si no hay"""
+        guardado = self._respuestas.get(fecha.isoformat())
+        if guardado is not None and time.time() - guardado[1] < self.vigencia:
+            return guardado[0]
+        return None
+
+    async def es_feriado_varios(self, fechas):
+        """
+        Consulta varias fechas de forma concurrente
+         Parámetros
+         ----------
+         fechas: iterable de datetime.date
+             fechas a consultar
+         Devoluciones
+         -------
+         Devuelve una lista de booleanos en el mismo orden que las fechas
+        """
+        return list(await asyncio.gather(*(self.es_feriado(fecha) for fecha in fechas)))
+
+    async def __consultar(self, fecha):
+        """Realiza la solicitud HTTP de una fecha, con reintentos, y guarda la respuesta"""
+        if self._sesion is None:
+            self._sesion = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.conexiones),
+                timeout=aiohttp.ClientTimeout(total=self.tiempo_espera))
+        parametros = {
+            'api_key': self.codigo or '',
+            'country': self.pais,
+            'year': str(fecha.year),
+            'month': '{:02d}'.format(fecha.month),
+            'day': '{:02d}'.format(fecha.day)}
+        for intento in range(self.reintentos + 1):
+            await self._cubeta.adquirir()
+            instrumento = instrumentacion.activa
+            inicio = time.perf_counter()
+            try:
+                async with self._sesion.get(self.url, params=parametros) as respuesta:
+                    self.consultas += 1
+                    if instrumento is not None:
+                        instrumento.registrar('http', time.perf_counter() - inicio)
+                        instrumento.contar('http.consultas')
+                        if respuesta.status >= 400:
+                            instrumento.contar('http.errores')
+                    if respuesta.status == 401:
+                        #Esto significa que falta un codigo API
+                        raise aiohttp.ClientResponseError(
+                            respuesta.request_info, respuesta.history, status=401,
+                            message='Falta la clave API. Guarde su clave en la variable de entorno VACACIONES_API_CODIGO')
+                    if (respuesta.status == 429 or respuesta.status >= 500) and intento < self.reintentos:
+                        await asyncio.sleep(0.5 * 2 ** intento)
+                        continue
+                    respuesta.raise_for_status()
+                    cuerpo = await respuesta.json(content_type=None)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if intento == self.reintentos:
+                    raise
+                await asyncio.sleep(0.5 * 2 ** intento)
+                continue
+            resultado = es_feriado_respuesta(cuerpo)
+            self._respuestas[fecha.isoformat()] = [resultado, time.time()]
+            self._sin_guardar += 1
+            if self._sin_guardar >= self.lote_cache:
+                self.guardar()
+            return resultado
+
+    def __leer_cache(self):
+        """Lee la cache persistente; un archivo ausente o dañado equivale a una cache vacía"""
+        try:
+            with open(self.ruta_cache, encoding='utf-8') as archivo:
+                respuestas = json.load(archivo)
+        except (OSError, ValueError):
+            return {}
+        return respuestas if isinstance(respuestas, dict) else {}
+
+    def guardar(self):
+        """
+        Escribe en la cache persistente las respuestas pendientes, de forma atómica; las
+         respuestas que otros procesos guardaron en el archivo se conservan (gana la más reciente)
+        """
+        if self.ruta_cache is None or not self._sin_guardar:
+            return
+        respuestas = self.__leer_cache()
+        for clave, guardado in self._respuestas.items():
+            anterior = respuestas.get(clave)
+            if anterior is None or anterior[1] < guardado[1]:
+                respuestas[clave] = guardado
+        temporal = '{}.{}.tmp'.format(self.ruta_cache, os.getpid())
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            json.dump(respuestas, archivo)
+        os.replace(temporal, self.ruta_cache)
+        self._respuestas = respuestas
+        self._sin_guardar = 0
+
+
+class ProveedorSincrono:
+    """
+    Envoltura síncrona de ProveedorFeriadosEnLinea para el código que no usa asyncio.
+     Las consultas se ejecutan en un bucle de eventos propio que corre en un hilo en segundo
+     plano, de modo que todos los hilos del proceso comparten la sesión HTTP, el limitador de
+     tasa, la unión de consultas de una misma fecha y la cache. Después de un fork, el proceso
+     hijo arranca su propio bucle y conserva las respuestas ya conocidas. Las respuestas
+     pendientes se guardan al final de cada es_feriado_varios y al terminar el proceso.
+     ...
+     Atributos
+     ----------
+     opciones: dict
+         argumentos de ProveedorFeriadosEnLinea
+     consultas: int
+         número de solicitudes HTTP realizadas por el proceso
+     Métodos
+     -------
+     es_feriado(self, fecha):
+         Devuelve True si la fecha es feriado en Ecuador
+     es_feriado_varios(self, fechas):
+         Consulta varias fechas de forma concurrente
+     guardar(self):
+         Escribe en la cache persistente las respuestas pendientes
+     cerrar(self):
+         Guarda las respuestas pendientes, cierra las conexiones y detiene el hilo
+    """
+
+    def __init__(self, **opciones):
+        """
+        Construye la envoltura; el hilo y la sesión se crean en la primera consulta.
+         Parámetros
+         ----------
+         opciones:
+             argumentos de ProveedorFeriadosEnLinea (codigo, url, tasa, ruta_cache, ...)
+        """
+        self.opciones = opciones
+        self._proveedor = None
+        self._bucle = None
+        self._hilo = None
+        self._pid = None
+        self._registrado = False
+        self._candado = threading.Lock()
+
+    @property
+    def consultas(self):
+        return self._proveedor.consultas if self._proveedor is not None else 0
+
+    def __iniciar(self):
+        """Arranca el bucle de eventos del proceso actual si todavía no existe"""
+        with self._candado:
+            if self._pid == os.getpid():
+                return
+            anterior = self._proveedor
+            self._proveedor = ProveedorFeriadosEnLinea(**self.opciones)
+            if anterior is not None:
+                #Proceso hijo: el bucle y la sesión del padre no existen aquí, pero sus respuestas sirven
+                self._proveedor._respuestas.update(anterior._respuestas)
+                if anterior._sesion is not None:
+                    anterior._sesion.detach()
+                    anterior._sesion = None
+            self._bucle = asyncio.new_event_loop()
+            self._hilo = threading.Thread(target=self._bucle.run_forever, name='feriados-enlinea', daemon=True)
+            self._hilo.start()
+            self._pid = os.getpid()
+            if not self._registrado:
+                #Un proceso hijo hereda el registro del padre; cerrar lo retira
+                atexit.register(self.cerrar)
+                self._registrado = True
+
+    def __ejecutar(self, corrutina):
+        """Ejecuta la corrutina en el bucle del hilo y espera su resultado"""
+        return asyncio.run_coroutine_threadsafe(corrutina, self._bucle).result()
+
+    def es_feriado(self, fecha):
+        """
+        Comprueba si una fecha es feriado en Ecuador
+         Parámetros
+         ----------
+         fecha: datetime.date
+             fecha a consultar
+         Devoluciones
+         -------
+         Devuelve True si la fecha es feriado, de lo contrario False
+         Aumenta
+         ------
+         aiohttp.ClientResponseError
+             Si falta la clave API o la API sigue fallando después de los reintentos
+         ValorError
+             Si la API responde con un error en lugar de la lista de feriados
+        """
+        self.__iniciar()
+        #Las fechas ya conocidas se responden sin pasar por el hilo
+        guardado = self._proveedor.respuesta_guardada(fecha)
+        if guardado is not None:
+            return guardado
+        return self.__ejecutar(self._proveedor.es_feriado(fecha))
+
+    def es_feriado_varios(self, fechas):
+        """
+        Consulta varias fechas de forma concurrente y guarda las respuestas nuevas
+         Parámetros
+         ----------
+         fechas: iterable de datetime.date
+             fechas a consultar
+         Devoluciones
+         -------
+         Devuelve una lista de booleanos en el mismo orden que las fechas
+        """
+        self.__iniciar()
+        resultados = self.__ejecutar(self._proveedor.es_feriado_varios(list(fechas)))
+        self.guardar()
+        return resultados
+
+    def guardar(self):
+        """Escribe en la cache persistente las respuestas pendientes"""
+        if self._pid == os.getpid():
+            #Se escribe desde el hilo del bucle, que es el único que modifica las respuestas
+            self.__ejecutar(self.__guardar())
+
+    async def __guardar(self):
+        self._proveedor.guardar()
+
+    def cerrar(self):
+        """Guarda las respuestas pendientes, cierra las conexiones y detiene el hilo"""
+        with self._candado:
+            if self._registrado:
+                atexit.unregister(self.cerrar)
+                self._registrado = False
+            if self._pid != os.getpid():
+                return
+            self._pid = None
+        asyncio.run_coroutine_threadsafe(self._proveedor.cerrar(), self._bucle).result()
+        self._bucle.call_soon_threadsafe(self._bucle.stop)
+        self._hilo.join()
+        self._bucle.close()
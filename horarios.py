@@ -0,0 +1,476 @@
+#Proporciona clases para manipular fechas y horas.
+import datetime
+#Facilita la escritura de interfaces de línea de comandos amigables.
+import argparse
+#Busca el segmento de fechas en O(log n)
+import bisect
+#Elige el horario con más prioridad entre los que se solapan
+import heapq
+#Sirve para el intercambio de datos
+import json
+#Acceso a la salida estándar
+import sys
+
+#numpy se importa al evaluar el primer lote (TablaHorarios.evaluar_lote)
+
+#Días de la semana, con lunes = 0
+DIAS = (
+        "Lunes",
+        "Martes",
+        "Miercoles",
+        "Jueves",
+        "Viernes",
+        "Sabado",
+        "Domingo")
+
+#ORDENANZA METROPOLITANA No. 0305: {día: últimos dígitos prohibidos}
+RESTRICCIONES_0305 = {
+        "Lunes": [1, 2],
+        "Martes": [3, 4],
+        "Miercoles": [5, 6],
+        "Jueves": [7, 8],
+        "Viernes": [9, 0],
+        "Sabado": [],
+        "Domingo": []}
+
+#Horas pico 07:00 - 09:30 y 16:00 - 19:30 en minutos desde la medianoche, ambos extremos incluidos
+VENTANAS_0305 = ((7 * 60, 9 * 60 + 30), (16 * 60, 19 * 60 + 30))
+
+#Ordinal de 1970-01-01, origen de los días de los lotes
+EPOCA = datetime.date(1970, 1, 1).toordinal()
+
+
+def _minuto(valor):
+    """Convierte un minuto del día (int) o una hora HH:MM en minutos desde la medianoche"""
+    if isinstance(valor, str):
+        horas, _, minutos = valor.partition(':')
+        if len(valor) != 5 or not horas.isdigit() or not minutos.isdigit():
+            raise ValueError('Las horas de las ventanas deben tener el formato HH:MM')
+        valor = int(horas) * 60 + int(minutos)
+    if not isinstance(valor, int) or not 0 <= valor < 24 * 60:
+        raise ValueError('Las ventanas deben estar dentro del día')
+    return valor
+
+
+def _fecha(valor):
+    """Convierte una fecha AAAA-MM-DD (o un datetime.date, o None) en datetime.date"""
+    if valor is None or isinstance(valor, datetime.date):
+        return valor
+    try:
+        return datetime.date.fromisoformat(valor)
+    except (TypeError, ValueError):
+        raise ValueError('Las fechas de vigencia deben tener el formato AAAA-MM-DD') from None
+
+
+class Horario:
+    """
+    Una versión de un horario de Pico y Placa con su rango de vigencia.
+     ...
+     Atributos
+     ----------
+     clave: str
+         nombre del horario, por ejemplo ordenanza-0305
+     version: int
+         número de versión
+     desde: datetime.date o None
+         primer día de vigencia (None: sin límite)
+     hasta: datetime.date o None
+         último día de vigencia, incluido (None: sin límite)
+     restricciones: dict
+         {día: últimos dígitos prohibidos}, con los días de DIAS
+     ventanas: dict
+         {día: ventanas de hora pico (inicio, fin)} en minutos, ambos extremos incluidos
+     Métodos
+     -------
+     vigente(self, fecha):
+         Devuelve True si el horario rige en la fecha
+     en_pico(self, dia_semana, minuto):
+         Devuelve True si el minuto está en una ventana de hora pico del día
+     restringe(self, dia_semana, digito):
+         Devuelve True si el último dígito está restringido el día
+     firma(self):
+         Devuelve una tupla que identifica el contenido del horario
+     desde_config(cls, datos):
+         Construye un horario a partir de un diccionario de configuración
+     a_config(self):
+         Devuelve el diccionario de configuración del horario
+    """
+
+    def __init__(self, clave, restricciones, ventanas, desde=None, hasta=None, version=1):
+        """
+        Construye el horario y valida la configuración.
+         Parámetros
+         ----------
+         clave: str
+             nombre del horario
+         restricciones: dict
+             {día: últimos dígitos prohibidos}; los días que faltan no tienen restricción
+         ventanas: iterable o dict
+             ventanas (inicio, fin) comunes a todos los días, o {día: ventanas}; inicio y fin
+             son minutos desde la medianoche o horas HH:MM, ambos extremos incluidos
+         desde: str o datetime.date, opcional
+             primer día de vigencia (el valor predeterminado es None, sin límite)
+         hasta: str o datetime.date, opcional
+             último día de vigencia (el valor predeterminado es None, sin límite)
+         version: int, opcional
+             número de versión (el valor predeterminado es 1)
+         Aumenta
+         ------
+         ValorError
+             Si los días, los dígitos, las ventanas o el rango de vigencia no son válidos
+        """
+        desconocidos = set(restricciones) - set(DIAS)
+        if not isinstance(ventanas, dict):
+            ventanas = dict.fromkeys(DIAS, ventanas)
+        desconocidos |= set(ventanas) - set(DIAS)
+        if desconocidos:
+            raise ValueError('Días desconocidos: {}; se esperan {}'.format(', '.join(sorted(desconocidos)), ', '.join(DIAS)))
+        for digitos in restricciones.values():
+            if any(not isinstance(d, int) or not 0 <= d <= 9 for d in digitos):
+                raise ValueError('Los dígitos restringidos deben ser enteros entre 0 y 9')
+        self.clave = clave
+        self.version = version
+        self.desde = _fecha(desde)
+        self.hasta = _fecha(hasta)
+        if self.desde is not None and self.hasta is not None and self.hasta < self.desde:
+            raise ValueError('El horario {} termina antes de empezar'.format(clave))
+        self.restricciones = {dia: tuple(sorted(set(restricciones.get(dia, ())))) for dia in DIAS}
+        self.ventanas = {}
+        for dia in DIAS:
+            pares = tuple(sorted((_minuto(inicio), _minuto(fin)) for inicio, fin in ventanas.get(dia, ())))
+            if any(inicio > fin for inicio, fin in pares):
+                raise ValueError('Las ventanas deben tener inicio <= fin')
+            self.ventanas[dia] = pares
+        #Por número de día (lunes = 0): dígitos restringidos y un byte por minuto del día (1 en hora pico)
+        self._digitos = tuple(frozenset(self.restricciones[dia]) for dia in DIAS)
+        pico = bytearray(7 * 24 * 60)
+        for d, dia in enumerate(DIAS):
+            for inicio, fin in self.ventanas[dia]:
+                pico[d * 24 * 60 + inicio:d * 24 * 60 + fin + 1] = b'\x01' * (fin - inicio + 1)
+        self._pico = bytes(pico)
+
+    def __repr__(self):
+        return '{}({!r}, version={}, desde={}, hasta={})'.format(
+            type(self).__name__, self.clave, self.version, self.desde, self.hasta)
+
+    def vigente(self, fecha):
+        """Devuelve True si el horario rige en la fecha (datetime.date)"""
+        return (self.desde is None or self.desde <= fecha) and (self.hasta is None or fecha <= self.hasta)
+
+    def en_pico(self, dia_semana, minuto):
+        """
+        Comprueba si un minuto está dentro de una ventana de hora pico
+         Parámetros
+         ----------
+         dia_semana: int
+             Número de día de la semana, con lunes = 0
+         minuto: int
+             Minutos desde la medianoche
+         Devoluciones
+         -------
+         Devuelve True si el minuto está dentro de alguna ventana del día, de lo contrario False
+        """
+        return self._pico[dia_semana * 24 * 60 + minuto] == 1
+
+    def restringe(self, dia_semana, digito):
+        """Devuelve True si el último dígito está restringido el día de la semana (lunes = 0)"""
+        return digito in self._digitos[dia_semana]
+
+    def firma(self):
+        """Devuelve una tupla que identifica el contenido del horario"""
+        return (self.clave, self.version, self.desde, self.hasta,
+                tuple(self.restricciones[dia] for dia in DIAS), tuple(self.ventanas[dia] for dia in DIAS))
+
+    @classmethod
+    def desde_config(cls, datos):
+        """
+        Construye un horario a partir de un diccionario de configuración
+         Parámetros
+         ----------
+         datos: dict
+             {"clave", "version", "desde", "hasta", "restricciones", "ventanas"}; desde, hasta
+             y version son opcionales
+         Devoluciones
+         -------
+         Devuelve el Horario
+         Aumenta
+         ------
+         ValorError
+             Si falta la clave, las restricciones o las ventanas, o no son válidas
+        """
+        try:
+            return cls(datos['clave'], datos['restricciones'], datos['ventanas'],
+                       datos.get('desde'), datos.get('hasta'), datos.get('version', 1))
+        except (KeyError, TypeError, AttributeError) as error:
+            raise ValueError('Horario mal formado: {!r}'.format(error)) from None
+
+    def a_config(self):
+        """Devuelve el diccionario de configuración del horario, con las horas como HH:MM"""
+        def hora(minuto):
+            return '{:02d}:{:02d}'.format(*divmod(minuto, 60))
+        ventanas = {dia: [[hora(inicio), hora(fin)] for inicio, fin in pares] for dia, pares in self.ventanas.items()}
+        return {
+            'clave': self.clave,
+            'version': self.version,
+            'desde': self.desde and self.desde.isoformat(),
+            'hasta': self.hasta and self.hasta.isoformat(),
+            'restricciones': {dia: list(digitos) for dia, digitos in self.restricciones.items()},
+            'ventanas': ventanas}
+
+
+class TablaHorarios:
+    """
+    Tabla de horarios de Pico y Placa con rangos de vigencia, compilada en un índice de intervalos.
+     Los horarios pueden solaparse; en cada fecha rige el que empezó más tarde y, a igual inicio,
+     el de mayor versión (y, a igual versión, el último de la lista). Así, un horario de
+     emergencia o de "hoy no circula" reemplaza al ordinario mientras está vigente y, al terminar,
+     vuelve a regir el anterior. Al construir la tabla se recorren los inicios y fines de todos los
+     horarios con un montículo y se obtienen segmentos de fechas consecutivas con un único horario
+     vigente, de modo que consultar una fecha es una búsqueda binaria entre los segmentos, sin
+     importar cuántos horarios históricos se solapen. Para los lotes, cada horario se compila en
+     tablas por día de la semana y minuto (hora pico) y por día de la semana y dígito (restricción).
+     ...
+     Atributos
+     ----------
+     horarios: tuple de Horario
+         horarios de la tabla, en el orden de la configuración
+     Métodos
+     -------
+     vigente(self, fecha):
+         Devuelve el Horario que rige en la fecha o None
+     segmentos(self):
+         Devuelve los rangos de fechas (desde, hasta, Horario) del índice compilado
+     tramos(self, desde, hasta):
+         Genera los rangos de fechas con un mismo horario vigente entre dos fechas
+     evaluar_lote(self, dia, minuto, digito):
+         Devuelve las máscaras de hora pico y de dígito restringido de columnas de NumPy
+     firma(self):
+         Devuelve una tupla que identifica el contenido de la tabla
+     desde_config(cls, datos):
+         Construye la tabla a partir de la configuración
+     cargar(cls, ruta):
+         Lee la configuración de un archivo JSON
+     a_config(self):
+         Devuelve la configuración de la tabla
+     guardar(self, ruta):
+         Escribe la configuración en un archivo JSON
+    """
+
+    def __init__(self, horarios):
+        """
+        Construye la tabla y compila el índice de intervalos.
+         Parámetros
+         ----------
+         horarios: iterable de Horario
+             horarios con sus rangos de vigencia
+        """
+        self.horarios = tuple(horarios)
+        self._lote = None
+        #Los segmentos empiezan en _inicios (ordinales) y en cada uno rige _vigentes[i] (o None)
+        self._inicios = []
+        self._vigentes = []
+        eventos = sorted((h.desde.toordinal() if h.desde else 1, i) for i, h in enumerate(self.horarios))
+        #Primer día sin vigencia de cada horario (None: sin límite)
+        finales = [h.hasta.toordinal() + 1 if h.hasta is not None and h.hasta < datetime.date.max else None
+                   for h in self.horarios]
+        limites = sorted({inicio for inicio, i in eventos} | {final for final in finales if final is not None})
+        monticulo = []
+        siguiente = 0
+        for limite in limites:
+            while siguiente < len(eventos) and eventos[siguiente][0] <= limite:
+                inicio, i = eventos[siguiente]
+                heapq.heappush(monticulo, (-inicio, -self.horarios[i].version, -i))
+                siguiente += 1
+            #Los horarios que ya terminaron se descartan solo cuando llegan a la cima
+            while monticulo and finales[-monticulo[0][2]] is not None and finales[-monticulo[0][2]] <= limite:
+                heapq.heappop(monticulo)
+            horario = self.horarios[-monticulo[0][2]] if monticulo else None
+            if not self._vigentes or self._vigentes[-1] is not horario:
+                self._inicios.append(limite)
+                self._vigentes.append(horario)
+        #Un único horario sin límites, como la ORDENANZA 0305 sola, no necesita la búsqueda
+        self._unico = self._vigentes[0] if self._inicios == [1] else None
+
+    def __len__(self):
+        """Devuelve el número de horarios"""
+        return len(self.horarios)
+
+    def vigente(self, fecha):
+        """
+        Busca el horario que rige en una fecha en O(log n)
+         Parámetros
+         ----------
+         fecha: datetime.date
+             fecha a consultar
+         Devoluciones
+         -------
+         Devuelve el Horario vigente, o None si ningún horario rige en la fecha
+        """
+        if self._unico is not None:
+            return self._unico
+        i = bisect.bisect_right(self._inicios, fecha.toordinal()) - 1
+        return self._vigentes[i] if i >= 0 else None
+
+    def segmentos(self):
+        """
+        Describe el índice compilado
+         Devoluciones
+         -------
+         Devuelve la lista de (desde, hasta, Horario) con fechas datetime.date; hasta es None en
+         el último segmento y Horario es None en los rangos sin horario
+        """
+        finales = [datetime.date.fromordinal(inicio - 1) for inicio in self._inicios[1:]] + [None]
+        return [(datetime.date.fromordinal(inicio), final, horario)
+                for inicio, final, horario in zip(self._inicios, finales, self._vigentes)]
+
+    def tramos(self, desde, hasta):
+        """
+        Recorre el índice compilado entre dos fechas
+         Parámetros
+         ----------
+         desde: datetime.date
+             primera fecha
+         hasta: datetime.date
+             última fecha (incluida)
+         Devoluciones
+         -------
+         Genera tuplas (primer día, último día, Horario o None) que cubren el rango sin huecos
+        """
+        if hasta < desde:
+            return
+        if self._unico is not None:
+            yield desde, hasta, self._unico
+            return
+        if not self._inicios:
+            yield desde, hasta, None
+            return
+        inicio = desde.toordinal()
+        final = hasta.toordinal()
+        i = max(bisect.bisect_right(self._inicios, inicio) - 1, 0)
+        if self._inicios[0] > inicio:
+            #Antes del primer segmento no rige ningún horario
+            yield desde, datetime.date.fromordinal(min(self._inicios[0] - 1, final)), None
+            inicio = self._inicios[0]
+        while inicio <= final:
+            fin = min(self._inicios[i + 1] - 1, final) if i + 1 < len(self._inicios) else final
+            yield datetime.date.fromordinal(inicio), datetime.date.fromordinal(fin), self._vigentes[i]
+            inicio = fin + 1
+            i += 1
+
+    def __compilar_lote(self):
+        """Arma las tablas de NumPy de los horarios y los segmentos para evaluar_lote"""
+        import numpy as np
+        distintos = list({id(h): h for h in self._vigentes if h is not None}.values())
+        posicion = {id(h): i for i, h in enumerate(distintos)}
+        #La última fila es la de los rangos sin horario: nada está en hora pico ni restringido
+        pico = np.zeros((len(distintos) + 1, 7, 24 * 60), dtype=bool)
+        digitos = np.zeros((len(distintos) + 1, 7, 10), dtype=bool)
+        for i, horario in enumerate(distintos):
+            pico[i] = np.frombuffer(horario._pico, dtype=bool).reshape(7, 24 * 60)
+            for d, dia in enumerate(DIAS):
+                digitos[i, d, list(horario.restricciones[dia])] = True
+        #Un segmento centinela antes del primero, sin horario
+        inicios = np.array([np.iinfo(np.int64).min] + [inicio - EPOCA for inicio in self._inicios], dtype=np.int64)
+        filas = np.array([len(distintos)] + [len(distintos) if h is None else posicion[id(h)] for h in self._vigentes], dtype=np.intp)
+        self._lote = inicios, filas, pico, digitos
+        return self._lote
+
+    def evaluar_lote(self, dia, minuto, digito):
+        """
+        Evalúa el horario vigente sobre columnas completas
+         Parámetros
+         ----------
+         dia: numpy.ndarray
+             días desde 1970-01-01
+         minuto: numpy.ndarray
+             minutos desde la medianoche
+         digito: numpy.ndarray
+             últimos dígitos de las placas
+         Devoluciones
+         -------
+         Devuelve una tupla (pico, restringe) de arreglos booleanos: pico es True si el minuto está en una
+         ventana de hora pico del horario vigente y restringe si el dígito está restringido ese día
+        """
+        import numpy as np
+        inicios, filas, pico, digitos = self._lote or self.__compilar_lote()
+        dia = np.asarray(dia, dtype=np.int64)
+        fila = filas[np.searchsorted(inicios, dia, side='right') - 1]
+        #1970-01-01 fue jueves, de donde sale el día de la semana con lunes = 0
+        dia_semana = (dia + 3) % 7
+        return (pico[fila, dia_semana, np.clip(minuto, 0, 24 * 60 - 1)],
+                digitos[fila, dia_semana, np.clip(digito, 0, 9)])
+
+    def firma(self):
+        """Devuelve una tupla que identifica el contenido de la tabla"""
+        return tuple(horario.firma() for horario in self.horarios)
+
+    @classmethod
+    def desde_config(cls, datos):
+        """
+        Construye la tabla a partir de la configuración
+         Parámetros
+         ----------
+         datos: dict o list
+             {"horarios": [...]} o directamente la lista de horarios (ver Horario.desde_config)
+         Devoluciones
+         -------
+         Devuelve la TablaHorarios
+         Aumenta
+         ------
+         ValorError
+             Si algún horario no es válido
+        """
+        if isinstance(datos, dict):
+            datos = datos.get('horarios', ())
+        return cls(Horario.desde_config(horario) for horario in datos)
+
+    @classmethod
+    def cargar(cls, ruta):
+        """
+        Lee la configuración de un archivo JSON
+         Parámetros
+         ----------
+         ruta: str
+             archivo con {"horarios": [...]}
+         Devoluciones
+         -------
+         Devuelve la TablaHorarios
+        """
+        with open(ruta, encoding='utf-8') as archivo:
+            return cls.desde_config(json.load(archivo))
+
+    def a_config(self):
+        """Devuelve la configuración de la tabla como {"horarios": [...]}"""
+        return {'horarios': [horario.a_config() for horario in self.horarios]}
+
+    def guardar(self, ruta):
+        """Escribe la configuración de la tabla en un archivo JSON"""
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            json.dump(self.a_config(), archivo, indent=2, ensure_ascii=False)
+            archivo.write('\n')
+
+
+#Horario vigente desde siempre según la ORDENANZA METROPOLITANA No. 0305
+ORDENANZA_0305 = Horario('ordenanza-0305', RESTRICCIONES_0305, VENTANAS_0305)
+
+
+if __name__ == '__main__':
+    analizador = argparse.ArgumentParser(description='Tablas de horarios de Pico y Placa con rangos de vigencia')
+    subcomandos = analizador.add_subparsers(dest='comando', required=True)
+    ejemplo = subcomandos.add_parser('ejemplo', help='escribe la configuración de la ORDENANZA 0305')
+    ejemplo.add_argument('salida', help='archivo JSON a escribir')
+    segmentos = subcomandos.add_parser('segmentos', help='muestra qué horario rige en cada rango de fechas')
+    segmentos.add_argument('ruta', help='archivo JSON de horarios')
+    argumentos = analizador.parse_args()
+
+    if argumentos.comando == 'ejemplo':
+        TablaHorarios([ORDENANZA_0305]).guardar(argumentos.salida)
+    else:
+        try:
+            tabla = TablaHorarios.cargar(argumentos.ruta)
+        except ValueError as error:
+            print(error, file=sys.stderr)
+            sys.exit(1)
+        for desde, hasta, horario in tabla.segmentos():
+            print('{} .. {}  {}'.format(desde, hasta or '', 'sin horario' if horario is None
+                                        else '{} v{}'.format(horario.clave, horario.version)))
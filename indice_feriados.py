@@ -0,0 +1,312 @@
+#Proporciona clases para manipular fechas y horas.
+import datetime
+#Facilita la escritura de interfaces de línea de comandos amigables.
+import argparse
+#Sirve para el intercambio de datos
+import json
+#Permite proyectar el archivo del índice en memoria sin leerlo completo
+import mmap
+#Empaqueta y desempaqueta enteros binarios
+import struct
+#Permite devolver un código de salida desde la línea de comandos
+import sys
+
+#Identificador y versión del formato binario del índice
+MAGICO = b'FERIAD01'
+#Bytes de un mapa de bits de 366 días
+BYTES_AÑO = 46
+
+
+class IndiceFeriados:
+    """
+    Índice compacto y precalculado de los feriados de FeriadoEcuador.
+     Por cada (provincia, año) guarda un mapa de bits de 366 días y, en paralelo,
+     el número de nombre de cada día marcado (en el orden de los bits), de forma que
+     consultar una fecha no evalúa ninguna regla (easter, relativedelta).
+     El índice se guarda en un archivo binario que se proyecta en memoria con mmap:
+         MAGICO | largo de la cabecera (uint32) | cabecera JSON |
+         mapas de bits (46 bytes por ranura) | desplazamientos (uint32 por ranura + 1) |
+         números de nombre (uint8 por feriado)
+     donde ranura = posición de la provincia * número de años + (año - año_inicial).
+     ...
+     Atributos
+     ----------
+     provincias: list
+         codigos de provincia segun ISO3166-2 incluidos en el índice
+     año_inicial: int
+         primer año incluido
+     año_final: int
+         último año incluido
+     nombres: list
+         tabla de nombres de feriados
+     Métodos
+     -------
+     construir(cls, provincias, año_inicial, año_final):
+         Genera el índice a partir de las reglas de FeriadoEcuador
+     cargar(cls, ruta):
+         Proyecta en memoria un índice guardado
+     guardar(self, ruta):
+         Escribe el índice en un archivo binario
+     cubre(self, provincia, año):
+         Devuelve True si el índice contiene la provincia y el año
+     es_feriado(self, provincia, fecha):
+         Devuelve True si la fecha es feriado en la provincia
+     nombre(self, provincia, fecha):
+         Devuelve el nombre del feriado o None
+     feriados(self, provincia, año):
+         Devuelve los feriados del año como {datetime.date: nombre}
+     verificar(self):
+         Compara el índice con las reglas vigentes de reglas_feriados
+    """
+
+    def __init__(self, provincias, año_inicial, año_final, nombres, datos, inicio=0):
+        """
+        Construye el índice sobre un bloque binario ya armado (bytes o mmap).
+         Normalmente se usa construir() o cargar() en lugar del constructor.
+         Parámetros
+         ----------
+         provincias: list
+             codigos de provincia segun ISO3166-2
+         año_inicial: int
+             primer año incluido
+         año_final: int
+             último año incluido
+         nombres: list
+             tabla de nombres de feriados
+         datos: bytes o mmap.mmap
+             bloque con los mapas de bits, los desplazamientos y los números de nombre
+         inicio: int, opcional
+             posición del primer mapa de bits dentro de datos (el valor predeterminado es 0)
+        """
+        self.provincias = list(provincias)
+        self.año_inicial = año_inicial
+        self.año_final = año_final
+        self.nombres = list(nombres)
+        self._posicion = {p: i for i, p in enumerate(self.provincias)}
+        self._datos = datos
+        self._bits = inicio
+        ranuras = len(self.provincias) * (año_final - año_inicial + 1)
+        self._desplazamientos = inicio + ranuras * BYTES_AÑO
+        self._numeros = self._desplazamientos + (ranuras + 1) * 4
+
+    @classmethod
+    def construir(cls, provincias, año_inicial, año_final):
+        """
+        Genera el índice evaluando las reglas de FeriadoEcuador para cada provincia y año
+         Parámetros
+         ----------
+         provincias: list
+             codigos de provincia segun ISO3166-2
+         año_inicial: int
+             primer año incluido
+         año_final: int
+             último año incluido
+         Devoluciones
+         -------
+         Devuelve un IndiceFeriados en memoria
+        """
+        if año_final < año_inicial:
+            raise ValueError('El año final debe ser mayor o igual al año inicial')
+        from feriados_ecuador import FeriadoEcuador
+
+        nombres = []
+        numero = {}
+        bits = bytearray()
+        desplazamientos = [0]
+        numeros = bytearray()
+        #Las reglas nacionales se evalúan una sola vez por año para todas las provincias
+        compilados = {año: FeriadoEcuador.compilar(provincias, año) for año in range(año_inicial, año_final + 1)}
+        for provincia in provincias:
+            for año in range(año_inicial, año_final + 1):
+                feriados = compilados[año][provincia]
+                mapa = bytearray(BYTES_AÑO)
+                inicio = datetime.date(año, 1, 1).toordinal()
+                for fecha in sorted(f for f in feriados if f.year == año):
+                    d = fecha.toordinal() - inicio
+                    mapa[d >> 3] |= 1 << (d & 7)
+                    nombre = feriados[fecha]
+                    if nombre not in numero:
+                        numero[nombre] = len(nombres)
+                        nombres.append(nombre)
+                    numeros.append(numero[nombre])
+                bits += mapa
+                desplazamientos.append(len(numeros))
+        if len(nombres) > 256:
+            raise ValueError('El índice admite como máximo 256 nombres de feriados')
+        datos = bytes(bits) + struct.pack('<{}I'.format(len(desplazamientos)), *desplazamientos) + bytes(numeros)
+        return cls(provincias, año_inicial, año_final, nombres, datos)
+
+    @classmethod
+    def cargar(cls, ruta):
+        """
+        Proyecta en memoria un índice guardado con guardar(); no evalúa ninguna regla
+         Parámetros
+         ----------
+         ruta: str
+             ruta del archivo del índice
+         Devoluciones
+         -------
+         Devuelve un IndiceFeriados respaldado por mmap
+         Aumenta
+         ------
+         ValorError
+             Si el archivo no es un índice de feriados válido
+        """
+        with open(ruta, 'rb') as archivo:
+            datos = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        if datos[:len(MAGICO)] != MAGICO:
+            datos.close()
+            raise ValueError('El archivo {} no es un índice de feriados válido'.format(ruta))
+        largo, = struct.unpack_from('<I', datos, len(MAGICO))
+        inicio = len(MAGICO) + 4
+        cabecera = json.loads(datos[inicio:inicio + largo].decode('utf-8'))
+        return cls(cabecera['provincias'], cabecera['año_inicial'], cabecera['año_final'],
+                   cabecera['nombres'], datos, inicio + largo)
+
+    def guardar(self, ruta):
+        """
+        Escribe el índice en un archivo binario que luego se puede cargar con cargar()
+         Parámetros
+         ----------
+         ruta: str
+             ruta del archivo a escribir
+        """
+        cabecera = json.dumps({
+            'provincias': self.provincias,
+            'año_inicial': self.año_inicial,
+            'año_final': self.año_final,
+            'nombres': self.nombres}, ensure_ascii=False).encode('utf-8')
+        with open(ruta, 'wb') as archivo:
+            archivo.write(MAGICO)
+            archivo.write(struct.pack('<I', len(cabecera)))
+            archivo.write(cabecera)
+            archivo.write(self._datos[self._bits:])
+
+    def cubre(self, provincia, año):
+        """Devuelve True si el índice contiene la provincia y el año"""
+        return provincia in self._posicion and self.año_inicial <= año <= self.año_final
+
+    def __ranura(self, provincia, año):
+        """
+        Calcula la ranura de una (provincia, año)
+         Aumenta
+         ------
+         KeyError
+             Si la provincia o el año no están en el índice
+        """
+        if not self.cubre(provincia, año):
+            raise KeyError('El índice no contiene {} {}'.format(provincia, año))
+        return self._posicion[provincia] * (self.año_final - self.año_inicial + 1) + año - self.año_inicial
+
+    def es_feriado(self, provincia, fecha):
+        """
+        Comprueba si una fecha es feriado en una provincia
+         Parámetros
+         ----------
+         provincia: str
+             codigo de provincia segun ISO3166-2
+         fecha: datetime.date
+             fecha a consultar
+         Devoluciones
+         -------
+         Devuelve True si la fecha es feriado, de lo contrario False
+        """
+        d = fecha.timetuple().tm_yday - 1
+        byte = self._datos[self._bits + self.__ranura(provincia, fecha.year) * BYTES_AÑO + (d >> 3)]
+        return bool(byte >> (d & 7) & 1)
+
+    def nombre(self, provincia, fecha):
+        """
+        Devuelve el nombre del feriado en la fecha, o None si no es feriado
+         Parámetros
+         ----------
+         provincia: str
+             codigo de provincia segun ISO3166-2
+         fecha: datetime.date
+             fecha a consultar
+        """
+        ranura = self.__ranura(provincia, fecha.year)
+        d = fecha.timetuple().tm_yday - 1
+        inicio = self._bits + ranura * BYTES_AÑO
+        mapa = int.from_bytes(self._datos[inicio:inicio + BYTES_AÑO], 'little')
+        if not mapa >> d & 1:
+            return None
+        #El número de nombre está en la posición del bit dentro de los bits marcados del año
+        rango = bin(mapa & ((1 << d) - 1)).count('1')
+        desplazamiento, = struct.unpack_from('<I', self._datos, self._desplazamientos + ranura * 4)
+        return self.nombres[self._datos[self._numeros + desplazamiento + rango]]
+
+    def feriados(self, provincia, año):
+        """
+        Devuelve los feriados de una provincia en un año
+         Parámetros
+         ----------
+         provincia: str
+             codigo de provincia segun ISO3166-2
+         año: int
+             año a consultar
+         Devoluciones
+         -------
+         Devuelve un diccionario {datetime.date: nombre}
+        """
+        ranura = self.__ranura(provincia, año)
+        inicio = self._bits + ranura * BYTES_AÑO
+        mapa = int.from_bytes(self._datos[inicio:inicio + BYTES_AÑO], 'little')
+        desde, hasta = struct.unpack_from('<2I', self._datos, self._desplazamientos + ranura * 4)
+        numeros = self._datos[self._numeros + desde:self._numeros + hasta]
+        base = datetime.date(año, 1, 1).toordinal()
+        dias = [d for d in range(366) if mapa >> d & 1]
+        return {datetime.date.fromordinal(base + d): self.nombres[n] for d, n in zip(dias, numeros)}
+
+    def verificar(self):
+        """
+        Compara el índice con las reglas vigentes de reglas_feriados, evaluadas para cada provincia
+         y año sin pasar por construir(), de modo que un error al armar el índice o un archivo dañado
+         aparecen como diferencias
+         Devoluciones
+         -------
+         Devuelve una lista de tuplas (provincia, fecha, nombre según las reglas, nombre en el índice)
+         con cada diferencia; la lista vacía indica que el índice está al día
+        """
+        from reglas_feriados import reglas_feriados
+
+        diferencias = []
+        for provincia in self.provincias:
+            for año in range(self.año_inicial, self.año_final + 1):
+                esperado = {fecha: nombre for fecha, nombre in reglas_feriados.provinciales(provincia, año).items()
+                            if fecha.year == año}
+                indexado = self.feriados(provincia, año)
+                for fecha in sorted(set(esperado) | set(indexado)):
+                    if esperado.get(fecha) != indexado.get(fecha):
+                        diferencias.append((provincia, fecha, esperado.get(fecha), indexado.get(fecha)))
+        return diferencias
+
+
+if __name__ == '__main__':
+    analizador = argparse.ArgumentParser(description='Índice precalculado de feriados de Ecuador')
+    ordenes = analizador.add_subparsers(dest='orden', required=True)
+    construir = ordenes.add_parser('construir', help='Genera el índice y lo guarda en un archivo')
+    construir.add_argument('ruta', help='archivo de salida')
+    construir.add_argument('--desde', type=int, default=1990, help='primer año (predeterminado 1990)')
+    construir.add_argument('--hasta', type=int, default=2100, help='último año (predeterminado 2100)')
+    construir.add_argument('--provincia', action='append', help='codigo ISO3166-2, se puede repetir (predeterminado: todas las provincias)')
+    verificar = ordenes.add_parser('verificar', help='Compara un índice guardado con las reglas vigentes')
+    verificar.add_argument('ruta', help='archivo del índice')
+    argumentos = analizador.parse_args()
+
+    if argumentos.orden == 'construir':
+        if argumentos.provincia:
+            provincias = argumentos.provincia
+        else:
+            from feriados_ecuador import FeriadoEcuador
+            provincias = FeriadoEcuador.PROVINCIA
+        indice = IndiceFeriados.construir(provincias, argumentos.desde, argumentos.hasta)
+        indice.guardar(argumentos.ruta)
+        print('Índice de {} provincia(s), {}-{} guardado en {}'.format(
+            len(indice.provincias), indice.año_inicial, indice.año_final, argumentos.ruta))
+    else:
+        diferencias = IndiceFeriados.cargar(argumentos.ruta).verificar()
+        for provincia, fecha, esperado, indexado in diferencias:
+            print('{} {}: reglas={!r} indice={!r}'.format(provincia, fecha.isoformat(), esperado, indexado))
+        print('{} diferencia(s)'.format(len(diferencias)))
+        sys.exit(1 if diferencias else 0)
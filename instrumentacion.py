@@ -0,0 +1,214 @@
+#Ubica cada duración en su intervalo del histograma
+import bisect
+#Mide la duración de las etapas
+import time
+#Sincroniza los contadores entre los hilos del servicio
+import threading
+#Cuenta eventos por nombre
+from collections import Counter
+#Convierte medir en un administrador de contexto
+from contextlib import contextmanager
+
+#Instrumentación activa del proceso; None la desactiva. Lab4 y feriados_ecuador
+#consultan esta variable antes de medir, de modo que desactivada solo cuesta una comparación.
+activa = None
+
+
+class Histograma:
+    """
+    Histograma de duraciones con intervalos fijos en escala logarítmica.
+     ...
+     Atributos
+     ----------
+     LIMITES: tuple de float
+         límite superior en segundos de cada intervalo; el último intervalo no tiene límite
+     cantidad: int
+         número de duraciones registradas
+     total: float
+         suma de las duraciones en segundos
+     maximo: float
+         duración más larga registrada
+     Métodos
+     -------
+     registrar(self, segundos):
+         Agrega una duración
+     percentil(self, p):
+         Devuelve el límite superior del intervalo que contiene el percentil p
+     resumen(self):
+         Devuelve un diccionario con la cantidad, la media, p50, p99 y el máximo en microsegundos
+    """
+    #1 µs, 2 µs, 5 µs, ... 10 s
+    LIMITES = tuple(base * 10 ** exponente for exponente in range(-6, 1) for base in (1, 2, 5)) + (10.0,)
+
+    def __init__(self):
+        """Construye un histograma vacío"""
+        self.cantidad = 0
+        self.total = 0.0
+        self.maximo = 0.0
+        self._intervalos = [0] * (len(self.LIMITES) + 1)
+
+    def registrar(self, segundos):
+        """Agrega una duración en segundos"""
+        self.cantidad += 1
+        self.total += segundos
+        if segundos > self.maximo:
+            self.maximo = segundos
+        self._intervalos[bisect.bisect_left(self.LIMITES, segundos)] += 1
+
+    def percentil(self, p):
+        """
+        Estima un percentil a partir de los intervalos
+         Parámetros
+         ----------
+         p: float
+             percentil entre 0 y 1
+         Devoluciones
+         -------
+         Devuelve el límite superior en segundos del intervalo que contiene el percentil
+         (el máximo para el último intervalo), o None si no hay duraciones
+        """
+        if not self.cantidad:
+            return None
+        objetivo = p * self.cantidad
+        acumulado = 0
+        for i, cuenta in enumerate(self._intervalos):
+            acumulado += cuenta
+            if acumulado >= objetivo and cuenta:
+                return min(self.LIMITES[i], self.maximo) if i < len(self.LIMITES) else self.maximo
+        return self.maximo
+
+    def resumen(self):
+        """Devuelve un diccionario con la cantidad, la media, p50, p99 y el máximo en microsegundos"""
+        def micros(segundos):
+            return None if segundos is None else segundos * 1e6
+        return {
+            'cantidad': self.cantidad,
+            'media_us': micros(self.total / self.cantidad if self.cantidad else None),
+            'p50_us': micros(self.percentil(0.50)),
+            'p99_us': micros(self.percentil(0.99)),
+            'maximo_us': micros(self.maximo if self.cantidad else None)}
+
+
+class Instrumentacion:
+    """
+    Contadores e histogramas en memoria de las decisiones de Pico y Placa.
+     Etapas que se miden (histogramas):
+         validacion            construcción y validación de PicoPlaca
+         feriado               consulta de feriado de predecir (calendario, índice o API)
+         predecir              predecir completo
+         feriados.poblacion    generación de los feriados de un año con FeriadoEcuador
+         calendario.generar    armado de un calendario ausente en la cache
+         http                  solicitudes a la API de días festivos abstractos
+         lote.analizar, lote.feriados, lote.evaluar   etapas de predecir_lote
+     Contadores:
+         decision.feriado, decision.exenta, decision.fuera_de_pico,
+         decision.digito_permitido, decision.restringido   motivo de cada veredicto
+         cache.aciertos, cache.fallos, indice.lecturas      accesos a cache_calendarios
+         http.consultas, http.errores                       solicitudes a la API
+         validacion.errores, lote.filas                     filas rechazadas y evaluadas por lotes
+         veredictos.aciertos, veredictos.aciertos_disco,
+         veredictos.fallos                                  accesos a la cache de veredictos
+     ...
+     Atributos
+     ----------
+     contadores: collections.Counter
+         eventos contados por nombre
+     etapas: dict
+         histograma de duraciones por etapa, {nombre: Histograma}
+     Métodos
+     -------
+     contar(self, nombre, n=1):
+         Suma n al contador
+     registrar(self, etapa, segundos):
+         Agrega una duración al histograma de la etapa
+     medir(self, etapa):
+         Administrador de contexto que mide la duración de su bloque
+     proporcion_aciertos(self):
+         Devuelve la proporción de aciertos de cache_calendarios
+     resumen(self):
+         Devuelve los contadores y los histogramas como un diccionario
+     reiniciar(self):
+         Pone todo en cero
+    """
+
+    def __init__(self):
+        """Construye una instrumentación sin eventos"""
+        self.contadores = Counter()
+        self.etapas = {}
+        self._candado = threading.Lock()
+
+    def contar(self, nombre, n=1):
+        """Suma n al contador nombre"""
+        with self._candado:
+            self.contadores[nombre] += n
+
+    def registrar(self, etapa, segundos):
+        """Agrega una duración en segundos al histograma de la etapa"""
+        with self._candado:
+            histograma = self.etapas.get(etapa)
+            if histograma is None:
+                histograma = self.etapas[etapa] = Histograma()
+            histograma.registrar(segundos)
+
+    @contextmanager
+    def medir(self, etapa):
+        """Mide la duración del bloque with y la registra en la etapa"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(etapa, time.perf_counter() - inicio)
+
+    def proporcion_aciertos(self):
+        """
+        Calcula la proporción de aciertos de cache_calendarios
+         Devoluciones
+         -------
+         Devuelve aciertos / (aciertos + fallos), o None si no hubo accesos
+        """
+        aciertos = self.contadores['cache.aciertos']
+        total = aciertos + self.contadores['cache.fallos']
+        return aciertos / total if total else None
+
+    def resumen(self):
+        """
+        Resume los eventos registrados
+         Devoluciones
+         -------
+         Devuelve un diccionario con los contadores, la proporción de aciertos de la cache
+         y el resumen de cada etapa
+        """
+        with self._candado:
+            return {
+                'contadores': dict(self.contadores),
+                'cache_proporcion_aciertos': self.proporcion_aciertos(),
+                'etapas': {etapa: histograma.resumen() for etapa, histograma in sorted(self.etapas.items())}}
+
+    def reiniciar(self):
+        """Pone los contadores y los histogramas en cero"""
+        with self._candado:
+            self.contadores.clear()
+            self.etapas.clear()
+
+
+def activar(instrumentacion=None):
+    """
+    Activa la instrumentación del proceso
+     Parámetros
+     ----------
+     instrumentacion: Instrumentacion, opcional
+         instrumentación a usar (el valor predeterminado es una nueva)
+     Devoluciones
+     -------
+     Devuelve la instrumentación activa
+    """
+    global activa
+    activa = instrumentacion if instrumentacion is not None else Instrumentacion()
+    return activa
+
+
+def desactivar():
+    """Desactiva la instrumentación; devuelve la que estaba activa (o None)"""
+    global activa
+    anterior, activa = activa, None
+    return anterior
@@ -0,0 +1,573 @@
+#Proporciona clases para manipular fechas y horas.
+import datetime
+#Copia las reglas al recortar su vigencia
+import copy
+#Sincroniza el acceso concurrente a las evaluaciones guardadas
+import threading
+#Evita que los suscriptores se mantengan vivos solo por estar suscritos
+import weakref
+
+#Meses
+ENE, FEB, MAR, ABR, MAY, JUN, JUL, AGO, SEP, OCT, NOV, DIC = range(1, 13)
+
+# ISO 3166-2 códigos para la subdivisión principal,
+# llamado provincias
+# https://es.wikipedia.org/wiki/ISO_3166-2:EC
+PROVINCIAS = [
+        "EC-A",  # Azuay
+        "EC-B",  # Bolívar
+        "EC-C",  # Carchi
+        "EC-D",  # Orellana
+        "EC-E",  # Esmeraldas
+        "EC-F",  # Cañar
+        "EC-G",  # Guayas
+        "EC-H",  # Chimborazo
+        "EC-I",  # Imbabura
+        "EC-L",  # Loja
+        "EC-M",  # Manabí
+        "EC-N",  # Napo
+        "EC-O",  # El Oro
+        "EC-P",  # Pichincha
+        "EC-R",  # Los Ríos
+        "EC-S",  # Morona Santiago
+        "EC-SD",  # Santo Domingo de los Tsáchilas
+        "EC-SE",  # Santa Elena
+        "EC-T",  # Tungurahua
+        "EC-U",  # Sucumbíos
+        "EC-W",  # Galápagos
+        "EC-X",  # Cotopaxi
+        "EC-Y",  # Pastaza
+        "EC-Z"]  # Zamora Chinchipe
+
+#Feriados locales por provincia en la forma {provincia: [(mes, día, nombre, primer año)]}.
+#Todos se trasladan con las mismas reglas que el día del trabajo desde 2016;
+#las provincias sin entradas solo tienen los feriados nacionales.
+FERIADOS_PROVINCIALES = {
+        "EC-E": [(AGO, 5, "Independencia de Esmeraldas [Independence of Esmeraldas]", 1820)],
+        "EC-G": [(JUL, 25, "Fundación de Guayaquil [Foundation of Guayaquil]", 1534)],
+        "EC-H": [(NOV, 11, "Independencia de Riobamba [Independence of Riobamba]", 1820)],
+        "EC-L": [(NOV, 18, "Independencia de Loja [Independence of Loja]", 1820)],
+        "EC-P": [(DIC, 6, "La fundación de Quito [Fundación de Quito]", 1534)],
+        "EC-SD": [(NOV, 6, "Provincialización de Santo Domingo de los Tsáchilas", 2008)],
+        "EC-SE": [(NOV, 7, "Provincialización de Santa Elena", 2008)],
+        "EC-T": [(NOV, 12, "Independencia de Ambato [Independence of Ambato]", 1820)],
+        "EC-W": [(FEB, 12, "Provincialización de Galápagos [Galápagos Day]", 1974)],
+        "EC-X": [(NOV, 11, "Independencia de Latacunga [Independence of Latacunga]", 1820)]}
+
+
+class Regla:
+    """
+    Regla de feriados versionada con un rango de vigencia en años.
+     Cada enmienda de una regla es una nueva versión con la misma clave; las versiones
+     no se modifican una vez registradas, por lo que lo que genera una regla en un año
+     depende solo de (clave, versión, provincia) y del traslado vigente.
+     ...
+     Atributos
+     ----------
+     clave: str
+         nombre de la regla, común a todas sus versiones (por ejemplo 'trabajo')
+     version: int
+         número de versión
+     desde: int o None
+         primer año de vigencia (None: sin límite)
+     hasta: int o None
+         último año de vigencia (None: sin límite)
+     provincia: str o None
+         codigo de provincia segun ISO3166-2; None para las reglas nacionales
+     trasladable: bool
+         True si el feriado se mueve con el Traslado vigente
+     Métodos
+     -------
+     vigente(self, año):
+         Devuelve True si la regla rige en el año
+     firma(self):
+         Devuelve (clave, versión, provincia), que identifica lo que genera la regla
+     con_vigencia(self, desde, hasta):
+         Devuelve una copia de la regla con otra vigencia
+     fechas(self, año, traslado):
+         Devuelve la lista de (fecha, nombre) que la regla genera en el año
+    """
+    trasladable = False
+
+    def __init__(self, clave, version=1, desde=None, hasta=None, provincia=None):
+        """
+        Construye la regla.
+         Parámetros
+         ----------
+         clave: str
+             nombre de la regla
+         version: int, opcional
+             número de versión (el valor predeterminado es 1)
+         desde: int, opcional
+             primer año de vigencia (el valor predeterminado es None, sin límite)
+         hasta: int, opcional
+             último año de vigencia (el valor predeterminado es None, sin límite)
+         provincia: str, opcional
+             codigo de provincia segun ISO3166-2 (el valor predeterminado es None, regla nacional)
+         Aumenta
+         ------
+         ValorError
+             Si la vigencia está vacía o la provincia no es un codigo ISO 3166-2:EC
+        """
+        if desde is not None and hasta is not None and hasta < desde:
+            raise ValueError('La vigencia de la regla {} está vacía ({}-{})'.format(clave, desde, hasta))
+        if provincia is not None and provincia not in PROVINCIAS:
+            raise ValueError('Provincia desconocida: {} (use un codigo ISO 3166-2:EC)'.format(provincia))
+        self.clave = clave
+        self.version = version
+        self.desde = desde
+        self.hasta = hasta
+        self.provincia = provincia
+
+    def __repr__(self):
+        return '{}({!r}, version={}, desde={}, hasta={}{})'.format(
+            type(self).__name__, self.clave, self.version, self.desde, self.hasta,
+            '' if self.provincia is None else ', provincia={!r}'.format(self.provincia))
+
+    def vigente(self, año):
+        """Devuelve True si la regla rige en el año"""
+        return (self.desde is None or año >= self.desde) and (self.hasta is None or año <= self.hasta)
+
+    def firma(self):
+        """Devuelve (clave, versión, provincia)"""
+        return self.clave, self.version, self.provincia
+
+    def con_vigencia(self, desde, hasta):
+        """Devuelve una copia de la regla con la vigencia [desde, hasta]"""
+        regla = copy.copy(self)
+        regla.desde = desde
+        regla.hasta = hasta
+        return regla
+
+    def fechas(self, año, traslado):
+        """
+        Genera los feriados de la regla en un año
+         Parámetros
+         ----------
+         año: int
+             año a generar
+         traslado: Traslado o None
+             traslado vigente en el año (solo lo usan las reglas trasladables)
+         Devoluciones
+         -------
+         Devuelve una lista de tuplas (datetime.date, nombre)
+        """
+        raise NotImplementedError
+
+
+class Traslado(Regla):
+    """
+    Regla que mueve los feriados trasladables según el día de la semana en que caen.
+     (Ley 858/Ley de Reforma a la LOSEP (vigente desde el 21 de diciembre de 2016 /R.O # 906))
+     ...
+     Atributos
+     ----------
+     desplazamientos: dict
+         {día de la semana (lunes = 0): días que se mueve el feriado}
+     Métodos
+     -------
+     trasladar(self, fecha):
+         Devuelve la fecha en que se descansa un feriado que cae en fecha
+    """
+
+    def __init__(self, desplazamientos, version=1, desde=None, hasta=None):
+        """
+        Construye el traslado.
+         Parámetros
+         ----------
+         desplazamientos: dict
+             {día de la semana (lunes = 0): días que se mueve el feriado}; los días ausentes no se mueven
+         version, desde, hasta: ver Regla
+        """
+        Regla.__init__(self, 'traslado', version, desde, hasta)
+        if any(not 0 <= dia <= 6 for dia in desplazamientos):
+            raise ValueError('Los días de la semana de un traslado van de 0 (lunes) a 6 (domingo)')
+        self.desplazamientos = dict(desplazamientos)
+
+    def trasladar(self, fecha):
+        """Devuelve la fecha en que se descansa un feriado que cae en fecha"""
+        return fecha + datetime.timedelta(days=self.desplazamientos.get(fecha.weekday(), 0))
+
+    def fechas(self, año, traslado):
+        """Un traslado no genera feriados por sí mismo"""
+        return []
+
+
+class FeriadoFijo(Regla):
+    """
+    Feriado en un mismo mes y día todos los años, opcionalmente trasladable.
+     ...
+     Atributos
+     ----------
+     mes: int
+     dia: int
+     nombre: str
+     trasladable: bool
+    """
+
+    def __init__(self, clave, mes, dia, nombre, trasladable=False, version=1, desde=None, hasta=None, provincia=None):
+        """
+        Construye la regla.
+         Parámetros
+         ----------
+         mes, dia: int
+             fecha del feriado
+         nombre: str
+             nombre del feriado
+         trasladable: bool, opcional
+             si es Verdadero se aplica el Traslado vigente (el valor predeterminado es Falso)
+         clave, version, desde, hasta, provincia: ver Regla
+        """
+        Regla.__init__(self, clave, version, desde, hasta, provincia)
+        self.mes = mes
+        self.dia = dia
+        self.nombre = nombre
+        self.trasladable = trasladable
+
+    def fechas(self, año, traslado):
+        fecha = datetime.date(año, self.mes, self.dia)
+        if self.trasladable and traslado is not None:
+            fecha = traslado.trasladar(fecha)
+        return [(fecha, self.nombre)]
+
+
+class FeriadoPascua(Regla):
+    """
+    Feriado a una distancia fija del domingo de Pascua.
+     ...
+     Atributos
+     ----------
+     dias: int
+         días desde el domingo de Pascua (negativo antes)
+     nombre: str
+    """
+
+    def __init__(self, clave, dias, nombre, version=1, desde=None, hasta=None, provincia=None):
+        """
+        Construye la regla.
+         Parámetros
+         ----------
+         dias: int
+             días desde el domingo de Pascua
+         nombre: str
+             nombre del feriado
+         clave, version, desde, hasta, provincia: ver Regla
+        """
+        Regla.__init__(self, clave, version, desde, hasta, provincia)
+        self.dias = dias
+        self.nombre = nombre
+
+    def fechas(self, año, traslado):
+        from dateutil.easter import easter
+        return [(easter(año) + datetime.timedelta(days=self.dias), self.nombre)]
+
+
+class DifuntosCuenca(Regla):
+    """
+    Día de los difuntos (2 de noviembre) e Independencia de Cuenca (3 de noviembre).
+     (Ley 858/Ley de Reforma a la LOSEP (vigente desde el 21 de diciembre de 2016/R.O # 906))
+     Para festivos nacionales y/o locales que coincidan en días corridos se mueven juntos
+     según el día de la semana del 3 de noviembre.
+    """
+    #{día de la semana del 3 de noviembre: ((desplazamiento, feriado), ...)} en orden de asignación,
+    #con feriado 2 = difuntos y 3 = Independencia de Cuenca
+    MOVIMIENTOS = {
+            6: ((-1, 2), (1, 3)),  # 2 de noviembre en sábado
+            2: ((0, 2), (-2, 3)),
+            3: ((0, 3), (2, 2)),
+            5: ((0, 2), (-2, 3)),
+            0: ((0, 3), (2, 2))}
+    NOMBRES = {2: "Día de los difuntos [Día de difuntos]", 3: "Independencia de Cuenca [Independence of Cuenca]"}
+
+    def __init__(self, clave='difuntos_cuenca', version=1, desde=None, hasta=None):
+        Regla.__init__(self, clave, version, desde, hasta)
+
+    def fechas(self, año, traslado):
+        movimientos = self.MOVIMIENTOS.get(datetime.date(año, NOV, 3).weekday(), ((0, 2), (0, 3)))
+        return [(datetime.date(año, NOV, dia) + datetime.timedelta(days=desplazamiento), self.NOMBRES[dia])
+                for desplazamiento, dia in movimientos]
+
+
+def combinar(calendario, fecha, nombre):
+    """
+    Agrega un feriado a un diccionario {datetime.date: nombre} como lo hace HolidayBase:
+     si la fecha ya tiene otro feriado, los nombres se unen con ', '
+    """
+    anterior = calendario.get(fecha)
+    if anterior is None:
+        calendario[fecha] = nombre
+    elif anterior.find(nombre) < 0 and nombre.find(anterior) < 0:
+        calendario[fecha] = '{}, {}'.format(nombre, anterior)
+
+
+class ReglasFeriados:
+    """
+    Registro de las reglas de feriados vigentes con evaluación incremental.
+     Lo que genera cada regla en cada año se guarda por (firma de la regla, firma del traslado, año),
+     así que al enmendar una regla solo se vuelven a evaluar los años de esa regla; las demás
+     evaluaciones se reutilizan. Cada cambio compara los calendarios de los años conocidos
+     (los ya evaluados y los vigilados) antes y después, y avisa a los suscriptores solo las
+     (provincia, año) cuyos feriados cambiaron.
+     ...
+     Atributos
+     ----------
+     version: int
+         número de cambios aplicados
+     Métodos
+     -------
+     reglas(self):
+         Devuelve la lista de reglas registradas
+     traslado(self, año):
+         Devuelve el Traslado vigente en el año o None
+     nacionales(self, año):
+         Devuelve los feriados nacionales del año
+     locales(self, provincia, año):
+         Devuelve la lista de (fecha, nombre) de las reglas locales de la provincia
+     provinciales(self, provincia, año):
+         Devuelve los feriados nacionales y locales de la provincia en el año
+     agregar(self, regla):
+         Registra una regla
+     quitar(self, regla):
+         Elimina una regla
+     enmendar(self, regla):
+         Registra una nueva versión de una regla y recorta la vigencia de las versiones anteriores
+     suscribir(self, funcion):
+         Registra una función que recibe la lista de (provincia, año) que cambiaron
+     vigilar(self, años):
+         Agrega años cuyos cambios se detectan aunque todavía no se hayan evaluado
+     limpiar(self):
+         Descarta las evaluaciones guardadas
+    """
+
+    def __init__(self, reglas=()):
+        """
+        Construye el registro.
+         Parámetros
+         ----------
+         reglas: iterable de Regla, opcional
+             reglas iniciales, en el orden en que se asignan los feriados
+        """
+        self.version = 0
+        self._reglas = list(reglas)
+        self._evaluaciones = {}
+        #Años evaluados alguna vez (pueden estar en caches de otros módulos) y años vigilados
+        self._evaluados = set()
+        self._vigilados = set()
+        self._suscriptores = []
+        self._candado = threading.RLock()
+        self.__indexar()
+
+    def __indexar(self):
+        """Agrupa las reglas por provincia y separa los traslados; se llama después de cada cambio"""
+        self._traslados = [regla for regla in self._reglas if isinstance(regla, Traslado)]
+        self._por_provincia = {}
+        for regla in self._reglas:
+            if not isinstance(regla, Traslado):
+                self._por_provincia.setdefault(regla.provincia, []).append(regla)
+
+    def reglas(self):
+        """Devuelve una copia de la lista de reglas registradas"""
+        return list(self._reglas)
+
+    def traslado(self, año):
+        """Devuelve el Traslado vigente en el año (el último registrado si hay varios) o None"""
+        vigente = None
+        for regla in self._traslados:
+            if regla.vigente(año):
+                vigente = regla
+        return vigente
+
+    def __evaluar(self, regla, año, traslado):
+        """Devuelve lo que genera la regla en el año, reutilizando la evaluación guardada"""
+        if not regla.trasladable:
+            traslado = None
+        clave = (regla.firma(), None if traslado is None else traslado.firma(), año)
+        fechas = self._evaluaciones.get(clave)
+        if fechas is None:
+            fechas = tuple(regla.fechas(año, traslado))
+            with self._candado:
+                self._evaluaciones[clave] = fechas
+                self._evaluados.add(año)
+        return fechas
+
+    def __generar(self, provincia, año):
+        """Devuelve la lista de (fecha, nombre) de las reglas de la provincia (None: nacionales) vigentes en el año"""
+        traslado = self.traslado(año)
+        return [par for regla in self._por_provincia.get(provincia, ())
+                if regla.vigente(año)
+                for par in self.__evaluar(regla, año, traslado)]
+
+    def nacionales(self, año):
+        """
+        Genera los feriados nacionales de un año
+         Devoluciones
+         -------
+         Devuelve un nuevo diccionario {datetime.date: nombre}
+        """
+        calendario = {}
+        for fecha, nombre in self.__generar(None, año):
+            combinar(calendario, fecha, nombre)
+        return calendario
+
+    def locales(self, provincia, año):
+        """
+        Genera los feriados locales de una provincia en un año, sin los nacionales
+         Devoluciones
+         -------
+         Devuelve una lista de tuplas (datetime.date, nombre) en el orden de las reglas
+        """
+        if provincia is None:
+            return []
+        if provincia not in PROVINCIAS:
+            raise ValueError('Provincia desconocida: {} (use un codigo ISO 3166-2:EC)'.format(provincia))
+        return self.__generar(provincia, año)
+
+    def provinciales(self, provincia, año):
+        """
+        Genera los feriados nacionales y locales de una provincia en un año
+         Parámetros
+         ----------
+         provincia: str o None
+             codigo de provincia segun ISO3166-2; None devuelve solo los nacionales
+         año: int
+             año a generar
+         Devoluciones
+         -------
+         Devuelve un nuevo diccionario {datetime.date: nombre}, igual al de FeriadoEcuador(provincia=provincia, years=año)
+        """
+        calendario = self.nacionales(año)
+        for fecha, nombre in self.locales(provincia, año):
+            combinar(calendario, fecha, nombre)
+        return calendario
+
+    def agregar(self, regla):
+        """
+        Registra una regla al final de la lista
+         Devoluciones
+         -------
+         Devuelve la lista de (provincia, año) cuyos feriados cambiaron; provincia None indica
+         los feriados nacionales (todas las provincias)
+        """
+        return self.__cambiar([regla], lambda: self._reglas.append(regla))
+
+    def quitar(self, regla):
+        """
+        Elimina una regla registrada
+         Devoluciones
+         -------
+         Devuelve la lista de (provincia, año) cuyos feriados cambiaron
+        """
+        if regla not in self._reglas:
+            raise ValueError('La regla {!r} no está registrada'.format(regla))
+        return self.__cambiar([regla], lambda: self._reglas.remove(regla))
+
+    def enmendar(self, regla):
+        """
+        Registra una nueva versión de una regla; las versiones anteriores con la misma clave
+         y provincia dejan de regir en la vigencia de la nueva (se recortan o se eliminan)
+         Parámetros
+         ----------
+         regla: Regla
+             nueva versión, con un número de versión mayor que el de las registradas
+         Devoluciones
+         -------
+         Devuelve la lista de (provincia, año) cuyos feriados cambiaron
+         Aumenta
+         ------
+         ValorError
+             Si ya hay una versión igual o mayor de la regla
+        """
+        anteriores = [r for r in self._reglas if (r.clave, r.provincia) == (regla.clave, regla.provincia)]
+        if any(r.version >= regla.version for r in anteriores):
+            raise ValueError('La regla {} ya tiene una versión {} o mayor'.format(regla.clave, regla.version))
+
+        def aplicar():
+            posicion = len(self._reglas)
+            for anterior in anteriores:
+                i = self._reglas.index(anterior)
+                posicion = min(posicion, i)
+                piezas = []
+                if regla.desde is not None and (anterior.desde is None or anterior.desde < regla.desde):
+                    piezas.append(anterior.con_vigencia(
+                        anterior.desde, regla.desde - 1 if anterior.hasta is None else min(anterior.hasta, regla.desde - 1)))
+                if regla.hasta is not None and (anterior.hasta is None or anterior.hasta > regla.hasta):
+                    piezas.append(anterior.con_vigencia(
+                        regla.hasta + 1 if anterior.desde is None else max(anterior.desde, regla.hasta + 1), anterior.hasta))
+                piezas = [p for p in piezas if p.desde is None or p.hasta is None or p.desde <= p.hasta]
+                self._reglas[i:i + 1] = piezas
+            #La nueva versión ocupa el lugar de la primera anterior, para conservar el orden de asignación
+            self._reglas.insert(posicion, regla)
+        return self.__cambiar(anteriores + [regla], aplicar)
+
+    def __cambiar(self, tocadas, aplicar):
+        """Aplica un cambio de reglas, detecta las (provincia, año) afectadas y avisa a los suscriptores"""
+        with self._candado:
+            if any(isinstance(regla, Traslado) for regla in tocadas):
+                #Un traslado afecta a todas las reglas trasladables de todas las provincias
+                provincias = {None} | {r.provincia for r in self._reglas if r.trasladable}
+            else:
+                provincias = {regla.provincia for regla in tocadas}
+            conocidos = self._vigilados | self._evaluados
+            años = sorted(año for año in conocidos if any(regla.vigente(año) for regla in tocadas))
+            antes = {(provincia, año): self.__generar(provincia, año) for provincia in provincias for año in años}
+            aplicar()
+            self.__indexar()
+            self.version += 1
+            cambios = [clave for clave, fechas in antes.items() if self.__generar(*clave) != fechas]
+            cambios.sort(key=lambda clave: (clave[1], clave[0] or ''))
+            suscriptores = list(self._suscriptores)
+        for referencia in suscriptores:
+            funcion = referencia()
+            if funcion is not None and cambios:
+                funcion(cambios)
+        return cambios
+
+    def suscribir(self, funcion):
+        """
+        Registra una función que se llama con la lista de (provincia, año) cuyos feriados cambiaron;
+         los métodos se guardan con una referencia débil
+        """
+        with self._candado:
+            self._suscriptores = [referencia for referencia in self._suscriptores if referencia() is not None]
+            if hasattr(funcion, '__self__'):
+                self._suscriptores.append(weakref.WeakMethod(funcion))
+            else:
+                self._suscriptores.append(lambda: funcion)
+
+    def vigilar(self, años):
+        """Agrega años cuyos cambios se detectan aunque todavía no se hayan evaluado (por ejemplo, los de un índice precalculado)"""
+        with self._candado:
+            self._vigilados.update(años)
+
+    def limpiar(self):
+        """Descarta las evaluaciones guardadas; los feriados no cambian y los años evaluados se siguen vigilando"""
+        with self._candado:
+            self._evaluaciones.clear()
+
+
+#Traslados de la Ley 858/Ley de Reforma a la LOSEP: martes y sábado al día anterior,
+#miércoles y jueves al viernes y domingo al lunes
+TRASLADO_LOSEP = Traslado({1: -1, 2: 2, 3: 1, 5: -1, 6: 1}, desde=2016)
+
+#Reglas nacionales en el orden en que se asignan
+REGLAS_NACIONALES = [
+        FeriadoFijo('año_nuevo', ENE, 1, "Año Nuevo [Nuevo año]"),
+        FeriadoFijo('navidad', DIC, 25, "Navidad [Navidades]"),
+        FeriadoPascua('viernes_santo', -2, "Semana Santa (Viernes Santo) [Good Friday)]"),
+        FeriadoPascua('pascua', 0, "D�a de Pascuas [Easter Day]"),
+        FeriadoPascua('lunes_carnaval', -48, "Lunes de carnaval [Carnival of Monday)]"),
+        FeriadoPascua('martes_carnaval', -47, "Martes de carnaval [Tuesday of Carnival)]"),
+        FeriadoFijo('trabajo', MAY, 1, "Día Nacional del Trabajo [Día del laborador]", trasladable=True),
+        FeriadoFijo('batalla_pichincha', MAY, 24, "La batalla del Pichincha [Batalla de Pichincha]", trasladable=True),
+        FeriadoFijo('primer_grito', AGO, 10, "El primer Grito de la Independencia [Primer grito de independencia]", trasladable=True),
+        FeriadoFijo('independencia_guayaquil', OCT, 9, "La independencia de Guayaquil [Independencia de Guayaquil]", trasladable=True),
+        DifuntosCuenca()]
+
+#Reglas locales generadas desde FERIADOS_PROVINCIALES
+REGLAS_LOCALES = [
+        FeriadoFijo('local-{:02d}-{:02d}'.format(mes, dia), mes, dia, nombre, trasladable=True, desde=desde, provincia=provincia)
+        for provincia, feriados in FERIADOS_PROVINCIALES.items()
+        for mes, dia, nombre, desde in feriados]
+
+#Registro compartido por FeriadoEcuador, cache_calendarios e indice_feriados
+reglas_feriados = ReglasFeriados([TRASLADO_LOSEP] + REGLAS_NACIONALES + REGLAS_LOCALES)
@@ -0,0 +1,314 @@
+#Proporciona clases para manipular fechas y horas.
+import datetime
+#Facilita la escritura de interfaces de línea de comandos amigables.
+import argparse
+#Atiende las solicitudes de forma concurrente
+import asyncio
+#Ventana de latencias recientes para los percentiles
+from collections import deque
+#Mide latencias y rendimiento
+import time
+#Servidor HTTP asíncrono
+from aiohttp import web
+
+import instrumentacion
+import veredictos
+import Lab4
+from horarios import TablaHorarios
+from Lab4 import PicoPlaca, cache_calendarios
+
+
+class Metricas:
+    """
+    Contadores de latencia y rendimiento del servicio.
+     ...
+     Atributos
+     ----------
+     solicitudes: int
+         solicitudes HTTP atendidas
+     consultas: int
+         placas evaluadas (una por solicitud simple, varias por solicitud por lotes)
+     lotes: int
+         evaluaciones vectorizadas completadas (los lotes rechazados no cuentan)
+     Métodos
+     -------
+     registrar(self, segundos, consultas=1):
+         Registra una solicitud atendida
+     registrar_lote(self):
+         Registra una evaluación vectorizada
+     resumen(self):
+         Devuelve un diccionario con p50/p99 de latencia y el rendimiento
+    """
+
+    def __init__(self, ventana=10000):
+        """
+        Construye los contadores en cero.
+         Parámetros
+         ----------
+         ventana: int, opcional
+             número de latencias recientes usadas para los percentiles (el valor predeterminado es 10000)
+        """
+        self.inicio = time.monotonic()
+        self.solicitudes = 0
+        self.consultas = 0
+        self.lotes = 0
+        self._latencias = deque(maxlen=ventana)
+
+    def registrar(self, segundos, consultas=1):
+        """Registra una solicitud atendida en segundos que evaluó el número de consultas indicado"""
+        self.solicitudes += 1
+        self.consultas += consultas
+        self._latencias.append(segundos)
+
+    def registrar_lote(self):
+        """Registra una evaluación vectorizada"""
+        self.lotes += 1
+
+    def resumen(self):
+        """
+        Resume los contadores
+         Devoluciones
+         -------
+         Devuelve un diccionario con las latencias p50/p99 en milisegundos, las solicitudes y
+         consultas por segundo desde el inicio y el tamaño medio de los lotes
+        """
+        latencias = sorted(self._latencias)
+
+        def percentil(p):
+            if not latencias:
+                return None
+            return latencias[min(len(latencias) - 1, int(p * len(latencias)))] * 1000
+
+        transcurrido = time.monotonic() - self.inicio
+        return {
+            'solicitudes': self.solicitudes,
+            'consultas': self.consultas,
+            'lotes': self.lotes,
+            'consultas_por_lote': self.consultas / self.lotes if self.lotes else None,
+            'latencia_p50_ms': percentil(0.50),
+            'latencia_p99_ms': percentil(0.99),
+            'solicitudes_por_s': self.solicitudes / transcurrido,
+            'consultas_por_s': self.consultas / transcurrido}
+
+
+#Clave de las métricas del servicio en la aplicación: aplicacion[METRICAS]
+METRICAS = web.AppKey('metricas', Metricas)
+
+
+class AgrupadorPredicciones:
+    """
+    Agrupa consultas simples concurrentes en una sola evaluación vectorizada.
+     Cada consulta espera como máximo la ventana de tiempo (o hasta que se junten
+     maximo consultas) y luego todas se evalúan con PicoPlaca.predecir_lote en un hilo,
+     para no bloquear el bucle de eventos. Con la cache de veredictos activa, cada consulta
+     cuyo veredicto ya está en memoria se responde en el momento, sin esperar la ventana;
+     las demás se calculan con PicoPlaca.predecir en un hilo.
+     ...
+     Atributos
+     ----------
+     ventana: float
+         segundos que se espera a más consultas antes de evaluar
+     maximo: int
+         consultas que disparan la evaluación sin esperar la ventana
+     Métodos
+     -------
+     predecir(self, placa, fecha, hora):
+         Devuelve (puede_circular, error) de una consulta
+    """
+
+    def __init__(self, metricas, ventana=0.002, maximo=4096):
+        """
+        Construye el agrupador.
+         Parámetros
+         ----------
+         metricas: Metricas
+             contadores donde se registran los lotes
+         ventana: float, opcional
+             segundos de espera (el valor predeterminado es 0.002)
+         maximo: int, opcional
+             tamaño máximo de un lote (el valor predeterminado es 4096)
+        """
+        self.metricas = metricas
+        self.ventana = ventana
+        self.maximo = maximo
+        self._pendientes = []
+        self._temporizador = None
+
+    async def predecir(self, placa, fecha, hora):
+        """
+        Encola una consulta y espera su resultado
+         Devoluciones
+         -------
+         Devuelve una tupla (puede_circular, error): error es None o el mensaje de validación
+        """
+        cache = veredictos.activa
+        if cache is not None:
+            try:
+                registro = PicoPlaca(placa, fecha, hora)
+            except ValueError as error:
+                return False, str(error)
+            #Solo el acierto en memoria se responde en el bucle; un fallo puede generar un
+             #calendario de feriados o leer y escribir la base, así que va a un hilo
+            puede = cache.en_memoria(registro._clave_veredicto(cache))
+            if puede is None:
+                puede = await asyncio.get_running_loop().run_in_executor(None, registro.predecir)
+            return puede, None
+        futuro = asyncio.get_running_loop().create_future()
+        self._pendientes.append((placa, fecha, hora, futuro))
+        if len(self._pendientes) >= self.maximo:
+            self.__despachar()
+        elif self._temporizador is None:
+            self._temporizador = asyncio.get_running_loop().call_later(self.ventana, self.__despachar)
+        return await futuro
+
+    def __despachar(self):
+        """Evalúa las consultas pendientes como un lote"""
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+        lote, self._pendientes = self._pendientes, []
+        if lote:
+            asyncio.ensure_future(self.__evaluar(lote))
+
+    async def __evaluar(self, lote):
+        """Evalúa un lote en un hilo y resuelve los futuros de cada consulta"""
+        placas, fechas, horas, futuros = zip(*lote)
+        try:
+            resultado, errores = await asyncio.get_running_loop().run_in_executor(
+                None, PicoPlaca.predecir_lote, placas, fechas, horas)
+        except Exception as error:
+            for futuro in futuros:
+                if not futuro.done():
+                    futuro.set_exception(error)
+            return
+        self.metricas.registrar_lote()
+        for futuro, puede, error in zip(futuros, resultado.tolist(), errores):
+            if not futuro.done():
+                futuro.set_result((puede, error))
+
+
+def calentar(años):
+    """
+    Genera de antemano los calendarios de feriados de Pichincha
+     Parámetros
+     ----------
+     años: iterable de int
+         años a generar
+    """
+    for año in años:
+        cache_calendarios.obtener('EC-P', año)
+
+
+def crear_aplicacion(ventana=0.002, maximo=4096, años=None):
+    """
+    Construye la aplicación del servicio de predicción
+     Rutas:
+         POST /predecir         {"placa", "fecha", "hora"} -> {"puede_circular"} (400 con {"error"} si es inválida)
+         POST /predecir/lote    {"placas": [...], "fechas": [...], "horas": [...]} -> {"resultados", "errores"}
+         GET  /metricas         latencia p50/p99 y rendimiento (y la instrumentación y la cache
+                                de veredictos, si están activas)
+         GET  /salud            {"estado": "ok"}
+     Parámetros
+     ----------
+     ventana: float, opcional
+         segundos que se agrupan las consultas simples (el valor predeterminado es 0.002)
+     maximo: int, opcional
+         tamaño máximo de un lote de consultas simples (el valor predeterminado es 4096)
+     años: iterable de int, opcional
+         años cuyos feriados se generan al iniciar (el valor predeterminado es el año actual y los dos contiguos)
+     Devoluciones
+     -------
+     Devuelve una aiohttp.web.Application con sus métricas en aplicacion[METRICAS]
+    """
+    if años is None:
+        actual = datetime.date.today().year
+        años = range(actual - 1, actual + 2)
+    metricas = Metricas()
+    agrupador = AgrupadorPredicciones(metricas, ventana, maximo)
+    aplicacion = web.Application()
+
+    async def predecir(solicitud):
+        inicio = time.perf_counter()
+        try:
+            cuerpo = await solicitud.json()
+            valores = [cuerpo[c] for c in ('placa', 'fecha', 'hora')]
+        except (ValueError, KeyError, TypeError):
+            return web.json_response({'error': 'Se espera un objeto JSON con placa, fecha y hora'}, status=400)
+        puede, error = await agrupador.predecir(*(str(v) for v in valores))
+        metricas.registrar(time.perf_counter() - inicio)
+        if error is not None:
+            return web.json_response({'error': error}, status=400)
+        return web.json_response({'puede_circular': puede})
+
+    async def predecir_lote(solicitud):
+        inicio = time.perf_counter()
+        try:
+            cuerpo = await solicitud.json()
+            columnas = [cuerpo[c] for c in ('placas', 'fechas', 'horas')]
+            #Un texto o un objeto también se pueden recorrer, pero no son columnas
+            if not all(isinstance(columna, list) for columna in columnas):
+                raise TypeError
+            placas, fechas, horas = ([str(v) for v in columna] for columna in columnas)
+        except (ValueError, KeyError, TypeError):
+            return web.json_response({'error': 'Se espera un objeto JSON con las listas placas, fechas y horas'}, status=400)
+        try:
+            resultado, errores = await asyncio.get_running_loop().run_in_executor(
+                None, PicoPlaca.predecir_lote, placas, fechas, horas)
+        except ValueError as error:
+            return web.json_response({'error': str(error)}, status=400)
+        #Solo los lotes evaluados cuentan, para que consultas_por_lote no mezcle lotes rechazados
+        metricas.registrar_lote()
+        metricas.registrar(time.perf_counter() - inicio, len(placas))
+        return web.json_response({'resultados': resultado.tolist(), 'errores': errores})
+
+    async def ver_metricas(solicitud):
+        resumen = metricas.resumen()
+        if instrumentacion.activa is not None:
+            resumen['instrumentacion'] = instrumentacion.activa.resumen()
+        if veredictos.activa is not None:
+            resumen['veredictos'] = veredictos.activa.estadisticas()
+        return web.json_response(resumen)
+
+    async def salud(solicitud):
+        return web.json_response({'estado': 'ok'})
+
+    async def al_iniciar(aplicacion):
+        await asyncio.get_running_loop().run_in_executor(None, calentar, list(años))
+
+    async def al_terminar(aplicacion):
+        if veredictos.activa is not None:
+            veredictos.activa.confirmar()
+
+    aplicacion.router.add_post('/predecir', predecir)
+    aplicacion.router.add_post('/predecir/lote', predecir_lote)
+    aplicacion.router.add_get('/metricas', ver_metricas)
+    aplicacion.router.add_get('/salud', salud)
+    aplicacion.on_startup.append(al_iniciar)
+    aplicacion.on_cleanup.append(al_terminar)
+    aplicacion[METRICAS] = metricas
+    return aplicacion
+
+
+if __name__ == '__main__':
+    analizador = argparse.ArgumentParser(description='Servicio HTTP de predicción de Pico y Placa')
+    analizador.add_argument('--host', default='127.0.0.1', help='dirección de escucha (predeterminado 127.0.0.1)')
+    analizador.add_argument('--puerto', type=int, default=8080, help='puerto de escucha (predeterminado 8080)')
+    analizador.add_argument('--ventana-ms', type=float, default=2.0, help='milisegundos que se agrupan las consultas simples (predeterminado 2)')
+    analizador.add_argument('--lote-max', type=int, default=4096, help='tamaño máximo de un lote de consultas simples (predeterminado 4096)')
+    analizador.add_argument('--indice', help='índice precalculado de feriados (indice_feriados.py construir)')
+    analizador.add_argument('--instrumentar', action='store_true', help='agrega a /metricas los tiempos por etapa, los aciertos de la cache y los motivos de cada veredicto')
+    analizador.add_argument('--horarios', help='archivo JSON de horarios con rangos de vigencia (horarios.py ejemplo)')
+    analizador.add_argument('--veredictos', nargs='?', const='', help='responde las consultas simples con la cache de veredictos; con una ruta la comparte en una base SQLite con otros procesos')
+    argumentos = analizador.parse_args()
+
+    if argumentos.instrumentar:
+        instrumentacion.activar()
+    if argumentos.horarios:
+        Lab4.usar_horarios(TablaHorarios.cargar(argumentos.horarios))
+    if argumentos.veredictos is not None:
+        veredictos.activar(veredictos.CacheVeredictos(argumentos.veredictos or None))
+    if argumentos.indice:
+        from indice_feriados import IndiceFeriados
+        cache_calendarios.usar_indice(IndiceFeriados.cargar(argumentos.indice))
+    web.run_app(crear_aplicacion(argumentos.ventana_ms / 1000, argumentos.lote_max),
+                host=argumentos.host, port=argumentos.puerto)
@@ -0,0 +1,7 @@
+#Acceso a la ruta de búsqueda de módulos
+import sys
+#Rutas del repositorio
+import os
+
+#Los módulos del proyecto están en la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
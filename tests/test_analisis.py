@@ -0,0 +1,32 @@
+#Marco de pruebas
+import pytest
+
+from analisis import AnalisisPicoPlaca, CAMPOS
+from Lab4 import MotorPicoPlaca
+
+
+@pytest.mark.parametrize('procesos, dias_por_tarea', [(2, 366), (3, 50), (4, 7)])
+def test_grupo_de_procesos_igual_a_serie(procesos, dias_por_tarea):
+    """Con cualquier número de procesos y tamaño de tarea, los resultados son los de la evaluación en serie"""
+    serie = AnalisisPicoPlaca(procesos=1).ejecutar(2019, 2022)
+    paralelo = AnalisisPicoPlaca(procesos=procesos, dias_por_tarea=dias_por_tarea).ejecutar(2019, 2022)
+    assert paralelo == serie
+    assert sorted(serie) == [(año, digito) for año in range(2019, 2023) for digito in range(10)]
+
+
+def test_resultados_del_motor():
+    """Cada (año, dígito) suma el resumen de MotorPicoPlaca sobre todo el año"""
+    resultados = AnalisisPicoPlaca(procesos=2, dias_por_tarea=30).ejecutar(2021, 2021, [0, 9])
+    for digito in (0, 9):
+        esperado = MotorPicoPlaca().resumen_restricciones(digito, '2021-01-01', '2021-12-31')
+        assert tuple(resultados[(2021, digito)][campo] for campo in CAMPOS) == esperado
+
+
+def test_restricciones_propias_en_procesos():
+    """Los procesos del grupo reciben las restricciones propias del análisis"""
+    restricciones = {dia: [] for dia in MotorPicoPlaca.DIAS}
+    restricciones[MotorPicoPlaca.DIAS[0]] = [5]
+    serie = AnalisisPicoPlaca(restricciones, procesos=1).ejecutar(2022, 2022, [5, 6])
+    paralelo = AnalisisPicoPlaca(restricciones, procesos=2, dias_por_tarea=40).ejecutar(2022, 2022, [5, 6])
+    assert paralelo == serie
+    assert serie[(2022, 6)][CAMPOS[0]] == 0 and serie[(2022, 5)][CAMPOS[0]] == 52
@@ -0,0 +1,34 @@
+#Proporciona clases para manipular fechas y horas.
+import datetime
+#Marco de pruebas
+import pytest
+
+from Lab4 import PicoPlaca, analizar_fecha, analizar_hora
+
+
+@pytest.mark.parametrize('valor', ['2021-04-02', '2021-04- 2', '2021-4-2', '2021-4-02', '２０２１-04-02'])
+def test_fechas_que_acepta_strptime(valor):
+    """Las fechas fuera del formato canónico ASCII siguen la semántica de strptime"""
+    assert analizar_fecha(valor) == datetime.datetime.strptime(valor, '%Y-%m-%d').date()
+
+
+@pytest.mark.parametrize('valor', ['2021-02-30', '2021/04/02', '2021-04-02 ', '21-04-02', '', None, 20210402])
+def test_fechas_invalidas(valor):
+    """Las fechas que rechaza strptime (o que no son texto) se rechazan con el mensaje de formato"""
+    with pytest.raises(ValueError, match='AAAA-MM-DD'):
+        analizar_fecha(valor)
+
+
+def test_fecha_no_canonica_en_predecir_y_lote():
+    """El constructor y predecir_lote aceptan la misma fecha no canónica con el mismo veredicto"""
+    placas, fechas, horas = ['PBC-1235', 'PBC-1235'], ['2021-04- 7', '2021-04-07'], ['08:00', '08:00']
+    esperado = [PicoPlaca(*fila).predecir() for fila in zip(placas, fechas, horas)]
+    assert esperado == [False, False]
+    resultado, errores = PicoPlaca.predecir_lote(placas, fechas, horas)
+    assert resultado.tolist() == esperado and errores == [None, None]
+
+
+@pytest.mark.parametrize('valor, esperado', [('00:00', 0), ('08:35', 515), ('23:59', 1439)])
+def test_horas(valor, esperado):
+    """Las horas HH:MM se convierten en minutos desde la medianoche"""
+    assert analizar_hora(valor) == esperado
@@ -0,0 +1,52 @@
+#Proporciona clases para manipular fechas y horas.
+import datetime
+#Marco de pruebas
+import pytest
+
+from Lab4 import CacheCalendarios
+from reglas_feriados import reglas_feriados
+
+
+def test_expulsa_el_menos_usado():
+    """Al superar la capacidad se expulsa la (provincia, año) usada hace más tiempo"""
+    cache = CacheCalendarios(capacidad=2)
+    cache.obtener('EC-P', 2021)
+    cache.obtener('EC-P', 2022)
+    #Usar 2021 lo vuelve el más reciente, así que 2022 es el que sale
+    cache.obtener('EC-P', 2021)
+    cache.obtener('EC-G', 2022)
+    assert len(cache) == 2
+    assert ('EC-P', 2021) in cache and ('EC-G', 2022) in cache and ('EC-P', 2022) not in cache
+
+
+def test_feriados_y_aciertos():
+    """La cache devuelve los mismos feriados que las reglas y reutiliza el calendario"""
+    cache = CacheCalendarios()
+    feriados = cache.obtener('EC-P', 2022)
+    assert feriados == reglas_feriados.provinciales('EC-P', 2022)
+    assert cache.obtener('EC-P', 2022) is feriados
+    assert cache.es_feriado('EC-P', datetime.date(2022, 12, 5))
+    assert not cache.es_feriado('EC-G', datetime.date(2022, 12, 5))
+    assert cache.provincias_feriado(datetime.date(2022, 12, 5), ['EC-G', 'EC-P']) == ['EC-P']
+
+
+def test_invalidar():
+    """invalidar elimina solo las entradas de la provincia y/o el año indicados"""
+    cache = CacheCalendarios()
+    for provincia in ('EC-P', 'EC-G'):
+        for año in (2021, 2022):
+            cache.obtener(provincia, año)
+    assert cache.invalidar('EC-P', 2021) == 1
+    assert ('EC-P', 2021) not in cache and len(cache) == 3
+    assert cache.invalidar(año=2022) == 2
+    assert list(cache._calendarios) == [('EC-G', 2021)]
+    assert cache.invalidar(provincia='EC-P') == 0
+    cache.obtener('EC-P', 2023)
+    cache.limpiar()
+    assert len(cache) == 0
+
+
+def test_capacidad_invalida():
+    """La capacidad debe ser al menos 1"""
+    with pytest.raises(ValueError):
+        CacheCalendarios(capacidad=0)
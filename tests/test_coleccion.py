@@ -0,0 +1,68 @@
+#Serializa las colecciones y los registros
+import pickle
+#Marco de pruebas
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from Lab4 import PicoPlaca, ColeccionPicoPlaca
+
+CONSULTAS = [('PBC-1231', '2022-05-03', '07:30'), ('PBC-1233', '2022-05-03', '07:30'),
+             ('AB-1235', '2022-05-04', '18:00'), ('GAU-0008', '2022-05-05', '09:30'),
+             ('PBC-1239', '2022-12-30', '16:00'), ('PBC-1230', '2022-12-26', '08:00')]
+
+
+def coleccion():
+    """Construye la colección de CONSULTAS y comprueba que todas las filas son válidas"""
+    registros, errores = ColeccionPicoPlaca.desde_columnas(*zip(*CONSULTAS))
+    assert errores == [None] * len(CONSULTAS)
+    return registros
+
+
+def esperados():
+    """Devuelve los veredictos de CONSULTAS calculados con PicoPlaca"""
+    return [PicoPlaca(*consulta).predecir() for consulta in CONSULTAS]
+
+
+def test_registros_y_predecir():
+    """Cada registro reconstruye su consulta y predecir coincide con PicoPlaca"""
+    registros = coleccion()
+    assert registros.registros.itemsize == 14
+    assert [(r.placa, r.fecha, r.hora) for r in (registros[i] for i in range(len(registros)))] == CONSULTAS
+    assert registros.predecir().tolist() == esperados()
+
+
+def test_slice_devuelve_una_coleccion():
+    """Un slice devuelve una colección que comparte los registros"""
+    registros = coleccion()
+    parte = registros[1:5:2]
+    assert isinstance(parte, ColeccionPicoPlaca) and len(parte) == 2
+    assert np.shares_memory(parte.registros, registros.registros)
+    assert (parte[0].placa, parte[1].placa) == (CONSULTAS[1][0], CONSULTAS[3][0])
+    assert parte.predecir().tolist() == esperados()[1:5:2]
+
+
+def test_pickle():
+    """La colección y los registros PicoPlaca sobreviven a pickle"""
+    registros = pickle.loads(pickle.dumps(coleccion()))
+    assert registros.predecir().tolist() == esperados()
+    registro = pickle.loads(pickle.dumps(PicoPlaca(*CONSULTAS[1])))
+    assert (registro.placa, registro.fecha, registro.hora) == CONSULTAS[1]
+    assert registro.predecir() is esperados()[1]
+
+
+def test_guardar_y_proyectar_en_memoria(tmp_path):
+    """cargar proyecta el archivo en solo lectura y predice lo mismo; sin mmap lo copia"""
+    ruta = str(tmp_path / 'coleccion.npy')
+    coleccion().guardar(ruta)
+    proyectada = ColeccionPicoPlaca.cargar(ruta)
+    assert isinstance(proyectada.registros, np.memmap)
+    assert not proyectada.registros.flags.writeable
+    with pytest.raises(ValueError):
+        proyectada.registros['minuto'][0] = 0
+    assert proyectada.predecir().tolist() == esperados()
+    assert proyectada[2:].predecir().tolist() == esperados()[2:]
+    assert pickle.loads(pickle.dumps(proyectada)).predecir().tolist() == esperados()
+    copiada = ColeccionPicoPlaca.cargar(ruta, mmap=False)
+    assert not isinstance(copiada.registros, np.memmap)
+    assert copiada.predecir().tolist() == esperados()
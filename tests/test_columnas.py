@@ -0,0 +1,97 @@
+#Proporciona clases para manipular fechas y horas.
+import datetime
+#Marco de pruebas
+import pytest
+
+import columnas
+from Lab4 import PicoPlaca
+
+#Las pruebas de columnas necesitan numpy y pyarrow
+
+np = pytest.importorskip('numpy')
+pa = pytest.importorskip('pyarrow')
+
+#Ordinal de 1970-01-01, origen de date32
+EPOCA = datetime.date(1970, 1, 1).toordinal()
+
+PLACAS = ['PBC-1239', 'AB-1234', 'GAU-0001', 'PCA-0458', None, 'abc-1234', 'ABCD-123', 'AB-12345',
+          'PBX-7770', 'HM-9902', '', 'PBC1239', 'TTT-0005', 'ABCDEFGHIJK']
+FECHAS = [datetime.date(2021, 3, 1), datetime.date(2022, 12, 26), datetime.date(2023, 5, 26),
+          datetime.date(2021, 9, 30), datetime.date(2024, 2, 12), datetime.date(2022, 1, 8), None]
+MINUTOS = [0, 6 * 60 + 59, 7 * 60, 9 * 60 + 30, 12 * 60, 16 * 60, 19 * 60 + 30, 19 * 60 + 31, 23 * 60 + 59, None]
+
+
+def filas(n=300):
+    """Combina placas, fechas y horas de prueba en n filas"""
+    return [(PLACAS[i % len(PLACAS)], FECHAS[(i // 3) % len(FECHAS)], MINUTOS[(i * 7) % len(MINUTOS)])
+            for i in range(n)]
+
+
+def esperado(fila):
+    """Devuelve la tupla (resultado, valida) de PicoPlaca.predecir para una fila, o (False, False) si no es válida"""
+    placa, fecha, minuto = fila
+    if placa is None or fecha is None or minuto is None:
+        return False, False
+    try:
+        registro = PicoPlaca(placa, fecha.isoformat(), '{:02d}:{:02d}'.format(*divmod(minuto, 60)))
+    except ValueError:
+        return False, False
+    return registro.predecir(), True
+
+
+def comparar(placas, dias, horas, datos):
+    """Comprueba que predecir_columnas coincide fila por fila con PicoPlaca.predecir"""
+    resultado, valida = columnas.predecir_columnas(placas, dias, horas)
+    assert [(bool(r), bool(v)) for r, v in zip(resultado, valida)] == [esperado(fila) for fila in datos]
+
+
+@pytest.mark.parametrize('tipo', [pa.string(), pa.binary(), pa.large_string(), pa.large_binary()])
+def test_arrow_ancho_variable(tipo):
+    datos = filas()
+    placas = pa.array([fila[0] for fila in datos], type=tipo)
+    dias = pa.array([fila[1] for fila in datos], type=pa.date32())
+    horas = pa.array([None if fila[2] is None else fila[2] * 60 for fila in datos], type=pa.time32('s'))
+    comparar(placas, dias, horas, datos)
+
+
+@pytest.mark.parametrize('tipo', [pa.string(), pa.binary(), pa.large_binary()])
+def test_arrow_desplazado(tipo):
+    datos = filas()
+    placas = pa.array([fila[0] for fila in datos], type=tipo)
+    dias = pa.array([fila[1] for fila in datos], type=pa.date32())
+    horas = pa.array([None if fila[2] is None else fila[2] * 60 * 10 ** 6 for fila in datos], type=pa.time64('us'))
+    for inicio, largo in [(1, 50), (13, 200), (37, 263)]:
+        comparar(placas.slice(inicio, largo), dias.slice(inicio, largo), horas.slice(inicio, largo),
+                 datos[inicio:inicio + largo])
+
+
+def test_arrow_ancho_fijo_y_trozos():
+    datos = [fila for fila in filas() if fila[0] is None or len(fila[0]) <= 8]
+    placas = pa.array([None if fila[0] is None else fila[0].encode().ljust(8, b'\0') for fila in datos],
+                      type=pa.binary(8))
+    dias = pa.chunked_array([pa.array([fila[1] for fila in datos[:100]], type=pa.date64()),
+                             pa.array([fila[1] for fila in datos[100:]], type=pa.date64())])
+    horas = pa.array([fila[2] for fila in datos], type=pa.int16())
+    comparar(placas.slice(5), dias.slice(5), horas.slice(5), datos[5:])
+
+
+def test_numpy_sin_pyarrow():
+    datos = [(placa, fecha, minuto) for placa, fecha, minuto in filas()
+             if placa is not None and fecha is not None and minuto is not None and len(placa) <= 8]
+    placas = np.array([fila[0].encode() for fila in datos], dtype='S8')
+    dias = np.array([fila[1].toordinal() - EPOCA for fila in datos], dtype=np.int32)
+    horas = np.array([fila[2] for fila in datos], dtype=np.int16)
+    comparar(placas, dias, horas, datos)
+
+
+def test_mapas_de_bits():
+    datos = filas(37)
+    placas = pa.array([fila[0] for fila in datos])
+    dias = pa.array([fila[1] for fila in datos], type=pa.date32())
+    horas = pa.array([fila[2] for fila in datos], type=pa.int32())
+    resultado, valida = columnas.predecir_columnas(placas, dias, horas)
+    bits, bits_valida = columnas.predecir_columnas(placas, dias, horas, empaquetar=True)
+    assert (np.unpackbits(bits, bitorder='little')[:len(datos)] == resultado).all()
+    assert (np.unpackbits(bits_valida, bitorder='little')[:len(datos)] == valida).all()
+    salida = columnas.a_arrow(resultado, valida)
+    assert salida.to_pylist() == [bool(r) if v else None for r, v in zip(resultado, valida)]
@@ -0,0 +1,181 @@
+#Proporciona clases para manipular fechas y horas.
+import datetime
+#Ejecuta las corrutinas del proveedor
+import asyncio
+#Sirve para el intercambio de datos
+import json
+#Consultas concurrentes desde varios hilos
+import threading
+#Mide el espaciado de las solicitudes
+import time
+#Servidor HTTP local que imita la API de días festivos abstractos
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+#Lee los parámetros de cada solicitud
+from urllib.parse import urlparse, parse_qs
+#Marco de pruebas
+import pytest
+
+pytest.importorskip('aiohttp')
+
+import Lab4
+import feriados_enlinea
+from Lab4 import PicoPlaca
+from feriados_enlinea import ProveedorFeriadosEnLinea, ProveedorSincrono
+
+
+class ServidorStub:
+    """Servidor local que registra cada solicitud (fecha, instante) y tarda retraso segundos en responder"""
+
+    def __init__(self, retraso=0.05):
+        self.solicitudes = []
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                consulta = {clave: valores[0] for clave, valores in parse_qs(urlparse(self.path).query).items()}
+                fecha = '{}-{}-{}'.format(consulta['year'], consulta['month'], consulta['day'])
+                servidor.solicitudes.append((fecha, time.monotonic()))
+                time.sleep(retraso)
+                if fecha[5:] in ('01-01', '12-25'):
+                    cuerpo = [{'name': 'Holiday'}]
+                elif fecha == '2021-04-01':
+                    cuerpo = [{'name': 'Maundy Thursday'}]
+                elif fecha == '2022-06-15':
+                    cuerpo = {'error': {'message': 'Cuota agotada'}}
+                else:
+                    cuerpo = []
+                datos = json.dumps(cuerpo).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def log_message(self, *argumentos):
+                pass
+
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', 0), Manejador)
+        self.url = 'http://127.0.0.1:{}/v1/'.format(self._servidor.server_port)
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+
+    def cerrar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+
+@pytest.fixture
+def servidor():
+    stub = ServidorStub()
+    yield stub
+    stub.cerrar()
+
+
+def test_une_consultas_concurrentes(servidor):
+    async def consultar():
+        async with ProveedorFeriadosEnLinea('prueba', url=servidor.url, tasa=100, rafaga=10) as proveedor:
+            return await proveedor.es_feriado_varios([datetime.date(2022, 12, 25)] * 20 + [datetime.date(2022, 12, 26)] * 5)
+
+    resultados = asyncio.run(consultar())
+    assert resultados == [True] * 20 + [False] * 5
+    assert sorted(fecha for fecha, _ in servidor.solicitudes) == ['2022-12-25', '2022-12-26']
+
+
+def test_une_consultas_de_varios_hilos(servidor):
+    proveedor = ProveedorSincrono(codigo='prueba', url=servidor.url, tasa=100, rafaga=10)
+    resultados = []
+    hilos = [threading.Thread(target=lambda: resultados.append(proveedor.es_feriado(datetime.date(2023, 1, 1))))
+             for _ in range(16)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    proveedor.cerrar()
+    assert resultados == [True] * 16
+    assert len(servidor.solicitudes) == 1
+
+
+def test_respeta_la_tasa(servidor):
+    fechas = [datetime.date(2022, 3, dia) for dia in range(1, 7)]
+
+    async def consultar():
+        async with ProveedorFeriadosEnLinea('prueba', url=servidor.url, tasa=10, rafaga=1) as proveedor:
+            return await proveedor.es_feriado_varios(fechas)
+
+    inicio = time.monotonic()
+    asyncio.run(consultar())
+    assert time.monotonic() - inicio >= (len(fechas) - 1) / 10
+    instantes = sorted(instante for _, instante in servidor.solicitudes)
+    assert len(instantes) == len(fechas)
+    #Con una ficha de ráfaga, las 6 solicitudes concurrentes se reparten en al menos 0,5 s
+    assert instantes[-1] - instantes[0] >= (len(fechas) - 1) / 10 * 0.8
+
+
+def test_corrige_jueves_santo(servidor):
+    proveedor = ProveedorSincrono(codigo='prueba', url=servidor.url, tasa=100)
+    assert proveedor.es_feriado(datetime.date(2021, 4, 1)) is False
+    assert proveedor.es_feriado(datetime.date(2021, 1, 1)) is True
+    proveedor.cerrar()
+
+
+def test_cache_persistente_se_escribe_por_lotes(servidor, tmp_path):
+    ruta = tmp_path / 'feriados.json'
+    fechas = [datetime.date(2022, 5, dia) for dia in range(1, 11)]
+
+    async def consultar(proveedor):
+        async with proveedor:
+            for fecha in fechas:
+                await proveedor.es_feriado(fecha)
+            #Las respuestas se acumulan en memoria hasta completar un lote o cerrar
+            assert not ruta.exists()
+
+    asyncio.run(consultar(ProveedorFeriadosEnLinea('prueba', url=servidor.url, tasa=1000, rafaga=100,
+                                                   ruta_cache=str(ruta), lote_cache=100)))
+    assert sorted(json.loads(ruta.read_text())) == [fecha.isoformat() for fecha in fechas]
+
+    #Otro proceso (u otra ejecución) responde desde la cache sin solicitudes
+    proveedor = ProveedorSincrono(codigo='prueba', url=servidor.url, ruta_cache=str(ruta))
+    assert proveedor.es_feriado_varios(fechas) == [False] * len(fechas)
+    proveedor.cerrar()
+    assert len(servidor.solicitudes) == len(fechas)
+
+
+def test_picoplaca_enlinea_usa_el_proveedor(servidor):
+    Lab4.usar_proveedor_enlinea(ProveedorSincrono(codigo='prueba', url=servidor.url, tasa=1000, rafaga=100))
+    try:
+        #Navidad de 2022 cae en domingo; el lunes 26 no es feriado en la API de prueba
+        consultas = [('PBC-1231', '2022-12-26', '07:30'), ('PBC-1231', '2023-01-01', '07:30'),
+                     ('PBC-1232', '2022-12-26', '08:00')] * 5
+        assert [PicoPlaca(*consulta, enlinea=True).predecir() for consulta in consultas] == [False, True, False] * 5
+        assert PicoPlaca.predecir_lote(*zip(*consultas), enlinea=True)[0].tolist() == [False, True, False] * 5
+        assert sorted(fecha for fecha, _ in servidor.solicitudes) == ['2022-12-26', '2023-01-01']
+    finally:
+        Lab4.usar_proveedor_enlinea(None)
+
+
+def test_respuesta_de_error_de_la_api(servidor):
+    """Un objeto de error de la API se informa con ValueError y no se guarda como respuesta"""
+    proveedor = ProveedorSincrono(codigo='prueba', url=servidor.url, tasa=1000, rafaga=100)
+    try:
+        with pytest.raises(ValueError, match='Cuota agotada'):
+            proveedor.es_feriado(datetime.date(2022, 6, 15))
+        with pytest.raises(ValueError):
+            proveedor.es_feriado(datetime.date(2022, 6, 15))
+        assert len(servidor.solicitudes) == 2
+    finally:
+        proveedor.cerrar()
+
+
+def test_cerrar_retira_el_registro_de_atexit(servidor, monkeypatch):
+    """Cada proveedor registra cerrar al iniciar su hilo y lo retira al cerrarse o reemplazarse"""
+    registrados = []
+    monkeypatch.setattr(feriados_enlinea.atexit, 'register', registrados.append)
+    monkeypatch.setattr(feriados_enlinea.atexit, 'unregister', registrados.remove)
+    sin_uso = ProveedorSincrono(codigo='prueba', url=servidor.url)
+    assert registrados == []
+    for _ in range(3):
+        Lab4.usar_proveedor_enlinea(ProveedorSincrono(codigo='prueba', url=servidor.url, tasa=1000, rafaga=100))
+        assert PicoPlaca('PBC-1231', '2022-12-26', '07:30', enlinea=True).predecir() is False
+        assert registrados == [Lab4.proveedor_enlinea.cerrar]
+    Lab4.usar_proveedor_enlinea(None)
+    sin_uso.cerrar()
+    assert registrados == []
@@ -0,0 +1,74 @@
+#Proporciona clases para manipular fechas y horas.
+import datetime
+#Marco de pruebas
+import pytest
+
+import Lab4
+from Lab4 import PicoPlaca, MotorPicoPlaca
+from analisis import AnalisisPicoPlaca
+from horarios import Horario, TablaHorarios, ORDENANZA_0305, DIAS
+
+#Marzo de 2021: "hoy no circula" de 06:00 a 20:00, todos los dígitos de lunes a viernes
+HOY_NO_CIRCULA = Horario('hoy-no-circula', {dia: list(range(10)) for dia in DIAS[:5]}, [('06:00', '20:00')],
+                         desde='2021-03-01', hasta='2021-03-31')
+
+
+@pytest.fixture
+def temporal():
+    """Aplica la tabla con el horario temporal y restaura la anterior al terminar"""
+    anterior = Lab4.tabla_horarios
+    Lab4.usar_horarios(TablaHorarios([ORDENANZA_0305, HOY_NO_CIRCULA]))
+    yield
+    Lab4.usar_horarios(anterior)
+
+
+@pytest.mark.parametrize('fecha, hora, esperado', [
+    ('2021-03-01', '06:30', False),
+    ('2021-03-31', '19:55', False),
+    ('2021-04-05', '06:30', True),
+    ('2021-04-05', '07:30', True),
+    ('2021-04-09', '07:30', False),
+    ('2021-04-09', '06:30', True),
+])
+def test_motor_y_predecir_siguen_el_horario_vigente(temporal, fecha, hora, esperado):
+    assert PicoPlaca('PBC-1239', fecha, hora).predecir() is esperado
+    assert PicoPlaca.predecir_lote(['PBC-1239'], [fecha], [hora])[0].tolist() == [esperado]
+    assert MotorPicoPlaca().puede_circular('PBC-1239', fecha, hora) is esperado
+
+
+def test_motor_rangos_con_horario_temporal(temporal):
+    motor = MotorPicoPlaca()
+    dentro = motor.ventanas_restringidas('PBC-1239', '2021-03-01', '2021-03-01')
+    assert dentro == [(datetime.datetime(2021, 3, 1, 6, 0), datetime.datetime(2021, 3, 1, 20, 1))]
+    assert motor.digitos_restringidos('2021-03-02', '06:30') == list(range(10))
+    fuera = motor.ventanas_restringidas('PBC-1239', '2021-04-09', '2021-04-09')
+    assert fuera == [(datetime.datetime(2021, 4, 9, 7, 0), datetime.datetime(2021, 4, 9, 9, 31)),
+                     (datetime.datetime(2021, 4, 9, 16, 0), datetime.datetime(2021, 4, 9, 19, 31))]
+    #Un motor con restricciones propias no depende de tabla_horarios
+    assert MotorPicoPlaca(restricciones=Lab4.MotorPicoPlaca.RESTRICCIONES).puede_circular('PBC-1239', '2021-03-01', '06:30')
+
+
+def test_analisis_con_horario_temporal(temporal):
+    #Marzo de 2021 tiene 23 días laborables sin feriados; con la ordenanza, el dígito 9 solo se restringe los 4 viernes
+    marzo = MotorPicoPlaca().resumen_restricciones(9, '2021-03-01', '2021-03-31')
+    assert marzo == (23, 0, 23 * (20 * 60 + 1 - 6 * 60), 0)
+    abril = MotorPicoPlaca().resumen_restricciones(9, '2021-04-05', '2021-04-30')
+    assert abril[0] == 4
+    temporales = AnalisisPicoPlaca(procesos=2).ejecutar(2021, 2021, [9])
+    Lab4.usar_horarios(TablaHorarios([ORDENANZA_0305]))
+    ordinarios = AnalisisPicoPlaca(procesos=1).ejecutar(2021, 2021, [9])
+    assert temporales[(2021, 9)]['dias_restringidos'] - ordinarios[(2021, 9)]['dias_restringidos'] == 23 - 4
+
+
+def test_motor_no_acumula_ventanas_de_tablas_anteriores():
+    """Las ventanas en memoria del motor corresponden solo a la tabla vigente"""
+    anterior = Lab4.tabla_horarios
+    motor = MotorPicoPlaca()
+    try:
+        for hora in range(6, 16):
+            horario = Horario('prueba-{}'.format(hora), {dia: [9] for dia in DIAS}, [('{:02d}:00'.format(hora), '{:02d}:30'.format(hora))])
+            Lab4.usar_horarios(TablaHorarios([horario]))
+            assert motor.resumen_restricciones(9, '2021-03-01', '2021-03-31') == (31, 0, 31 * 31, 0)
+            assert len(motor._intervalos) <= len(DIAS)
+    finally:
+        Lab4.usar_horarios(anterior)
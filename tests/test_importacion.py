@@ -0,0 +1,36 @@
+#Lanza intérpretes nuevos para importar Lab4 sin módulos cargados
+import subprocess
+#Intérprete actual
+import sys
+#Carpeta del repositorio
+import os
+
+from benchmark import MODULOS_PESADOS
+
+#Carpeta del repositorio, desde donde se importan los módulos
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def modulos_cargados(codigo, modulos):
+    """Ejecuta el código en un intérprete nuevo y devuelve cuáles de los módulos quedaron en sys.modules"""
+    proceso = subprocess.run(
+        [sys.executable, '-c', codigo + '; import sys; print(",".join(m for m in {!r} if m in sys.modules))'.format(modulos)],
+        capture_output=True, text=True, check=True, cwd=RAIZ)
+    return [m for m in proceso.stdout.strip().split(',') if m]
+
+
+def test_importar_lab4_no_carga_modulos_pesados():
+    assert modulos_cargados('import Lab4', MODULOS_PESADOS + ('sqlite3', 'pyarrow')) == []
+
+
+def test_modulos_pesados_se_cargan_al_usarse():
+    assert modulos_cargados("import Lab4; Lab4.PicoPlaca.predecir_lote(['PBC-1239'], ['2022-05-02'], ['07:30'])",
+                            ('numpy',)) == ['numpy']
+
+
+def test_medir_importacion_fuera_del_repositorio(tmp_path):
+    proceso = subprocess.run(
+        [sys.executable, '-c', 'import sys; sys.path.insert(0, {!r}); import benchmark; '
+                               'print(benchmark.medir_importacion(1)["modulos_pesados"])'.format(RAIZ)],
+        capture_output=True, text=True, check=True, cwd=str(tmp_path))
+    assert proceso.stdout.strip() == '[]'
@@ -0,0 +1,50 @@
+#Proporciona clases para manipular fechas y horas.
+import datetime
+#Marco de pruebas
+import pytest
+
+from indice_feriados import IndiceFeriados, MAGICO, BYTES_AÑO
+from reglas_feriados import reglas_feriados, FeriadoFijo
+
+PROVINCIAS = ['EC-P', 'EC-G', 'EC-A']
+
+
+@pytest.fixture
+def ruta(tmp_path):
+    ruta = tmp_path / 'feriados.idx'
+    IndiceFeriados.construir(PROVINCIAS, 2020, 2024).guardar(str(ruta))
+    return ruta
+
+
+def inicio_bits(ruta):
+    """Devuelve la posición del primer mapa de bits en el archivo"""
+    datos = ruta.read_bytes()
+    return len(MAGICO) + 4 + int.from_bytes(datos[len(MAGICO):len(MAGICO) + 4], 'little')
+
+
+def test_indice_al_dia(ruta):
+    indice = IndiceFeriados.cargar(str(ruta))
+    assert indice.verificar() == []
+    assert indice.feriados('EC-P', 2022) == reglas_feriados.provinciales('EC-P', 2022)
+
+
+def test_bit_alterado_en_el_archivo(ruta):
+    #Marca como feriado el 2 de enero de 2023 en EC-G (segunda provincia, cuarto año)
+    datos = bytearray(ruta.read_bytes())
+    ranura = 1 * 5 + 3
+    datos[inicio_bits(ruta) + ranura * BYTES_AÑO] ^= 1 << 1
+    ruta.write_bytes(bytes(datos))
+    diferencias = IndiceFeriados.cargar(str(ruta)).verificar()
+    #El día agregado desplaza los nombres de los feriados siguientes de esa provincia y año
+    assert diferencias[0][:3] == ('EC-G', datetime.date(2023, 1, 2), None)
+    assert {(provincia, fecha.year) for provincia, fecha, _, _ in diferencias} == {('EC-G', 2023)}
+
+
+def test_regla_nueva_no_indexada(ruta):
+    regla = FeriadoFijo('prueba_indice', 8, 3, 'Feriado de prueba', desde=2022, hasta=2022, provincia='EC-A')
+    reglas_feriados.agregar(regla)
+    try:
+        diferencias = IndiceFeriados.cargar(str(ruta)).verificar()
+    finally:
+        reglas_feriados.quitar(regla)
+    assert diferencias == [('EC-A', datetime.date(2022, 8, 3), 'Feriado de prueba', None)]
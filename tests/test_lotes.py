@@ -0,0 +1,116 @@
+#Lee y escribe las filas de prueba
+import csv
+#Flujos en memoria
+import io
+#Sirve para el intercambio de datos
+import json
+#Construye las rutas y el entorno de la línea de comandos
+import os
+#Ejecuta la línea de comandos de Lab4
+import subprocess
+#Intérprete de Python actual
+import sys
+#Marco de pruebas
+import pytest
+
+pytest.importorskip('numpy')
+
+from Lab4 import PicoPlaca, ProcesadorLotes
+
+#Filas de prueba; las que tienen error se rechazan
+FILAS = [('PBC-1231', '2022-05-03', '07:30', None), ('PBC-1233', '2022-05-03', '07:30', None),
+         ('pbc-1233', '2022-05-03', '07:30', 'placa'), ('AB-1235', '2022-05-04', '18:00', None),
+         ('GAU-0008', '2022-05-05', '09:30', None), ('PBC-1239', '2022-02-30', '16:00', 'fecha'),
+         ('PBC-1230', '2022-12-26', '08:00', None), ('PBC-1236', '2022-05-04', '25:00', 'hora'),
+         ('PBC-1236', '2022-05-04', '18:00', None), ('PBC-1237', '2022-05-05', '09:31', None),
+         ('PBC-1232', '2022-05-02', '07:30', None)]
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def entrada(formato, filas=FILAS):
+    """Devuelve el texto CSV o JSONL de las filas"""
+    if formato == 'csv':
+        texto = io.StringIO()
+        escritor = csv.writer(texto, lineterminator='\n')
+        escritor.writerow(ProcesadorLotes.COLUMNAS)
+        escritor.writerows(fila[:3] for fila in filas)
+        return texto.getvalue()
+    return ''.join(json.dumps(dict(zip(ProcesadorLotes.COLUMNAS, fila[:3]))) + '\n' for fila in filas)
+
+
+def esperado(formato, filas=FILAS, numeros=None):
+    """Devuelve los veredictos y los números de las filas rechazadas esperados para las filas"""
+    numeros = numeros or range(1, len(filas) + 1)
+    veredictos = [(*fila[:3], PicoPlaca(*fila[:3]).predecir()) for fila in filas if fila[3] is None]
+    rechazos = [numero for numero, fila in zip(numeros, filas) if fila[3] is not None]
+    return veredictos, rechazos
+
+
+def leer(formato, salida, rechazos):
+    """Lee la salida y los rechazos de procesar como (veredictos, números de fila rechazados)"""
+    if formato == 'csv':
+        filas = list(csv.reader(io.StringIO(salida)))
+        assert filas[0] == [*ProcesadorLotes.COLUMNAS, 'puede_circular']
+        veredictos = [(placa, fecha, hora, puede == 'true') for placa, fecha, hora, puede in filas[1:]]
+        rechazadas = list(csv.reader(io.StringIO(rechazos)))
+        assert rechazadas[0] == ['fila', *ProcesadorLotes.COLUMNAS, 'error']
+        return veredictos, [int(fila[0]) for fila in rechazadas[1:]]
+    veredictos = [(v['placa'], v['fecha'], v['hora'], v['puede_circular'])
+                  for v in map(json.loads, salida.splitlines())]
+    return veredictos, [json.loads(linea)['fila'] for linea in rechazos.splitlines()]
+
+
+def procesar(procesador, texto):
+    """Procesa el texto y devuelve (veredictos, rechazos, filas, rechazadas)"""
+    salida, rechazos = io.StringIO(), io.StringIO()
+    filas, rechazadas, _ = procesador.procesar(io.StringIO(texto, newline=''), salida, rechazos)
+    return (*leer(procesador.formato, salida.getvalue(), rechazos.getvalue()), filas, rechazadas)
+
+
+@pytest.mark.parametrize('formato', ['csv', 'jsonl'])
+@pytest.mark.parametrize('procesos, tamaño_bloque', [(1, 100000), (1, 2), (2, 2), (3, 1)])
+def test_procesar_en_orden(formato, procesos, tamaño_bloque):
+    """Los veredictos y los rechazos conservan el orden de entrada con cualquier número de procesos"""
+    procesador = ProcesadorLotes(formato, tamaño_bloque=tamaño_bloque, procesos=procesos)
+    veredictos, rechazos, filas, rechazadas = procesar(procesador, entrada(formato))
+    assert (veredictos, rechazos) == esperado(formato)
+    assert (filas, rechazadas) == (len(FILAS), 3)
+
+
+@pytest.mark.parametrize('formato', ['csv', 'jsonl'])
+def test_fragmentos(formato):
+    """Los fragmentos k/n reparten las filas por número de fila sin repetirlas"""
+    partes = [procesar(ProcesadorLotes(formato, tamaño_bloque=2, fragmento=(k, 2)), entrada(formato)) for k in (0, 1)]
+    pares, impares = FILAS[1::2], FILAS[0::2]
+    assert partes[0][:2] == esperado(formato, pares, range(2, len(FILAS) + 1, 2))
+    assert partes[1][:2] == esperado(formato, impares, range(1, len(FILAS) + 1, 2))
+    assert partes[0][2] + partes[1][2] == len(FILAS)
+
+
+def test_jsonl_invalido_y_columnas_faltantes():
+    """Las líneas JSONL inválidas y las columnas que faltan se rechazan con su número de línea"""
+    texto = '{"placa": "PBC-1231", "fecha": "2022-05-03", "hora": "07:30"}\n[1, 2]\n\n{"placa": "PBC-1231"}\nno es json\n'
+    salida, rechazos = io.StringIO(), io.StringIO()
+    filas, rechazadas, _ = ProcesadorLotes('jsonl').procesar(io.StringIO(texto), salida, rechazos)
+    assert (filas, rechazadas) == (4, 3)
+    assert len(salida.getvalue().splitlines()) == 1
+    errores = {r['fila']: r['error'] for r in map(json.loads, rechazos.getvalue().splitlines())}
+    assert sorted(errores) == [2, 4, 5]
+    assert errores[2].startswith('JSON inválido') and errores[4].startswith('Falta la columna')
+
+
+def test_linea_de_comandos(tmp_path):
+    """La línea de comandos procesa con varios procesos, bloques pequeños, fragmentos y rechazos"""
+    ruta = tmp_path / 'entrada.csv'
+    ruta.write_text(entrada('csv'), encoding='utf-8')
+    entorno = dict(os.environ, PYTHONPATH=RAIZ)
+
+    def ejecutar(*argumentos):
+        salida, rechazos = tmp_path / 'salida.csv', tmp_path / 'rechazos.csv'
+        subprocess.run([sys.executable, os.path.join(RAIZ, 'Lab4.py'), '--entrada', str(ruta), '--salida', str(salida),
+                        '--rechazos', str(rechazos), *argumentos], check=True, capture_output=True, env=entorno)
+        return leer('csv', salida.read_text(encoding='utf-8'), rechazos.read_text(encoding='utf-8'))
+
+    assert ejecutar('--procesos', '2', '--tamano-bloque', '2') == esperado('csv')
+    assert ejecutar('--fragmento', '1/2') == esperado('csv', FILAS[0::2], range(1, len(FILAS) + 1, 2))
@@ -0,0 +1,71 @@
+#Proporciona clases para manipular fechas y horas.
+import datetime
+#Marco de pruebas
+import pytest
+
+from reglas_feriados import (ReglasFeriados, Traslado, FeriadoFijo, TRASLADO_LOSEP, REGLAS_NACIONALES,
+                             REGLAS_LOCALES)
+
+AÑOS = range(2022, 2029)
+
+
+def registro():
+    """Devuelve un registro propio con las reglas vigentes y los años de AÑOS ya evaluados"""
+    reglas = ReglasFeriados([TRASLADO_LOSEP] + REGLAS_NACIONALES + REGLAS_LOCALES)
+    for año in AÑOS:
+        reglas.provinciales('EC-P', año)
+    return reglas
+
+
+def test_traslado_enmendado_solo_invalida_desde_su_vigencia():
+    """Un traslado nuevo desde 2025 solo cambia los años 2025 en adelante"""
+    reglas = registro()
+    avisos = []
+
+    def avisar(cambios):
+        avisos.append(cambios)
+    reglas.suscribir(avisar)
+    antes = {año: reglas.provinciales('EC-P', año) for año in AÑOS}
+    #Sin traslados desde 2025: cada feriado se descansa el día en que cae
+    cambios = reglas.enmendar(Traslado({}, version=2, desde=2025))
+    assert cambios and avisos == [cambios]
+    assert {año for _, año in cambios} <= set(range(2025, 2029))
+    assert (None, 2025) in cambios
+    for año in AÑOS:
+        despues = reglas.provinciales('EC-P', año)
+        #(None, año) es un cambio de los feriados nacionales, que afecta a todas las provincias
+        assert (despues != antes[año]) is ((None, año) in cambios or ('EC-P', año) in cambios)
+    assert reglas.traslado(2024) is not None and reglas.traslado(2024).version == 1
+    assert reglas.traslado(2025).version == 2
+    #Sin traslado, el 24 de mayo de 2025 (sábado) se queda en sábado
+    assert datetime.date(2025, 5, 24) in reglas.provinciales('EC-P', 2025)
+
+
+def test_feriado_enmendado_solo_invalida_sus_años():
+    """Mover un feriado fijo desde 2027 solo cambia 2027 y 2028 en todas las provincias (None)"""
+    reglas = registro()
+    cambios = reglas.enmendar(FeriadoFijo('navidad', 12, 26, 'Navidad [Navidades]', version=2, desde=2027))
+    assert cambios == [(None, 2027), (None, 2028)]
+    assert datetime.date(2026, 12, 25) in reglas.nacionales(2026)
+    assert datetime.date(2027, 12, 26) in reglas.nacionales(2027)
+    assert datetime.date(2027, 12, 25) not in reglas.nacionales(2027)
+
+
+def test_enmienda_sin_efecto_no_avisa():
+    """Una versión nueva que genera los mismos feriados no informa cambios"""
+    reglas = registro()
+    avisos = []
+
+    def avisar(cambios):
+        avisos.append(cambios)
+    reglas.suscribir(avisar)
+    assert reglas.enmendar(FeriadoFijo('año_nuevo', 1, 1, 'Año Nuevo [Nuevo año]', version=2, desde=2024)) == []
+    assert avisos == []
+
+
+def test_version_repetida():
+    """Una enmienda debe tener una versión mayor que las registradas"""
+    reglas = registro()
+    with pytest.raises(ValueError):
+        reglas.enmendar(FeriadoFijo('navidad', 12, 26, 'Navidad [Navidades]', version=1, desde=2027))
+
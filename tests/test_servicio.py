@@ -0,0 +1,115 @@
+#Ejecuta el servicio y el cliente en el mismo bucle de eventos
+import asyncio
+#Identifica el hilo que calcula cada veredicto
+import threading
+#Marco de pruebas
+import pytest
+
+pytest.importorskip('aiohttp')
+from aiohttp.test_utils import TestClient, TestServer
+
+import servicio
+import veredictos
+from Lab4 import PicoPlaca
+
+CONSULTAS = [('PBC-1231', '2022-05-02', '07:30'), ('PBC-1233', '2022-05-02', '07:30'),
+             ('PBC-1235', '2022-05-04', '18:00'), ('AB-1235', '2022-05-04', '18:00'),
+             ('PBC-1239', '2022-12-26', '08:00'), ('PBC-1230', '2022-12-30', '16:00'),
+             ('PBC-1237', '2022-05-05', '09:31'), ('GAU-0008', '2022-05-05', '09:30')] * 6
+
+
+def ejecutar(prueba, **opciones):
+    """Levanta la aplicación en un servidor de prueba, ejecuta prueba(cliente, aplicacion) y la detiene"""
+    async def principal():
+        aplicacion = servicio.crear_aplicacion(años=[2022], **opciones)
+        async with TestClient(TestServer(aplicacion)) as cliente:
+            return await prueba(cliente, aplicacion)
+    return asyncio.run(principal())
+
+
+def test_consultas_concurrentes_se_unen_en_un_lote():
+    async def prueba(cliente, aplicacion):
+        async def consultar(placa, fecha, hora):
+            respuesta = await cliente.post('/predecir', json={'placa': placa, 'fecha': fecha, 'hora': hora})
+            assert respuesta.status == 200
+            return (await respuesta.json())['puede_circular']
+        resultados = await asyncio.gather(*(consultar(*consulta) for consulta in CONSULTAS))
+        return resultados, aplicacion[servicio.METRICAS].resumen()
+
+    resultados, metricas = ejecutar(prueba, ventana=0.5)
+    assert resultados == [PicoPlaca(*consulta).predecir() for consulta in CONSULTAS]
+    assert metricas['lotes'] == 1
+    assert metricas['consultas_por_lote'] == len(CONSULTAS)
+
+
+def test_lotes_rechazados_no_cuentan():
+    async def prueba(cliente, aplicacion):
+        invalido = await cliente.post('/predecir/lote', json={'placas': ['PBC-1231'], 'fechas': [], 'horas': []})
+        assert invalido.status == 400
+        placas, fechas, horas = (list(columna) for columna in zip(*CONSULTAS))
+        valido = await cliente.post('/predecir/lote', json={'placas': placas, 'fechas': fechas, 'horas': horas})
+        assert valido.status == 200
+        return (await valido.json())['resultados'], aplicacion[servicio.METRICAS].resumen()
+
+    resultados, metricas = ejecutar(prueba)
+    assert resultados == [PicoPlaca(*consulta).predecir() for consulta in CONSULTAS]
+    assert metricas['lotes'] == 1
+    assert metricas['consultas_por_lote'] == len(CONSULTAS)
+
+
+@pytest.mark.parametrize('cuerpo', [
+    {'placas': 'PBC-1231', 'fechas': ['2022-05-02'], 'horas': ['07:30']},
+    {'placas': ['PBC-1231'], 'fechas': {'2022-05-02': 1}, 'horas': ['07:30']},
+    {'placas': ['PBC-1231'], 'fechas': ['2022-05-02'], 'horas': 730},
+    ['PBC-1231', '2022-05-02', '07:30'],
+])
+def test_lote_sin_listas(cuerpo):
+    async def prueba(cliente, aplicacion):
+        respuesta = await cliente.post('/predecir/lote', json=cuerpo)
+        return respuesta.status, await respuesta.json(), aplicacion[servicio.METRICAS].resumen()
+
+    estado, respuesta, metricas = ejecutar(prueba)
+    assert estado == 400 and 'listas' in respuesta['error']
+    assert metricas['lotes'] == 0
+
+
+def test_consulta_invalida():
+    async def prueba(cliente, aplicacion):
+        respuesta = await cliente.post('/predecir', json={'placa': 'pbc-1231', 'fecha': '2022-05-02', 'hora': '07:30'})
+        return respuesta.status, await respuesta.json()
+
+    estado, cuerpo = ejecutar(prueba)
+    assert estado == 400 and 'placa' in cuerpo['error']
+
+
+def test_veredictos_solo_aciertos_en_el_bucle(tmp_path, monkeypatch):
+    esperados = [PicoPlaca(*consulta).predecir() for consulta in CONSULTAS]
+    hilos = []
+    predecir = PicoPlaca.predecir
+
+    def registrar_hilo(registro):
+        hilos.append(threading.current_thread())
+        return predecir(registro)
+
+    monkeypatch.setattr(PicoPlaca, 'predecir', registrar_hilo)
+    cache = veredictos.CacheVeredictos(str(tmp_path / 'veredictos.db'))
+    veredictos.activar(cache)
+
+    async def prueba(cliente, aplicacion):
+        async def consultar(placa, fecha, hora):
+            respuesta = await cliente.post('/predecir', json={'placa': placa, 'fecha': fecha, 'hora': hora})
+            return (await respuesta.json())['puede_circular']
+        primera = await asyncio.gather(*(consultar(*consulta) for consulta in CONSULTAS))
+        calculados = len(hilos)
+        segunda = await asyncio.gather(*(consultar(*consulta) for consulta in CONSULTAS))
+        return primera, segunda, calculados
+
+    try:
+        primera, segunda, calculados = ejecutar(prueba)
+    finally:
+        veredictos.desactivar()
+        cache.cerrar()
+    assert primera == segunda == esperados
+    #Los fallos se calculan fuera del hilo del bucle; la segunda ronda son aciertos en memoria
+    assert calculados > 0 and all(hilo is not threading.main_thread() for hilo in hilos)
+    assert len(hilos) == calculados
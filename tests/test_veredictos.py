@@ -0,0 +1,67 @@
+#Marco de pruebas
+import pytest
+
+import Lab4
+import veredictos
+from Lab4 import PicoPlaca
+from horarios import Horario, TablaHorarios, ORDENANZA_0305, DIAS
+
+#Horario sin dígitos restringidos: todos los vehículos pueden circular
+LIBRE = Horario('libre', {dia: [] for dia in DIAS}, [('07:00', '09:30')])
+
+#El martes 2022-05-03 a las 07:30 la ordenanza restringe los dígitos 3 y 4
+CONSULTA = ('PBC-1233', '2022-05-03', '07:30')
+
+
+@pytest.fixture
+def ordenanza():
+    """Aplica la ordenanza 0305, desactiva la cache al terminar y restaura los horarios anteriores"""
+    anterior = Lab4.tabla_horarios
+    Lab4.usar_horarios(TablaHorarios([ORDENANZA_0305]))
+    yield
+    veredictos.desactivar()
+    Lab4.usar_horarios(anterior)
+
+
+def llenar(cache):
+    """Guarda en la cache el veredicto de CONSULTA con los horarios vigentes"""
+    veredictos.activar(cache)
+    assert PicoPlaca(*CONSULTA).predecir() is False
+    veredictos.desactivar()
+
+
+def test_reabrir_la_base_despues_de_cambiar_horarios(ordenanza, tmp_path):
+    """Una base llenada con otros horarios se vacía al reabrirla con la configuración predeterminada"""
+    ruta = str(tmp_path / 'veredictos.db')
+    cache = veredictos.CacheVeredictos(ruta)
+    llenar(cache)
+    cache.cerrar()
+    Lab4.usar_horarios(TablaHorarios([LIBRE]))
+    cache = veredictos.CacheVeredictos(ruta)
+    veredictos.activar(cache)
+    try:
+        assert PicoPlaca(*CONSULTA).predecir() is True
+        assert cache.aciertos_disco == 0
+    finally:
+        veredictos.desactivar()
+        cache.cerrar()
+
+
+def test_activar_despues_de_cambiar_horarios(ordenanza):
+    """Activar una cache creada con los horarios anteriores elimina sus veredictos"""
+    cache = veredictos.CacheVeredictos()
+    llenar(cache)
+    Lab4.usar_horarios(TablaHorarios([LIBRE]))
+    veredictos.activar(cache)
+    assert cache.configuracion == Lab4.tabla_horarios.firma()
+    assert PicoPlaca(*CONSULTA).predecir() is True
+    assert cache.estadisticas()['aciertos'] == 0
+
+
+def test_activar_con_los_mismos_horarios_conserva_los_veredictos(ordenanza):
+    """Reactivar la cache sin cambiar los horarios no pierde los veredictos guardados"""
+    cache = veredictos.CacheVeredictos()
+    llenar(cache)
+    veredictos.activar(cache)
+    assert PicoPlaca(*CONSULTA).predecir() is False
+    assert cache.aciertos == 1
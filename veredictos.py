@@ -0,0 +1,374 @@
+#Proporciona clases para manipular fechas y horas.
+import datetime
+#Detecta los procesos hijos que heredan la conexión a SQLite
+import os
+#Sincroniza el acceso de los hilos del servicio
+import threading
+
+#Contadores e histogramas opcionales (veredictos.aciertos, veredictos.fallos)
+import instrumentacion
+#Los cambios de reglas invalidan solo los años afectados
+from reglas_feriados import reglas_feriados
+
+#hashlib y sqlite3 se importan al abrir la primera base, para no demorar la importación de Lab4
+
+#Cache de veredictos activa del proceso; None la desactiva. PicoPlaca.predecir
+#consulta esta variable, de modo que desactivada solo cuesta una comparación.
+activa = None
+
+#Firma de los horarios que aplica PicoPlaca; Lab4 la actualiza al importarse y en usar_horarios.
+#Es la configuración predeterminada de las caches y activar reconfigura las que no coinciden.
+firma_horarios = None
+
+#Los días se numeran con datetime.date.toordinal(), que no llega a 2 ** 22
+BITS_DIA = 22
+
+
+class CacheVeredictos:
+    """
+    Cache de veredictos de Pico y Placa sobre el espacio reducido de claves.
+     El veredicto de predecir no depende de la placa completa sino de la fecha (que fija
+     el feriado y el día de la semana), de si la placa está exenta (segunda letra en AUZEXM
+     o solo dos letras), de si la hora cae en una ventana de hora pico del horario vigente,
+     del último dígito y de si el feriado se consulta en línea. Esos valores se empaquetan en un entero:
+         ((((enlinea << 22 | día ordinal) * 2 + exenta) * 2 + pico) * 10 + dígito
+     así que cada día ocupa como máximo 40 claves contiguas (2 × 2 × 10) por modo de consulta y los días de un año forman
+     un intervalo de claves.
+     Las claves viven en un diccionario en memoria y, opcionalmente, en una base SQLite
+     compartida por varios procesos (modo WAL y lecturas proyectadas en memoria con mmap),
+     de forma que un veredicto calculado por un proceso es un acierto para los demás.
+     Las escrituras se acumulan y se confirman por bloques. La base guarda la firma de las
+     reglas de feriados y de la configuración; si no coincide al abrirla, se vacía. Cuando
+     se enmienda una regla, solo se eliminan los años cuyos feriados cambiaron en la provincia
+     (los veredictos en línea no dependen de las reglas y se conservan).
+     ...
+     Atributos
+     ----------
+     ruta: str o None
+         archivo de la base SQLite; None guarda los veredictos solo en memoria
+     provincia: str
+         codigo de provincia segun ISO3166-2 cuyos feriados usa predecir sin conexión
+     configuracion: objeto
+         valor cuya representación forma parte de la firma de la base (los horarios vigentes)
+     lote: int
+         escrituras pendientes que se confirman juntas en la base
+     aciertos: int
+         veredictos encontrados en memoria
+     aciertos_disco: int
+         veredictos encontrados en la base (escritos por este u otro proceso)
+     fallos: int
+         veredictos que hubo que calcular
+     Métodos
+     -------
+     clave(ordinal, exenta, pico, digito, enlinea=False):
+         Empaqueta los valores de los que depende el veredicto
+     obtener(self, clave):
+         Devuelve el veredicto guardado o None
+     en_memoria(self, clave):
+         Devuelve el veredicto guardado en memoria o None, sin leer la base
+     guardar(self, clave, puede):
+         Guarda un veredicto
+     invalidar(self, año=None):
+         Elimina los veredictos sin conexión de un año (o todos)
+     configurar(self, configuracion):
+         Cambia la configuración y elimina todos los veredictos
+     confirmar(self):
+         Escribe en la base las escrituras pendientes
+     cerrar(self):
+         Confirma las escrituras pendientes y cierra la base
+     estadisticas(self):
+         Devuelve los aciertos, los fallos y la proporción de aciertos
+    """
+
+    def __init__(self, ruta=None, provincia='EC-P', configuracion=None, lote=256):
+        """
+        Construye la cache y, si se indica una ruta, abre (o crea) la base SQLite.
+         Parámetros
+         ----------
+         ruta: str, opcional
+             archivo de la base SQLite (el valor predeterminado es None, solo en memoria)
+         provincia: str, opcional
+             codigo de provincia segun ISO3166-2 (el valor predeterminado es EC-P)
+         configuracion: objeto, opcional
+             valor cuya representación forma parte de la firma de la base (el valor predeterminado
+             es firma_horarios, la firma de los horarios vigentes de Pico y Placa)
+         lote: int, opcional
+             escrituras que se confirman juntas (el valor predeterminado es 256)
+         Aumenta
+         ------
+         ValorError
+             Si el lote es menor que 1
+        """
+        if lote < 1:
+            raise ValueError('El lote de escrituras debe ser al menos 1')
+        self.ruta = ruta
+        self.provincia = provincia
+        self.configuracion = firma_horarios if configuracion is None else configuracion
+        self.lote = lote
+        self.aciertos = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+        self._veredictos = {}
+        self._pendientes = {}
+        self._conexion = None
+        self._pid = None
+        self._candado = threading.Lock()
+        reglas_feriados.suscribir(self.__al_cambiar_reglas)
+        if ruta is not None:
+            with self._candado:
+                self.__abrir()
+
+    @staticmethod
+    def clave(ordinal, exenta, pico, digito, enlinea=False):
+        """
+        Empaqueta los valores de los que depende el veredicto en un entero
+         Parámetros
+         ----------
+         ordinal: int
+             día de la consulta, datetime.date.toordinal()
+         exenta: bool
+             True si la placa está exenta por su segunda letra o por tener solo dos letras
+         pico: bool
+             True si la hora cae en una ventana de hora pico
+         digito: int
+             último dígito de la placa
+         enlinea: bool, opcional
+             True si el feriado se consulta con la API (el valor predeterminado es False)
+         Devoluciones
+         -------
+         Devuelve la clave como int
+        """
+        return ((((enlinea << BITS_DIA | ordinal) * 2 + exenta) * 2 + pico) * 10 + digito)
+
+    def __firma(self):
+        """Devuelve la firma de las reglas de feriados vigentes y de la configuración"""
+        import hashlib
+        reglas = sorted(repr((type(regla).__name__, regla.firma(), regla.desde, regla.hasta))
+                        for regla in reglas_feriados.reglas())
+        return hashlib.sha1(repr((self.provincia, reglas, self.configuracion)).encode('utf-8')).hexdigest()
+
+    def __abrir(self):
+        """Abre la base en este proceso, crea las tablas y la vacía si la firma no coincide"""
+        import sqlite3
+        conexion = sqlite3.connect(self.ruta, timeout=30, check_same_thread=False, isolation_level=None)
+        conexion.execute('PRAGMA journal_mode=WAL')
+        conexion.execute('PRAGMA synchronous=NORMAL')
+        conexion.execute('PRAGMA mmap_size=268435456')
+        conexion.execute('CREATE TABLE IF NOT EXISTS veredictos (clave INTEGER PRIMARY KEY, puede INTEGER NOT NULL) WITHOUT ROWID')
+        conexion.execute('CREATE TABLE IF NOT EXISTS metadatos (nombre TEXT PRIMARY KEY, valor TEXT NOT NULL)')
+        firma = self.__firma()
+        with conexion:
+            conexion.execute('BEGIN IMMEDIATE')
+            fila = conexion.execute("SELECT valor FROM metadatos WHERE nombre = 'firma'").fetchone()
+            if fila is None or fila[0] != firma:
+                conexion.execute('DELETE FROM veredictos')
+                conexion.execute("INSERT OR REPLACE INTO metadatos VALUES ('firma', ?)", (firma,))
+        self._conexion = conexion
+        self._pid = os.getpid()
+
+    def __base(self):
+        """Devuelve la conexión del proceso actual; un proceso hijo abre la suya"""
+        if self._conexion is not None and self._pid != os.getpid():
+            #La conexión heredada de otro proceso no se debe usar ni cerrar
+            self._conexion = None
+            self._pendientes.clear()
+            self.__abrir()
+        return self._conexion
+
+    def obtener(self, clave):
+        """
+        Busca un veredicto, primero en memoria y luego en la base
+         Parámetros
+         ----------
+         clave: int
+             clave de CacheVeredictos.clave
+         Devoluciones
+         -------
+         Devuelve True o False si el veredicto está guardado, o None si hay que calcularlo
+        """
+        instrumento = instrumentacion.activa
+        with self._candado:
+            puede = self._veredictos.get(clave)
+            if puede is not None:
+                self.aciertos += 1
+                if instrumento is not None:
+                    instrumento.contar('veredictos.aciertos')
+                return puede
+            if self.ruta is not None:
+                fila = self.__base().execute('SELECT puede FROM veredictos WHERE clave = ?', (clave,)).fetchone()
+                if fila is not None:
+                    puede = self._veredictos[clave] = bool(fila[0])
+                    self.aciertos_disco += 1
+                    if instrumento is not None:
+                        instrumento.contar('veredictos.aciertos_disco')
+                    return puede
+            self.fallos += 1
+            if instrumento is not None:
+                instrumento.contar('veredictos.fallos')
+            return None
+
+    def en_memoria(self, clave):
+        """
+        Busca un veredicto solo en memoria, sin esperar el candado ni leer la base, para
+         responder desde un bucle de eventos sin bloquearlo; si no está, la consulta sigue con obtener
+         Parámetros
+         ----------
+         clave: int
+             clave de CacheVeredictos.clave
+         Devoluciones
+         -------
+         Devuelve True o False si el veredicto está en memoria, o None (sin contarlo como fallo)
+        """
+        puede = self._veredictos.get(clave)
+        if puede is not None:
+            #Sin el candado, un acierto concurrente con otro hilo puede no contarse
+            self.aciertos += 1
+            instrumento = instrumentacion.activa
+            if instrumento is not None:
+                instrumento.contar('veredictos.aciertos')
+        return puede
+
+    def guardar(self, clave, puede):
+        """
+        Guarda un veredicto en memoria y lo agrega a las escrituras pendientes de la base
+         Parámetros
+         ----------
+         clave: int
+             clave de CacheVeredictos.clave
+         puede: bool
+             veredicto de predecir
+        """
+        with self._candado:
+            self._veredictos[clave] = puede
+            if self.ruta is not None:
+                self._pendientes[clave] = puede
+                if len(self._pendientes) >= self.lote:
+                    self.__confirmar()
+
+    def __confirmar(self):
+        """Escribe las escrituras pendientes en una sola transacción"""
+        if self._pendientes:
+            conexion = self.__base()
+            with conexion:
+                conexion.execute('BEGIN IMMEDIATE')
+                conexion.executemany('INSERT OR REPLACE INTO veredictos VALUES (?, ?)',
+                                     ((clave, int(puede)) for clave, puede in self._pendientes.items()))
+            self._pendientes.clear()
+
+    def confirmar(self):
+        """Escribe en la base las escrituras pendientes"""
+        with self._candado:
+            if self.ruta is not None:
+                self.__confirmar()
+
+    def invalidar(self, año=None):
+        """
+        Elimina los veredictos sin conexión de un año; sin argumentos elimina todos los veredictos
+         Parámetros
+         ----------
+         año: int, opcional
+             año a invalidar (None: todos, también los consultados en línea)
+         Devoluciones
+         -------
+         Devuelve el número de veredictos eliminados de la memoria
+        """
+        with self._candado:
+            if año is None:
+                eliminados = len(self._veredictos)
+                self._veredictos.clear()
+                self._pendientes.clear()
+                if self.ruta is not None:
+                    self.__base().execute('DELETE FROM veredictos')
+                return eliminados
+            inicio = self.clave(datetime.date(año, 1, 1).toordinal(), False, False, 0)
+            fin = self.clave(datetime.date(año, 12, 31).toordinal() + 1, False, False, 0)
+            claves = [clave for clave in self._veredictos if inicio <= clave < fin]
+            for clave in claves:
+                del self._veredictos[clave]
+                self._pendientes.pop(clave, None)
+            if self.ruta is not None:
+                self.__base().execute('DELETE FROM veredictos WHERE clave >= ? AND clave < ?', (inicio, fin))
+            return len(claves)
+
+    def __al_cambiar_reglas(self, cambios):
+        """
+        Recibe de reglas_feriados las (provincia, año) cuyos feriados cambiaron y elimina los
+         veredictos de los años que afectan a la provincia
+        """
+        for año in sorted({año for provincia, año in cambios if provincia in (None, self.provincia)}):
+            self.invalidar(año)
+        #La base queda al día con las reglas enmendadas
+        self.__guardar_firma()
+
+    def __guardar_firma(self):
+        """Guarda en la base la firma de las reglas y de la configuración actuales"""
+        with self._candado:
+            if self.ruta is not None:
+                self.__base().execute("INSERT OR REPLACE INTO metadatos VALUES ('firma', ?)", (self.__firma(),))
+
+    def configurar(self, configuracion):
+        """
+        Cambia la configuración (por ejemplo, al reemplazar los horarios) y elimina todos los veredictos
+         Parámetros
+         ----------
+         configuracion: objeto
+             valor cuya representación forma parte de la firma de la base
+        """
+        self.configuracion = configuracion
+        self.invalidar()
+        self.__guardar_firma()
+
+    def cerrar(self):
+        """Confirma las escrituras pendientes y cierra la base (los veredictos en memoria se conservan)"""
+        with self._candado:
+            if self._conexion is not None and self._pid == os.getpid():
+                self.__confirmar()
+                self._conexion.close()
+            self._conexion = None
+            self.ruta = None
+
+    def estadisticas(self):
+        """
+        Resume los accesos a la cache
+         Devoluciones
+         -------
+         Devuelve un diccionario con los veredictos en memoria, los aciertos en memoria y en la base,
+         los fallos y la proporción de aciertos (None si no hubo accesos)
+        """
+        with self._candado:
+            total = self.aciertos + self.aciertos_disco + self.fallos
+            return {
+                'veredictos': len(self._veredictos),
+                'aciertos': self.aciertos,
+                'aciertos_disco': self.aciertos_disco,
+                'fallos': self.fallos,
+                'proporcion_aciertos': (self.aciertos + self.aciertos_disco) / total if total else None}
+
+
+def activar(cache=None):
+    """
+    Activa la cache de veredictos del proceso; si su configuración no es la firma de los horarios
+     vigentes (por ejemplo, se creó antes de usar_horarios), la reconfigura y elimina sus veredictos
+     Parámetros
+     ----------
+     cache: CacheVeredictos, opcional
+         cache a usar (el valor predeterminado es una nueva, solo en memoria)
+     Devoluciones
+     -------
+     Devuelve la cache activa
+    """
+    global activa
+    cache = cache if cache is not None else CacheVeredictos()
+    if firma_horarios is not None and cache.configuracion != firma_horarios:
+        cache.configurar(firma_horarios)
+    activa = cache
+    return activa
+
+
+def desactivar():
+    """Desactiva la cache de veredictos; confirma sus escrituras pendientes y la devuelve (o None)"""
+    global activa
+    anterior, activa = activa, None
+    if anterior is not None:
+        anterior.confirmar()
+    return anterior